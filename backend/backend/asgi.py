@@ -5,12 +5,39 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Deployment (uvicorn workers)
+----------------------------
+The async read endpoints under ``/api/async/`` (see
+``taxonomies_manager/async_views.py``) only pay off when served through ASGI,
+where a slow client no longer pins a whole worker:
+
+    gunicorn backend.asgi:application -k uvicorn_worker.UvicornWorker \
+        --workers 2 --preload --bind 0.0.0.0:$PORT
+
+``--preload`` imports Django, the apps and the URLconf once in the master
+process; workers are forked with everything already loaded. Measure the
+startup path with ``python manage.py startup_benchmark``.
+
+For local testing a single process is enough:
+
+    uvicorn backend.asgi:application --reload
+
+The regular DRF endpoints keep working unchanged under ASGI (Django runs them
+in a thread pool), and the WSGI entry point (``backend.wsgi``) is still valid
+for the classic ``gunicorn backend.wsgi`` deployment.
 """
 
 import os
 
 from django.core.asgi import get_asgi_application
+from django.urls import get_resolver
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+# Carga la urlconf (views, serializers, DRF) al importar el módulo y no en la
+# primera request. Con `gunicorn --preload` se hace una vez en el master y los
+# workers la heredan por fork (menos tiempo y RSS por worker).
+get_resolver().url_patterns
@@ -56,14 +56,24 @@ INSTALLED_APPS = [
     'corsheaders',
     'rest_framework',
     'taxonomies_manager',
-    'django_extensions',
 ]
 
+# Apps de desarrollo (shell_plus, runserver_plus, ...): solo con DEBUG o si se piden
+# explícitamente. El proceso web en producción no las importa (arranque más rápido).
+# smart_selects solo hace falta si algún modelo usa ChainedForeignKey (hoy ninguno);
+# si se añade aquí también se monta /chaining/ (ver backend/urls.py).
+DEV_APPS = env.list("DEV_APPS", default=["django_extensions"] if DEBUG else [])
+INSTALLED_APPS += DEV_APPS
+
 MIDDLEWARE = [
+    "taxonomies_manager.querybudget.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "taxonomies_manager.middleware.StaticFilesMiddleware",  # WhiteNoise, también async
+    "taxonomies_manager.middleware.ApiCompressionMiddleware",
 
     "corsheaders.middleware.CorsMiddleware",
+    "taxonomies_manager.profiling.ProfilingMiddleware",
+    "taxonomies_manager.middleware.ReleaseMiddleware",
 
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -149,6 +159,69 @@ DATABASES = {
     )
 }
 
+# Réplicas de lectura para la API (ver taxonomies_manager/routers.py):
+# DATABASE_REPLICA_URLS=postgres://...replica1,postgres://...replica2
+# Admin, imports y cualquier escritura siguen en "default".
+DATABASE_REPLICA_URLS = env.list("DATABASE_REPLICA_URLS", default=[])
+for _i, _url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    DATABASES[f"replica{_i}"] = {**env.db_url_config(_url), "TEST": {"MIRROR": "default"}}
+REPLICA_READ_PATH_PREFIXES = ["/api/"]
+REPLICA_CHECK_INTERVAL = env.float("REPLICA_CHECK_INTERVAL", default=5.0)  # segundos entre chequeos de retraso
+REPLICA_PIN_SECONDS = env.int("REPLICA_PIN_SECONDS", default=30)  # primario tras escribir (cookie)
+if DATABASE_REPLICA_URLS:
+    DATABASE_ROUTERS = ["taxonomies_manager.routers.ReplicaRouter"]
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("taxonomies_manager.middleware.ReleaseMiddleware"),
+        "taxonomies_manager.routers.ReadReplicaMiddleware",
+    )
+
+
+# Presupuesto de consultas por vista (ver taxonomies_manager/querybudget.py).
+# QUERY_BUDGET_MODE: "log" (warning), "raise" (excepción) u "off".
+# `manage.py test` corre siempre en "raise" (TEST_RUNNER, ver taxonomies_manager/runner.py).
+# QUERY_BUDGETS sobrescribe el de una vista: {"taxonomy-detail-nested": 15}
+QUERY_BUDGET_MODE = env("QUERY_BUDGET_MODE", default="log")
+QUERY_BUDGET_DEFAULT = None  # vistas sin presupuesto declarado: no se comprueban
+QUERY_BUDGETS = {}
+TEST_RUNNER = "taxonomies_manager.runner.QueryBudgetTestRunner"
+
+# Perfilado bajo demanda: ?_profile=1 (o =cprofile) / cabecera X-Profile, solo staff.
+# Informes en /admin/profiles/ (ver taxonomies_manager/profiling.py).
+PROFILE_ENABLED = env.bool("PROFILE_ENABLED", default=True)
+PROFILE_DIR = env("PROFILE_DIR", default=str(BASE_DIR / "data" / "profiles"))
+PROFILE_KEEP = env.int("PROFILE_KEEP", default=50)  # anillo: se borran los más antiguos
+PROFILE_SAMPLE_INTERVAL = env.float("PROFILE_SAMPLE_INTERVAL", default=0.001)  # segundos entre muestras
+
+
+# Cache (respuestas de la API). Por defecto memoria local del proceso;
+# en producción conviene algo compartido, p.ej. CACHE_URL=redis://... o
+# CACHE_URL=dbcache://api_cache (requiere `manage.py createcachetable`).
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+
+# Cache de respuestas JSON (las claves incluyen la versión del dataset, así que
+# el timeout solo limita memoria; los datos nunca quedan obsoletos).
+API_RESPONSE_CACHE_ENABLED = env.bool("API_RESPONSE_CACHE_ENABLED", default=True)
+API_RESPONSE_CACHE_TIMEOUT = env.int("API_RESPONSE_CACHE_TIMEOUT", default=60 * 60 * 24)
+
+# Compresión de la API (gzip / brotli si está instalado); los estáticos los comprime WhiteNoise
+API_COMPRESSION_PATH_PREFIXES = ["/api/"]
+API_COMPRESSION_MIN_SIZE = env.int("API_COMPRESSION_MIN_SIZE", default=1024)
+API_COMPRESSION_GZIP_LEVEL = env.int("API_COMPRESSION_GZIP_LEVEL", default=6)
+API_COMPRESSION_BROTLI_QUALITY = env.int("API_COMPRESSION_BROTLI_QUALITY", default=5)
+
+# Artefactos del clasificador de descripciones (matriz TF-IDF por versión del dataset)
+CLASSIFIER_DIR = env("CLASSIFIER_DIR", default=str(BASE_DIR / "data" / "classifier"))
+CLASSIFY_MAX_BATCH = env.int("CLASSIFY_MAX_BATCH", default=1000)
+
+# Releases inmutables que se conservan (además del publicado); el import poda al publicar
+RELEASES_KEEP = env.int("RELEASES_KEEP", default=5)
+# Un ImportCheckpoint sin actualizar en estos minutos se da por abandonado (ya no fuerza 503)
+IMPORT_STALE_AFTER_MINUTES = env.int("IMPORT_STALE_AFTER_MINUTES", default=30)
+
+# Bundle estático de JSON para el CDN (manage.py build_static_bundle)
+STATIC_BUNDLE_DIR = env("STATIC_BUNDLE_DIR", default=str(BASE_DIR / "data" / "bundle"))
 
 
 # Password validation
@@ -14,11 +14,14 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.apps import apps
 from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
 from django.db import connections
 
+from taxonomies_manager import admin_views
+
 def health(_request):
     try:
         connections["default"].cursor()  # opens a test cursor
@@ -29,8 +32,14 @@ def health(_request):
 
 
 urlpatterns = [
+    # Informes de perfilado (?_profile=1, ver taxonomies_manager/profiling.py)
+    path('admin/profiles/', admin.site.admin_view(admin_views.profile_list), name='admin-profile-list'),
+    path('admin/profiles/<str:profile_id>/', admin.site.admin_view(admin_views.profile_detail), name='admin-profile-detail'),
     path('admin/', admin.site.urls),
     path('api/', include('taxonomies_manager.urls')), 
-    path('chaining/', include('smart_selects.urls')),
     path('health/', health),          
 ]
+
+# Endpoints AJAX de smart_selects: solo si la app está activa (DEV_APPS)
+if apps.is_installed('smart_selects'):
+    urlpatterns.append(path('chaining/', include('smart_selects.urls')))
@@ -4,6 +4,49 @@ from .models import (
     Activity, Practice, RwandaAdaptation,
     AdaptationWhitelist, AdaptationGeneralCriterion,
 )
+from .admin_utils import (
+    input_filter, related_filter, EstimatedCountPaginator,
+    FullTextSearchMixin, ChangelistOnlyMixin, shared_text_form,
+)
+
+
+class TaxonomyRegionFilter(admin.SimpleListFilter):
+    """Regiones leídas de Taxonomy (pocas filas), no un DISTINCT sobre la tabla grande."""
+    title = "region"
+    parameter_name = "taxonomy__region"
+
+    def lookups(self, request, model_admin):
+        regions = Taxonomy.objects.exclude(region="").order_by("region").values_list("region", flat=True).distinct()
+        return [(r, r) for r in regions]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(taxonomy__region=self.value())
+        return queryset
+
+
+# Filtros baratos para tablas grandes (ver admin_utils.py)
+ObjectiveFilter = related_filter("taxonomy")
+SectorNameFilter = input_filter("sector", "sector_name", "sector__name__icontains")
+SubsectorNameFilter = input_filter("subsector", "subsector_name", "subsector__name__icontains")
+
+
+class LargeTableAdmin(FullTextSearchMixin, ChangelistOnlyMixin, admin.ModelAdmin):
+    """Changelist pensado para cientos de miles de filas."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # evita un segundo COUNT(*) de la tabla entera al filtrar
+
+    @admin.display(description="Objective", ordering="environmental_objective__display_name")
+    def objective_disp(self, obj):
+        return obj.environmental_objective.display_name or obj.environmental_objective.generic_name
+
+    @admin.display(description="Sector", ordering="sector__name")
+    def sector_name(self, obj):
+        return obj.sector.name
+
+    @admin.display(description="Subsector", ordering="subsector__name")
+    def subsector_name(self, obj):
+        return obj.subsector.name if obj.subsector_id else None
 
 # Inlines para navegar jerárquicamente desde Taxonomy
 class EnvironmentalObjectiveInline(admin.TabularInline):
@@ -13,6 +56,7 @@ class EnvironmentalObjectiveInline(admin.TabularInline):
 class SectorInline(admin.TabularInline):
     model = Sector
     extra = 0
+    autocomplete_fields = ("environmental_objective",)  # un <select> completo por fila era N×M queries
 
 # --- Taxonomy ---
 @admin.register(Taxonomy)
@@ -38,6 +82,10 @@ class EnvironmentalObjectiveAdmin(admin.ModelAdmin):
     ordering = ("taxonomy__name", "generic_name")
     list_select_related = ("taxonomy",)
 
+    def get_queryset(self, request):
+        # __str__ usa taxonomy: también para el autocompletado de los formularios
+        return super().get_queryset(request).select_related("taxonomy")
+
 class SubsectorInline(admin.TabularInline):
     model = Subsector
     extra = 0
@@ -46,12 +94,16 @@ class SubsectorInline(admin.TabularInline):
 @admin.register(Sector)
 class SectorAdmin(admin.ModelAdmin):
     list_display = ("name", "taxonomy","environmental_objective")
-    list_filter = ("taxonomy__region", "taxonomy", "environmental_objective")
+    list_filter = (TaxonomyRegionFilter, "taxonomy", ("environmental_objective", ObjectiveFilter))
     search_fields = ("name", "environmental_objective__display_name", "environmental_objective__generic_name", "taxonomy__name")
     ordering = ("taxonomy__name", "environmental_objective__display_name", "environmental_objective__generic_name", "name")
-    list_select_related = ("taxonomy", "environmental_objective")
+    list_select_related = ("taxonomy", "environmental_objective__taxonomy")
     inlines = [SubsectorInline]
 
+    def get_queryset(self, request):
+        # (si get_queryset ya trae select_related, el changelist ignora list_select_related)
+        return super().get_queryset(request).select_related(*self.list_select_related)
+
 
 # --- Subsector ---
 @admin.register(Subsector)
@@ -64,29 +116,33 @@ class SubsectorAdmin(admin.ModelAdmin):
         "sector__environmental_objective__generic_name",
         "sector__taxonomy__name",
     )
-    list_filter = ("sector__taxonomy", "sector__environmental_objective")
+    list_filter = ("sector__taxonomy", ("sector__environmental_objective", ObjectiveFilter))
     ordering = ("sector__taxonomy__name", "sector__environmental_objective__generic_name", "sector__name", "name")
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("sector__taxonomy", "sector__environmental_objective")
+
 
 # --- Activity ---
 @admin.register(Activity)
-class ActivityAdmin(admin.ModelAdmin):
+class ActivityAdmin(LargeTableAdmin):
+    form = shared_text_form(Activity)
     list_display = (
         "taxonomy_code",
         "name",
         "taxonomy",
-        "environmental_objective",
-        "sector",
-        "subsector",
+        "objective_disp",
+        "sector_name",
+        "subsector_name",
         "sc_criteria_type",
         "contribution_type",
     )
     list_filter = (
-        "taxonomy__region",
+        TaxonomyRegionFilter,
         "taxonomy",
-        "environmental_objective",
-        "sector",
-        "subsector",
+        ("environmental_objective", ObjectiveFilter),
+        SectorNameFilter,
+        SubsectorNameFilter,
         "sc_criteria_type",
         "contribution_type",
     )
@@ -99,8 +155,18 @@ class ActivityAdmin(admin.ModelAdmin):
         "environmental_objective__generic_name",
         "sector__name",
     )
+    # En Postgres: índice GIN (migración 0012) + prefijo sobre el código
+    fulltext_fields = ("taxonomy_code", "economic_code", "name", "description")
+    prefix_search_fields = ("taxonomy_code",)
     ordering = ("taxonomy__name", "environmental_objective__display_name", "environmental_objective__generic_name", "sector__name", "taxonomy_code")
     list_select_related = ("taxonomy", "environmental_objective", "sector", "subsector")
+    # En el formulario: widgets de autocompletado en vez de <select> con todas las filas
+    autocomplete_fields = ("taxonomy", "environmental_objective", "sector", "subsector")
+    changelist_only = (
+        "taxonomy_code", "name", "sc_criteria_type", "contribution_type",
+        "taxonomy__name", "environmental_objective__display_name", "environmental_objective__generic_name",
+        "sector__name", "subsector__name",
+    )
 
     fieldsets = (
         ("Identity", {
@@ -140,13 +206,9 @@ class ActivityAdmin(admin.ModelAdmin):
 
 
 @admin.register(Practice)
-class PracticeAdmin(admin.ModelAdmin):
-    list_display = ("practice_name", "practice_level", "taxonomy", "objective_disp", "sector", "subsector")
+class PracticeAdmin(LargeTableAdmin):
+    list_display = ("practice_name", "practice_level", "taxonomy", "objective_disp", "sector_name", "subsector_name")
 
-    @admin.display(description="Objective", ordering="environmental_objective__display_name")
-    def objective_disp(self, obj):
-        return obj.environmental_objective.display_name or obj.environmental_objective.generic_name
-    
     search_fields = (
         "practice_name",
         "taxonomy__name",
@@ -154,9 +216,16 @@ class PracticeAdmin(admin.ModelAdmin):
         "environmental_objective__display_name",
         "environmental_objective__generic_name",
     )
+    fulltext_fields = ("practice_name", "practice_description")
 
-    list_filter = ("taxonomy", "environmental_objective", "sector", "subsector", "practice_level")
+    list_filter = ("taxonomy", ("environmental_objective", ObjectiveFilter), SectorNameFilter, SubsectorNameFilter, "practice_level")
     list_select_related = ("taxonomy", "environmental_objective", "sector", "subsector")
+    autocomplete_fields = ("taxonomy", "environmental_objective", "sector", "subsector")
+    changelist_only = (
+        "practice_name", "practice_level",
+        "taxonomy__name", "environmental_objective__display_name", "environmental_objective__generic_name",
+        "sector__name", "subsector__name",
+    )
 
     fieldsets = (
         ("Context", {
@@ -176,10 +245,23 @@ class PracticeAdmin(admin.ModelAdmin):
     )
 
 @admin.register(RwandaAdaptation)
-class RwandaAdaptationAdmin(admin.ModelAdmin):
+class RwandaAdaptationAdmin(LargeTableAdmin):
+    form = shared_text_form(RwandaAdaptation)
     list_display = ("taxonomy", "environmental_objective", "sector", "hazard", "division", "type", "level", "criteria_type")
     search_fields = ("taxonomy__name", "sector", "hazard", "division", "investment")
-    list_filter = ("taxonomy", "environmental_objective", "sector", "hazard", "type", "level", "criteria_type")
+    fulltext_fields = ("sector", "hazard", "division", "investment")
+    list_filter = (
+        "taxonomy",
+        input_filter("objective", "objective", "environmental_objective__icontains"),
+        input_filter("sector", "sector", "sector__icontains"),
+        input_filter("hazard", "hazard", "hazard__icontains"),
+        "type", "level", "criteria_type",
+    )
+    list_select_related = ("taxonomy",)
+    changelist_only = (
+        "environmental_objective", "sector", "hazard", "division", "type", "level", "criteria_type",
+        "taxonomy__name",
+    )
 
 
 
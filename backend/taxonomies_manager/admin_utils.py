@@ -0,0 +1,206 @@
+"""
+Piezas del admin pensadas para tablas grandes (Activity, Practice, Rwanda).
+
+- input_filter(): filtro de texto libre en lugar de listar todos los valores
+  distintos (RelatedFieldListFilter / AllValuesFieldListFilter recorren la
+  tabla entera y renderizan miles de enlaces).
+- related_filter(): como RelatedFieldListFilter pero con las etiquetas (__str__)
+  resueltas en una sola query con select_related.
+- EstimatedCountPaginator: en Postgres, sin filtros, usa la estimación de
+  pg_class en vez de COUNT(*) cuando la tabla es grande.
+- FullTextSearchMixin: en Postgres la búsqueda usa el índice GIN de
+  to_tsvector (migración 0012) más icontains en los campos de otras tablas;
+  en SQLite queda el icontains de siempre.
+- ChangelistOnlyMixin: .only() con las columnas del listado (solo en el changelist).
+- shared_text_form(): formulario que edita los textos compartidos (models.SharedText)
+  como textareas normales en vez de un <select> con todos los textos.
+"""
+import re
+
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.utils import lookup_spawns_duplicates
+from django.contrib.admin.widgets import AdminTextareaWidget
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import BooleanField, Q, QuerySet
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
+
+from .texts import SHARED_TEXT_REF_SUFFIX, shared_text_fields
+
+ESTIMATE_MIN_ROWS = 10_000
+FULLTEXT_CONFIG = "simple"
+# Palabras y códigos tipo "4.1" / "A01-2" (el parser de Postgres los deja enteros)
+_WORD_RE = re.compile(r"\w+(?:[.\-]\w+)*", re.UNICODE)
+
+
+# -----------------------
+# Filtros
+# -----------------------
+class InputFilter(admin.SimpleListFilter):
+    """Caja de texto; filtra con `lookup` (p.ej. "sector__name__icontains")."""
+    template = "admin/taxonomies_manager/input_filter.html"
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        # SimpleListFilter solo se muestra si hay alguna opción
+        return (("", ""),)
+
+    def queryset(self, request, queryset):
+        value = (self.value() or "").strip()
+        if value:
+            return queryset.filter(**{self.lookup: value})
+        return queryset
+
+    def choices(self, changelist):
+        # Solo la opción "Todos", con el resto de parámetros para los <input hidden>
+        all_choice = next(super().choices(changelist))
+        params = changelist.get_filters_params()
+        all_choice["query_parts"] = [
+            (key, value)
+            for key, values in params.items() if key != self.parameter_name
+            for value in (values if isinstance(values, list) else [values])
+        ]
+        yield all_choice
+
+
+def input_filter(title, parameter_name, lookup):
+    return type(f"{parameter_name.title()}InputFilter", (InputFilter,), {
+        "title": title, "parameter_name": parameter_name, "lookup": lookup,
+    })
+
+
+def related_filter(*select_related):
+    """RelatedFieldListFilter cuyas etiquetas no disparan una query por opción."""
+
+    class SelectRelatedFieldListFilter(admin.RelatedFieldListFilter):
+        def field_choices(self, field, request, model_admin):
+            ordering = self.field_admin_ordering(field, request, model_admin)
+            qs = field.related_model._default_manager.select_related(*select_related)
+            if ordering:
+                qs = qs.order_by(*ordering)
+            return [(obj.pk, str(obj)) for obj in qs]
+
+    return SelectRelatedFieldListFilter
+
+
+# -----------------------
+# Paginación
+# -----------------------
+def _estimated_rows(model, using):
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+    return row[0] if row else -1
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Sin filtros ni búsqueda, en tablas de más de ESTIMATE_MIN_ROWS filas, el
+    total es la estimación del planner (actualizada por ANALYZE/autovacuum).
+    Con filtros se cuenta de verdad (el conjunto ya es más pequeño).
+    """
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if isinstance(qs, QuerySet) and not qs.query.where and connections[qs.db].vendor == "postgresql":
+            estimate = _estimated_rows(qs.model, qs.db)
+            if estimate >= ESTIMATE_MIN_ROWS:
+                return estimate
+        return super().count
+
+
+# -----------------------
+# Búsqueda
+# -----------------------
+def fulltext_sql(table, columns):
+    """Misma expresión que los índices GIN de la migración 0012 (si no coincide, Postgres no usa el índice)."""
+    parts = " || ' ' || ".join(f'coalesce("{table}"."{c}", \'\')' for c in columns)
+    return f"to_tsvector('{FULLTEXT_CONFIG}', {parts})"
+
+
+class FullTextSearchMixin:
+    """
+    `fulltext_fields`: columnas del índice, en el mismo orden que la migración.
+    `prefix_search_fields`: campos que además se buscan por prefijo (códigos).
+    Cada palabra de la búsqueda se trata como prefijo ("sol ener" -> sol:* & ener:*)
+    y vale si está en el índice o, con el icontains de siempre, en alguno de los
+    demás `search_fields` (taxonomy__name, sector__name...: otras tablas, fuera
+    del índice). Así "solar EU" encuentra las actividades solares de la taxonomía EU.
+    """
+    fulltext_fields = ()
+    prefix_search_fields = ()
+
+    def uses_fulltext(self, queryset):
+        return bool(self.fulltext_fields) and connections[queryset.db].vendor == "postgresql"
+
+    def fulltext_match(self, word):
+        sql = fulltext_sql(self.model._meta.db_table, self.fulltext_fields)
+        return Q(RawSQL(f"{sql} @@ to_tsquery('{FULLTEXT_CONFIG}', %s)", [f"{word}:*"], output_field=BooleanField()))
+
+    def get_search_results(self, request, queryset, search_term):
+        words = [w.lower() for w in _WORD_RE.findall(search_term or "")]
+        if not (words and self.uses_fulltext(queryset)):
+            return super().get_search_results(request, queryset, search_term)
+
+        indexed = {*self.fulltext_fields, *self.prefix_search_fields}
+        others = [f for f in self.get_search_fields(request) if f not in indexed]
+        condition = Q()
+        for word in words:
+            word_condition = self.fulltext_match(word)
+            for field in others:
+                word_condition |= Q(**{f"{field}__icontains": word})
+            condition &= word_condition
+        for field in self.prefix_search_fields:
+            condition |= Q(**{f"{field}__istartswith": search_term.strip()})
+        may_have_duplicates = any(lookup_spawns_duplicates(self.opts, field) for field in others)
+        return queryset.filter(condition), may_have_duplicates
+
+
+# -----------------------
+# Columnas del changelist
+# -----------------------
+class ChangelistOnlyMixin:
+    """`changelist_only`: campos (incluidos los de list_select_related) que carga el listado."""
+    changelist_only = ()
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        match = request.resolver_match
+        opts = self.model._meta
+        if self.changelist_only and match and match.url_name == f"{opts.app_label}_{opts.model_name}_changelist":
+            qs = qs.only(*self.changelist_only)
+        return qs
+
+
+# -----------------------
+# Textos compartidos
+# -----------------------
+class SharedTextForm(forms.ModelForm):
+    shared_texts = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in self.shared_texts:
+            self.initial.setdefault(name, getattr(self.instance, name))
+
+    def save(self, commit=True):
+        # interna los textos solo al guardar (no en cada validación fallida)
+        for name in self.shared_texts:
+            if name in self.cleaned_data:
+                setattr(self.instance, name, self.cleaned_data[name])
+        return super().save(commit)
+
+
+def shared_text_form(model):
+    """ModelForm de `model` con un textarea por texto compartido y sin los FK `*_ref`."""
+    names = shared_text_fields(model)
+    attrs = {name: forms.CharField(required=False, widget=AdminTextareaWidget) for name in names}
+    attrs["shared_texts"] = names
+    attrs["Meta"] = type("Meta", (), {
+        "model": model,
+        "exclude": tuple(name + SHARED_TEXT_REF_SUFFIX for name in names),
+    })
+    return type(f"{model.__name__}Form", (SharedTextForm,), attrs)
@@ -0,0 +1,51 @@
+"""
+Páginas del admin sin modelo detrás: informes de perfilado (profiling.py).
+
+    /admin/profiles/          últimos informes (anillo en PROFILE_DIR)
+    /admin/profiles/<id>/     flamegraph, línea de tiempo SQL y reparto del tiempo
+
+Se montan en backend/urls.py con admin.site.admin_view (solo staff).
+"""
+from django.contrib import admin
+from django.http import Http404
+from django.template.response import TemplateResponse
+
+from .profiling import MODE_SAMPLE, PROFILE_PARAM, flame_rows, list_profiles, load_profile
+
+SQL_TIMELINE_ROWS = 300
+
+
+def profile_list(request):
+    context = {
+        **admin.site.each_context(request),
+        "title": "Request profiles",
+        "profiles": list_profiles(),
+        "profile_param": PROFILE_PARAM,
+    }
+    return TemplateResponse(request, "admin/taxonomies_manager/profile_list.html", context)
+
+
+def profile_detail(request, profile_id):
+    report = load_profile(profile_id)
+    if report is None:
+        raise Http404("Profile not found")
+
+    total = report["total_ms"] or 1.0
+    split = [
+        {"name": name, "ms": ms, "percent": round(ms * 100 / total, 1)}
+        for name, ms in report["split"].items()
+    ]
+    queries = [
+        {**q, "left": round(q["start_ms"] * 100 / total, 3), "width": max(round(q["ms"] * 100 / total, 3), 0.1)}
+        for q in report["sql"][:SQL_TIMELINE_ROWS]
+    ]
+    context = {
+        **admin.site.each_context(request),
+        "title": f"Profile {report['method']} {report['path']}",
+        "report": report,
+        "split": split,
+        "queries": queries,
+        "hidden_queries": max(report["query_count"] - len(queries), 0),
+        "flame": flame_rows(report["samples"]) if report["mode"] == MODE_SAMPLE else [],
+    }
+    return TemplateResponse(request, "admin/taxonomies_manager/profile_detail.html", context)
@@ -0,0 +1,194 @@
+"""
+Variantes async (ASGI) de las lecturas "calientes" de la API.
+
+Mismo JSON que las vistas DRF de views.py: la cascada (objetivos, sectores,
+jerarquía) sale del grafo en memoria igual que allí, y el resto del ORM async
+reutilizando los serializers. Bajo ASGI (uvicorn) un worker puede atender
+muchos clientes lentos sin quedar bloqueado en cada request; para eso toda la
+cadena de middleware es async-capable (si no, Django pasa el request a un hilo).
+
+El ORM async ejecuta el SQL en un único hilo por request (sync_to_async con
+thread_sensitive=True), una consulta detrás de otra. Las consultas
+independientes (whitelists + criterios generales de adaptación) van con
+_fetch_concurrently: cada una en un hilo del pool y con su propia conexión.
+Los serializers corren en el event loop, donde un acceso perezoso a una FK
+lanza SynchronousOnlyOperation: toda relación serializada va en select_related.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import Q
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.renderers import JSONRenderer
+
+from .models import (
+    EnvironmentalObjective,
+    Activity, AdaptationWhitelist, AdaptationGeneralCriterion,
+)
+from .filters import is_int
+from .graph import get_graph
+from .serializers import (
+    ActivitySerializer, ActivitySlimSerializer,
+    AdaptationWhitelistSerializer, AdaptationGeneralCriterionSerializer,
+)
+from .texts import with_shared_texts
+
+SEARCH_MIN_LENGTH = 2
+SEARCH_MAX_RESULTS = 50
+
+
+# -----------------------
+# Helpers
+# -----------------------
+def _json(data, status=200):
+    # Mismo renderer que DRF para que la salida sea idéntica a la vista sync
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type="application/json")
+
+
+def _not_found(label):
+    return _json({"error": f"{label} not found"}, status=404)
+
+
+async def _fetch(qs):
+    return [obj async for obj in qs]
+
+
+def _fetch_on_own_connection(qs):
+    # Hilo del pool: abre su conexión y la cierra al terminar (no queda abierta en el pool)
+    try:
+        return list(qs)
+    finally:
+        connections.close_all()
+
+
+async def _fetch_concurrently(*querysets):
+    return await asyncio.gather(*(
+        sync_to_async(_fetch_on_own_connection, thread_sensitive=False)(qs) for qs in querysets
+    ))
+
+
+def _is_adaptation(objective):
+    raw = (objective.display_name or objective.generic_name or "").lower()
+    return "adapt" in raw
+
+
+# -----------------------
+# Vistas
+# -----------------------
+
+# Objetivos por taxonomía (grafo en memoria, ver graph.py)
+@require_GET
+async def environmental_objectives_by_taxonomy(request, taxonomy_id):
+    return _json((await sync_to_async(get_graph)()).objectives_of(taxonomy_id))
+
+
+# Sectores por taxonomía
+@require_GET
+async def sectors_by_taxonomy(request, taxonomy_id):
+    return _json((await sync_to_async(get_graph)()).sectors_of(taxonomy_id))
+
+
+# Sectores por taxonomía y objetivo (?only_case1=1 igual que la vista sync)
+@require_GET
+async def sectors_by_taxonomy_and_objective(request, taxonomy_id, objective_id):
+    only_case1 = request.GET.get("only_case1") in ("1", "true", "True")
+    graph = await sync_to_async(get_graph)()
+    return _json(graph.sectors_of(taxonomy_id, objective_id, only_case1=only_case1))
+
+
+# Jerarquía ligera: objetivos -> sectores -> subsectores (grafo en memoria, ver graph.py)
+@require_GET
+async def taxonomy_hierarchy(request, taxonomy_id):
+    data = (await sync_to_async(get_graph)()).hierarchy(taxonomy_id)
+    if data is None:
+        return _not_found("Taxonomy")
+    return _json(data)
+
+
+# Actividades por T/O/S
+@require_GET
+async def activities_by_filters(request, taxonomy_id, objective_id, sector_id):
+    qs = with_shared_texts(Activity.objects.all()).filter(
+        taxonomy_id=taxonomy_id,
+        environmental_objective_id=objective_id,
+        sector_id=sector_id,
+    )
+    activities = await _fetch(qs)
+    return _json(ActivitySlimSerializer(activities, many=True).data)
+
+
+# Criterios de una actividad
+@require_GET
+async def activity_criteria(request, activity_id):
+    activity = await (
+        with_shared_texts(Activity.objects.select_related("taxonomy", "environmental_objective", "sector"))
+        .filter(id=activity_id)
+        .afirst()
+    )
+    if activity is None:
+        return _not_found("Activity")
+    return _json(ActivitySerializer(activity).data)
+
+
+# Caso 2 + Caso 3 de un objetivo de adaptación (ambas consultas a la vez)
+@require_GET
+async def adaptation_by_objective(request, taxonomy_id, objective_id):
+    objective = await EnvironmentalObjective.objects.filter(
+        taxonomy_id=taxonomy_id, id=objective_id
+    ).afirst()
+    if objective is None:
+        return _not_found("Objective")
+    if not _is_adaptation(objective):
+        return _json({"adaptation_whitelists": [], "adaptation_general_criteria": []})
+
+    whitelists, general = await _fetch_concurrently(
+        AdaptationWhitelist.objects
+        .filter(environmental_objective_id=objective_id)
+        .select_related("taxonomy", "environmental_objective", "sector")
+        .order_by("sector__name", "title"),
+        AdaptationGeneralCriterion.objects
+        .filter(environmental_objective_id=objective_id)
+        .select_related("taxonomy", "environmental_objective")
+        .order_by("title"),
+    )
+
+    # Agrupar por sector (mismo formato que ObjectiveDetailSerializer)
+    grouped = {}
+    for it in whitelists:
+        sid = it.sector_id
+        if sid not in grouped:
+            grouped[sid] = {
+                "sector": {"id": sid, "name": it.sector.name if it.sector else None},
+                "entries": [],
+            }
+        grouped[sid]["entries"].append(AdaptationWhitelistSerializer(it).data)
+
+    return _json({
+        "adaptation_whitelists": list(grouped.values()),
+        "adaptation_general_criteria": AdaptationGeneralCriterionSerializer(general, many=True).data,
+    })
+
+
+# Búsqueda simple de actividades por nombre / código (?q=&taxonomy=)
+@require_GET
+async def search_activities(request):
+    q = (request.GET.get("q") or "").strip()
+    if len(q) < SEARCH_MIN_LENGTH:
+        return _json([])
+
+    qs = Activity.objects.filter(Q(name__icontains=q) | Q(taxonomy_code__icontains=q))
+    taxonomy_id = request.GET.get("taxonomy")
+    if taxonomy_id:
+        if not is_int(taxonomy_id):
+            return _json({"error": "taxonomy must be an integer id"}, status=400)
+        qs = qs.filter(taxonomy_id=int(taxonomy_id))
+
+    rows = await _fetch(
+        qs.values(
+            "id", "taxonomy_code", "name",
+            "taxonomy_id", "environmental_objective_id", "sector_id",
+        ).order_by("taxonomy_id", "taxonomy_code", "name")[:SEARCH_MAX_RESULTS]
+    )
+    return _json(rows)
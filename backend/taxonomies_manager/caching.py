@@ -0,0 +1,98 @@
+"""
+Cache de respuestas JSON de la API, con variantes comprimidas precalculadas.
+
+La clave incluye la versión del dataset (versioning.py), así que un import o
+una edición en el admin invalida todo sin tener que borrar entradas. La clave
+no incluye el Accept: las peticiones con parámetros de media type (p.ej.
+"application/json; indent=4") cambian el cuerpo y no pasan por la cache. Cada
+entrada guarda el JSON y sus variantes gzip/brotli; ApiCompressionMiddleware
+sirve la variante adecuada sin volver a comprimir.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .compression import compressed_variants
+from .versioning import get_dataset_cache_token
+
+CACHE_PREFIX = "api-response"
+# Marca interna (no llega desde HTTP) para renders que no deben tocar la cache,
+# p.ej. al construir releases: ahorra comprimir miles de documentos de una vez.
+# También salta el release publicado (requests perfilados, ver profiling.py).
+SKIP_CACHE_META = "taxonomies_manager.skip_response_cache"
+
+
+def response_cache_key(path: str, query_string: str, token: str) -> str:
+    raw = f"{path}?{query_string}".encode()
+    return f"{CACHE_PREFIX}:v{token}:{hashlib.sha1(raw).hexdigest()}"
+
+
+def _has_media_params(accept: str) -> bool:
+    """Algún media range con parámetros distintos de q (indent=4, version=2, charset, ...)."""
+    for media_range in accept.split(","):
+        for param in media_range.split(";")[1:]:
+            if param.partition("=")[0].strip().lower() not in ("", "q"):
+                return True
+    return False
+
+
+def _is_cacheable_request(request):
+    if request.method != "GET" or not settings.API_RESPONSE_CACHE_ENABLED:
+        return False
+    if request.META.get(SKIP_CACHE_META):
+        return False
+    accept = request.META.get("HTTP_ACCEPT", "")
+    if _has_media_params(accept):
+        return False
+    # La browsable API (HTML) no se cachea; solo JSON
+    fmt = request.GET.get("format")
+    if fmt:
+        return fmt == "json"
+    return "text/html" not in accept
+
+
+def _response_from_entry(entry):
+    response = HttpResponse(entry["content"], content_type=entry["content_type"])
+    response.precompressed = entry["variants"]
+    patch_vary_headers(response, ("Accept",))
+    return response
+
+
+def cache_api_response(view_func):
+    """
+    Decorador para vistas JSON de solo lectura (funciones @api_view o el
+    dispatch de un ViewSet vía method_decorator). Solo cachea respuestas 200.
+    """
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        if not _is_cacheable_request(request):
+            return view_func(request, *args, **kwargs)
+
+        key = response_cache_key(request.path, request.META.get("QUERY_STRING", ""), get_dataset_cache_token())
+        entry = cache.get(key)
+        if entry is not None:
+            return _response_from_entry(entry)
+
+        response = view_func(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        if hasattr(response, "render") and not response.is_rendered:
+            response.render()
+        content_type = response.get("Content-Type", "")
+        if not content_type.startswith("application/json"):
+            return response
+
+        entry = {
+            "content": response.content,
+            "content_type": content_type,
+            "variants": compressed_variants(response.content),
+        }
+        cache.set(key, entry, settings.API_RESPONSE_CACHE_TIMEOUT)
+        response.precompressed = entry["variants"]
+        return response
+
+    return _wrapped
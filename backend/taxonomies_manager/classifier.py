@@ -0,0 +1,267 @@
+"""
+Clasificador de descripciones de proyecto -> actividades / prácticas candidatas.
+
+Modelo TF-IDF sobre n-gramas de palabras con "hashing trick" (sin vocabulario):
+cada documento es nombre (con más peso) + descripción + criterios SC de una
+Activity o Practice, normalizado sin acentos igual que serializers._norm, así
+que EN y ES comparten pipeline. La matriz dispersa (filas L2-normalizadas) se
+guarda en disco junto a la versión del dataset y se carga una vez por worker;
+clasificar un lote es un único producto disperso Q @ X.T más un top-k con
+argpartition.
+
+    python manage.py build_classifier   # o automáticamente al final del import
+
+Los requests nunca construyen el modelo: si falta el artefacto de la versión
+actual (p. ej. tras editar en el admin) se sirve el más reciente en disco, y sin
+ninguno la vista responde 503. Cada artefacto se escribe en un directorio
+temporal y se publica con os.replace, así que un lector nunca ve uno a medias.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+
+from .models import Activity, Practice
+from .serializers import _norm
+from .versioning import get_dataset_version
+
+N_FEATURES = 2 ** 18
+NAME_WEIGHT = 3
+KEEP_ARTIFACTS = 2
+
+KIND_ACTIVITY = 0
+KIND_PRACTICE = 1
+KIND_LABELS = {KIND_ACTIVITY: "activity", KIND_PRACTICE: "practice"}
+RETRY_AFTER = 60  # segundos (cabecera Retry-After del 503 sin artefacto)
+
+_TRANSLATE = str.maketrans({c: " " for c in "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~\n\r\t"})
+
+
+# -----------------------
+# Vectorización
+# -----------------------
+def _tokens(text: str):
+    return [t for t in _norm(text).translate(_TRANSLATE).split() if len(t) > 1]
+
+
+def _features(text: str, weight: int = 1):
+    """Índices hasheados (unigramas + bigramas) con su peso, estables entre procesos (crc32)."""
+    toks = _tokens(text)
+    grams = toks + [f"{a} {b}" for a, b in zip(toks, toks[1:])]
+    return [(zlib.crc32(g.encode()) % N_FEATURES, weight) for g in grams]
+
+
+def _term_matrix(docs):
+    """docs: lista de listas (índice, peso) -> CSR con tf sublineal (1 + log tf)."""
+    rows, cols, vals = [], [], []
+    for i, feats in enumerate(docs):
+        for col, w in feats:
+            rows.append(i)
+            cols.append(col)
+            vals.append(w)
+    m = sparse.csr_matrix(
+        (np.asarray(vals, dtype=np.float32), (np.asarray(rows, dtype=np.int32), np.asarray(cols, dtype=np.int32))),
+        shape=(len(docs), N_FEATURES),
+    )
+    m.sum_duplicates()
+    m.data = 1.0 + np.log(m.data)
+    return m
+
+
+def _l2_normalize(m):
+    norms = np.sqrt(np.asarray(m.multiply(m).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms).dot(m), dtype=np.float32)
+
+
+def _activity_doc(row):
+    body = " ".join(filter(None, (
+        row["description"], row["substantial_contribution_criteria"], row["sc_criteria_green"],
+    )))
+    return _features(row["name"], NAME_WEIGHT) + _features(row["taxonomy_code"], NAME_WEIGHT) + _features(body)
+
+
+def _practice_doc(row):
+    body = " ".join(filter(None, (
+        row["practice_description"], row["eligible_practices"], row["green_practices"],
+    )))
+    return _features(row["practice_name"], NAME_WEIGHT) + _features(body)
+
+
+# -----------------------
+# Modelo
+# -----------------------
+class TextClassifier:
+    """Matriz TF-IDF + metadatos por fila (id, tipo, taxonomía, código, nombre)."""
+
+    def __init__(self, version, matrix, idf, ids, kinds, taxonomy_ids, labels):
+        self.version = version
+        self.matrix = matrix          # (n_docs, N_FEATURES) CSR, filas L2-normalizadas
+        self.idf = idf                # (N_FEATURES,) float32
+        self.ids = ids                # (n_docs,) int64
+        self.kinds = kinds            # (n_docs,) int8
+        self.taxonomy_ids = taxonomy_ids  # (n_docs,) int64
+        self.labels = labels          # lista [(taxonomy_code, name)]
+
+    # ---- construcción
+    @classmethod
+    def build(cls, version):
+        docs, ids, kinds, tax_ids, labels = [], [], [], [], []
+        for row in Activity.objects.values(
+            "id", "taxonomy_id", "taxonomy_code", "name", "description",
+            "substantial_contribution_criteria", "sc_criteria_green",
+        ).order_by("id"):
+            docs.append(_activity_doc(row))
+            ids.append(row["id"]); kinds.append(KIND_ACTIVITY); tax_ids.append(row["taxonomy_id"])
+            labels.append((row["taxonomy_code"], row["name"]))
+        for row in Practice.objects.values(
+            "id", "taxonomy_id", "practice_name", "practice_description",
+            "eligible_practices", "green_practices",
+        ).order_by("id"):
+            docs.append(_practice_doc(row))
+            ids.append(row["id"]); kinds.append(KIND_PRACTICE); tax_ids.append(row["taxonomy_id"])
+            labels.append(("", row["practice_name"]))
+
+        tf = _term_matrix(docs)
+        df = np.bincount(tf.indices, minlength=N_FEATURES).astype(np.float32)
+        idf = (np.log((1.0 + tf.shape[0]) / (1.0 + df)) + 1.0).astype(np.float32)
+        matrix = _l2_normalize(tf.multiply(idf).tocsr())
+        return cls(
+            version, matrix, idf,
+            np.asarray(ids, dtype=np.int64), np.asarray(kinds, dtype=np.int8),
+            np.asarray(tax_ids, dtype=np.int64), labels,
+        )
+
+    # ---- persistencia
+    def save(self, directory: Path):
+        """
+        Escribe en un temporal hermano y lo renombra: o el artefacto completo o nada.
+        Una versión del dataset da siempre la misma matriz, así que si ya está publicada se deja.
+        """
+        if (directory / "labels.json").exists():
+            return
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{directory.name}-", dir=directory.parent))
+        try:
+            sparse.save_npz(tmp / "matrix.npz", self.matrix)
+            np.savez(tmp / "meta.npz", idf=self.idf, ids=self.ids, kinds=self.kinds, taxonomy_ids=self.taxonomy_ids)
+            (tmp / "labels.json").write_text(
+                json.dumps({"version": self.version, "labels": self.labels}, ensure_ascii=False), encoding="utf-8",
+            )
+            tmp.chmod(0o755)
+            try:
+                os.replace(tmp, directory)
+            except OSError:
+                # Otro proceso publicó la misma versión entre medias: vale la suya
+                if not (directory / "labels.json").exists():
+                    raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: Path):
+        matrix = sparse.load_npz(directory / "matrix.npz").tocsr()
+        meta = np.load(directory / "meta.npz")
+        payload = json.loads((directory / "labels.json").read_text(encoding="utf-8"))
+        return cls(
+            payload["version"], matrix, meta["idf"], meta["ids"], meta["kinds"], meta["taxonomy_ids"],
+            [tuple(x) for x in payload["labels"]],
+        )
+
+    # ---- consulta
+    def vectorize(self, texts):
+        q = _term_matrix([_features(t) for t in texts])
+        return _l2_normalize(q.multiply(self.idf).tocsr())
+
+    def classify(self, texts, k=5, taxonomy_id=None, kind=None):
+        """Top-k candidatos (mayor coseno) para cada texto del lote."""
+        if not texts:
+            return []
+        scores = (self.vectorize(texts) @ self.matrix.T).toarray()
+
+        mask = np.ones(len(self.ids), dtype=bool)
+        if taxonomy_id is not None:
+            mask &= self.taxonomy_ids == taxonomy_id
+        if kind is not None:
+            mask &= self.kinds == kind
+        scores[:, ~mask] = -1.0
+
+        k = max(1, min(k, int(mask.sum()) or 1))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for i, cols in enumerate(top):
+            cols = cols[np.argsort(-scores[i, cols], kind="stable")]
+            results.append([
+                {
+                    "id": int(self.ids[c]),
+                    "kind": KIND_LABELS[int(self.kinds[c])],
+                    "taxonomy_id": int(self.taxonomy_ids[c]),
+                    "taxonomy_code": self.labels[c][0],
+                    "name": self.labels[c][1],
+                    "score": round(float(scores[i, c]), 4),
+                }
+                for c in cols if scores[i, c] > 0
+            ])
+        return results
+
+
+# -----------------------
+# Artefactos por versión + cache por worker
+# -----------------------
+def artifact_dir(version: int) -> Path:
+    return Path(settings.CLASSIFIER_DIR) / f"v{version}"
+
+
+def build_and_save(version=None) -> TextClassifier:
+    version = get_dataset_version() if version is None else version
+    clf = TextClassifier.build(version)
+    clf.save(artifact_dir(version))
+    _prune_artifacts(keep=version)
+    return clf
+
+
+def _artifacts():
+    """Directorios v<N> publicados, del más nuevo al más viejo (los temporales empiezan por punto)."""
+    base = Path(settings.CLASSIFIER_DIR)
+    return sorted(
+        (d for d in base.glob("v*") if d.is_dir() and d.name[1:].isdigit()),
+        key=lambda d: int(d.name[1:]), reverse=True,
+    )
+
+
+def _prune_artifacts(keep: int):
+    for d in _artifacts()[KEEP_ARTIFACTS:]:
+        if d.name != f"v{keep}":
+            shutil.rmtree(d, ignore_errors=True)
+
+
+class ClassifierUnavailable(Exception):
+    """No hay ningún artefacto en disco: hay que correr build_classifier (o un import)."""
+
+
+_lock = threading.Lock()
+_loaded = None
+
+
+def get_classifier() -> TextClassifier:
+    """Modelo de la versión actual: memoria del worker -> disco -> artefacto anterior más reciente."""
+    global _loaded
+    version = get_dataset_version()
+    if _loaded is not None and _loaded.version == version:
+        return _loaded
+    with _lock:
+        if _loaded is not None and _loaded.version == version:
+            return _loaded
+        latest = next((d for d in _artifacts() if int(d.name[1:]) <= version), None)
+        if latest is None:
+            raise ClassifierUnavailable(f"No classifier artifact in {settings.CLASSIFIER_DIR}")
+        if _loaded is None or f"v{_loaded.version}" != latest.name:
+            _loaded = TextClassifier.load(latest)
+        return _loaded
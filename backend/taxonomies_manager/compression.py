@@ -0,0 +1,71 @@
+"""
+Compresión de respuestas JSON de la API (gzip siempre, brotli si está instalado).
+
+Las funciones de aquí las usan tanto ApiCompressionMiddleware (compresión al
+vuelo) como la cache de respuestas (que guarda las variantes ya comprimidas).
+"""
+import gzip
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+
+def supported_encodings():
+    """Codificaciones que el servidor sabe producir, en orden de preferencia."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """'gzip, br;q=0.8, *;q=0' -> {'gzip': 1.0, 'br': 0.8, '*': 0.0}"""
+    accepted = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+def choose_encoding(header: str):
+    """Mejor codificación aceptada por el cliente (o None si ninguna)."""
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for enc in supported_encodings():
+        q = accepted.get(enc, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def compress(content: bytes, encoding: str, precompute: bool = False) -> bytes:
+    """
+    Comprime `content`. Con precompute=True se usa un nivel más alto, pensado
+    para payloads que se comprimen una vez y se sirven muchas (cache).
+    """
+    if encoding == "gzip":
+        # mtime=0 para que la misma entrada produzca siempre los mismos bytes
+        level = 9 if precompute else settings.API_COMPRESSION_GZIP_LEVEL
+        return gzip.compress(content, compresslevel=level, mtime=0)
+    if encoding == "br" and brotli is not None:
+        quality = 9 if precompute else settings.API_COMPRESSION_BROTLI_QUALITY
+        return brotli.compress(content, quality=quality)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def compressed_variants(content: bytes) -> dict:
+    """Todas las variantes soportadas de `content` (vacío si es menor que el umbral)."""
+    if len(content) < settings.API_COMPRESSION_MIN_SIZE:
+        return {}
+    return {enc: compress(content, enc, precompute=True) for enc in supported_encodings()}
@@ -0,0 +1,138 @@
+"""
+Correcciones de datos en bloque (set-based).
+
+Una corrección (DataFix) es una lista de pasos; cada paso es un
+`UPDATE ... WHERE` (FixStep) o, si el valor nuevo no se puede expresar en SQL,
+un `bulk_update` con la lista de campos (BulkFixStep). Todos los pasos van en
+una transacción; si uno falla no queda nada escrito.
+
+QuerySet.update() / bulk_update() no disparan señales, así que al terminar se
+registran las filas tocadas en el change log (versioning.record_changes) dentro
+de un único dataset_batch: una corrección = un cambio de versión. La versión y
+el log se escriben en la misma transacción que los UPDATE: si algo falla no
+queda ni el dato cambiado ni un log / versión de filas que no cambiaron.
+
+    class FixSomething(DataFix):
+        model = Activity
+        def steps(self):
+            qs = Activity.objects.filter(...)
+            yield FixStep("descripción", qs, campo=F("otro"))
+
+Ver DataFixCommand para el comando con --dry-run y el informe de filas.
+"""
+from abc import ABC, abstractmethod
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from .versioning import dataset_batch, discard_dataset_batch, flush_dataset_batch, record_changes
+
+BULK_BATCH_SIZE = 500
+
+
+class FixStep:
+    """UPDATE <tabla> SET <updates> WHERE <queryset>; una sola sentencia."""
+
+    def __init__(self, description, queryset, **updates):
+        self.description = description
+        self.queryset = queryset
+        self.updates = updates
+
+    def affected_ids(self, lock=False):
+        qs = self.queryset.select_for_update() if lock else self.queryset
+        return list(qs.order_by("pk").values_list("pk", flat=True))
+
+    def apply(self, ids):
+        # Mismo WHERE que affected_ids (filas bloqueadas con select_for_update)
+        return self.queryset.update(**self.updates) if ids else 0
+
+
+class BulkFixStep(FixStep):
+    """Para valores calculados en Python: `func(obj)` modifica `fields` y se guardan con bulk_update."""
+
+    def __init__(self, description, queryset, fields, func):
+        super().__init__(description, queryset)
+        self.fields = list(fields)
+        self.func = func
+
+    def apply(self, ids):
+        if not ids:
+            return 0
+        objs = list(self.queryset.only("pk", *self.fields))
+        for obj in objs:
+            self.func(obj)
+        return self.queryset.model.objects.bulk_update(objs, self.fields, batch_size=BULK_BATCH_SIZE)
+
+
+class StepResult:
+    def __init__(self, step, ids, updated=0):
+        self.step = step
+        self.ids = ids
+        self.updated = updated
+
+
+class DataFix(ABC):
+    """Base: definir `model` y `steps()` (generador de FixStep/BulkFixStep)."""
+    model = None
+    # Columnas para identificar filas en el informe
+    label_fields = ("pk",)
+
+    @abstractmethod
+    def steps(self):
+        ...
+
+    def run(self, dry_run=False):
+        results = []
+        with dataset_batch():
+            try:
+                with transaction.atomic():
+                    for step in self.steps():
+                        ids = step.affected_ids(lock=not dry_run)
+                        updated = 0 if dry_run else step.apply(ids)
+                        results.append(StepResult(step, ids, updated))
+
+                    if not dry_run:
+                        for result in results:
+                            if result.ids:
+                                record_changes(result.step.queryset.model, result.ids)
+                        flush_dataset_batch()
+            except BaseException:
+                # rollback: los cambios anotados tampoco van al change log
+                discard_dataset_batch()
+                raise
+        return results
+
+    def labels(self, ids):
+        rows = self.model.objects.filter(pk__in=ids).order_by("pk").values_list(*self.label_fields)
+        return [" | ".join(str(v) for v in row) for row in rows]
+
+
+class DataFixCommand(BaseCommand):
+    """Comando para una DataFix: `--dry-run` cuenta sin escribir; `--show N` lista filas afectadas."""
+    fix_class = None
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Solo cuenta las filas afectadas.")
+        parser.add_argument("--show", type=int, default=10, help="Filas de ejemplo por paso en el informe.")
+
+    def get_fix(self, **options):
+        return self.fix_class()
+
+    def handle(self, *args, **options):
+        fix = self.get_fix(**options)
+        if fix is None:
+            return
+        dry_run = options["dry_run"]
+        results = fix.run(dry_run=dry_run)
+
+        touched = set()
+        for result in results:
+            touched.update(result.ids)
+            verb = "afectaría" if dry_run else "actualizó"
+            self.stdout.write(f"- {result.step.description}: {verb} {len(result.ids)} filas")
+            for label in fix.labels(result.ids[:options["show"]]):
+                self.stdout.write(f"    {label}")
+
+        style = self.style.WARNING if dry_run else self.style.SUCCESS
+        prefix = "[dry-run] " if dry_run else ""
+        self.stdout.write(style(f"{prefix}{len(touched)} filas distintas en {len(results)} pasos."))
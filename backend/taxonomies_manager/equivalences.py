@@ -0,0 +1,184 @@
+"""
+Motor de equivalencias entre actividades de distintas taxonomías.
+
+Dos actividades de taxonomías diferentes se consideran candidatas si comparten
+una división económica del mismo sistema de códigos (economic_code_system; CIIU
+es la versión en español de ISIC) o alguna palabra significativa del nombre.
+Un "35.11" NACE y un "3511" ISIC no se comparan: la numeración no coincide.
+Para cada candidata:
+
+    code_score  1.0 misma clase (4 dígitos), 0.8 mismo grupo (3), 0.5 misma división (2)
+                del mismo sistema; si no hay sistema en común cuenta solo el nombre
+    name_score  Jaccard de tokens del nombre normalizado (sin acentos, sin stopwords)
+    score       ponderación de ambos (+ bonus si comparten objetivo genérico)
+
+Se guardan las MAX_PER_TAXONOMY mejores por (actividad, taxonomía destino) en
+ActivityEquivalence, en ambos sentidos.
+"""
+import re
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Activity, ActivityEquivalence
+from .serializers import _norm
+
+CODE_WEIGHT = 0.6
+NAME_WEIGHT = 0.4
+SAME_OBJECTIVE_BONUS = 0.1
+MIN_SCORE = 0.3
+MAX_PER_TAXONOMY = 5
+
+# Nombres distintos del mismo sistema de clasificación
+CODE_SYSTEM_ALIASES = {"CIIU": "ISIC"}
+
+_CODE_TOKEN_RE = re.compile(r"(?<![A-Za-z0-9])([A-Za-z]?)\s?(\d[\d.]*)")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset({
+    # EN
+    "and", "the", "for", "with", "from", "other", "of", "in", "on", "to", "or", "by",
+    "activities", "activity", "services", "new", "existing",
+    # ES
+    "del", "las", "los", "con", "por", "para", "que", "una", "otros", "otras",
+    "actividades", "actividad", "servicios", "nuevos", "nuevas", "existentes",
+})
+
+
+def code_system(system: str) -> str:
+    system = (system or "").strip().upper()
+    return CODE_SYSTEM_ALIASES.get(system, system)
+
+
+def economic_code_keys(code: str, system: str = "") -> set:
+    """
+    ('D35.11, F42.22', 'NACE') -> {('NACE', '3511'), ('NACE', '4222')};  ('A2', 'NACE') -> {('NACE', '02')}
+    Devuelve (sistema, dígitos 2 a 4): solo se comparan códigos del mismo sistema.
+    """
+    system = code_system(system)
+    keys = set()
+    for letter, digits in _CODE_TOKEN_RE.findall(code or ""):
+        digits = digits.replace(".", "")
+        if len(digits) == 1:
+            digits = "0" + digits
+        keys.add((system, digits[:4]))
+    return keys
+
+
+def name_tokens(name: str) -> set:
+    tokens = set()
+    for word in _WORD_RE.findall(_norm(name)):
+        if len(word) < 3 or word in STOPWORDS:
+            continue
+        # stemming mínimo EN/ES: plurales
+        if len(word) > 4 and word.endswith("es"):
+            word = word[:-2]
+        elif len(word) > 3 and word.endswith("s"):
+            word = word[:-1]
+        tokens.add(word)
+    return tokens
+
+
+def code_similarity(a: set, b: set) -> float:
+    best = 0.0
+    for sx, x in a:
+        for sy, y in b:
+            if sx != sy:
+                continue
+            if len(x) >= 4 and len(y) >= 4 and x[:4] == y[:4]:
+                return 1.0
+            if len(x) >= 3 and len(y) >= 3 and x[:3] == y[:3]:
+                best = max(best, 0.8)
+            elif x[:2] == y[:2]:
+                best = max(best, 0.5)
+    return best
+
+
+def name_similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class _Item:
+    __slots__ = ("id", "taxonomy_id", "objective", "codes", "systems", "tokens")
+
+    def __init__(self, row):
+        self.id = row["id"]
+        self.taxonomy_id = row["taxonomy_id"]
+        self.objective = row["environmental_objective__generic_name"]
+        self.codes = economic_code_keys(row["economic_code"], row["economic_code_system"])
+        self.systems = {system for system, _ in self.codes}
+        self.tokens = name_tokens(row["name"])
+
+
+def score_pair(a: _Item, b: _Item):
+    code = code_similarity(a.codes, b.codes)
+    name = name_similarity(a.tokens, b.tokens)
+    if a.systems & b.systems:
+        score = CODE_WEIGHT * code + NAME_WEIGHT * name
+    else:
+        score = name  # sin códigos comparables (falta alguno o son de otro sistema): solo nombre
+    if a.objective and a.objective == b.objective:
+        score += SAME_OBJECTIVE_BONUS
+    if code and name:
+        method = "code+name"
+    elif code:
+        method = "code"
+    else:
+        method = "name"
+    return min(score, 1.0), code, name, method
+
+
+def compute_equivalences(items):
+    """Genera (source, target, score, code, name, method) para pares candidatos (ambos sentidos)."""
+    by_division = defaultdict(list)
+    by_token = defaultdict(list)
+    for idx, it in enumerate(items):
+        for division in {(system, c[:2]) for system, c in it.codes}:
+            by_division[division].append(idx)
+        for tok in it.tokens:
+            by_token[tok].append(idx)
+
+    best = defaultdict(list)  # (source_id, target_taxonomy_id) -> [(score, ...)]
+    for idx, a in enumerate(items):
+        candidates = set()
+        for division in {(system, c[:2]) for system, c in a.codes}:
+            candidates.update(by_division[division])
+        for tok in a.tokens:
+            candidates.update(by_token[tok])
+        for j in candidates:
+            if j <= idx:
+                continue
+            b = items[j]
+            if b.taxonomy_id == a.taxonomy_id:
+                continue
+            score, code, name, method = score_pair(a, b)
+            if score < MIN_SCORE:
+                continue
+            best[(a.id, b.taxonomy_id)].append((score, code, name, method, b.id))
+            best[(b.id, a.taxonomy_id)].append((score, code, name, method, a.id))
+
+    for (source_id, target_taxonomy_id), matches in best.items():
+        matches.sort(key=lambda m: (-m[0], m[4]))
+        for score, code, name, method, target_id in matches[:MAX_PER_TAXONOMY]:
+            yield source_id, target_id, target_taxonomy_id, score, code, name, method
+
+
+def rebuild_activity_equivalences(batch_size=2000) -> int:
+    """Recalcula toda la tabla ActivityEquivalence. Devuelve cuántas filas quedaron."""
+    rows = Activity.objects.values(
+        "id", "taxonomy_id", "economic_code_system", "economic_code", "name", "environmental_objective__generic_name",
+    )
+    items = [_Item(r) for r in rows]
+    objs = [
+        ActivityEquivalence(
+            source_id=source_id, target_id=target_id, target_taxonomy_id=target_taxonomy_id,
+            score=round(score, 4), code_score=round(code, 4), name_score=round(name, 4), method=method,
+        )
+        for source_id, target_id, target_taxonomy_id, score, code, name, method in compute_equivalences(items)
+    ]
+    with transaction.atomic():
+        ActivityEquivalence.objects.all().delete()
+        ActivityEquivalence.objects.bulk_create(objs, batch_size=batch_size)
+    return len(objs)
@@ -0,0 +1,105 @@
+"""
+Filtros de querystring para los listados (multi-valor y negación).
+
+    ?taxonomy=1,2,3              -> taxonomy_id IN (1, 2, 3)
+    ?taxonomy=1&taxonomy=2       -> igual (parámetro repetido)
+    ?sector=!5,6                 -> sector_id NOT IN (5, 6)
+    ?taxonomy_code_prefix=CCM 4.,CCA 4.
+                                 -> taxonomy_code LIKE 'CCM 4.%' OR ... (sin distinguir mayúsculas)
+
+Los ids se validan (400 si no son enteros) y cada parámetro se traduce a un
+único IN sobre la columna indexada, así que N peticiones del frontend (una por
+taxonomía / objetivo / sector) pasan a ser una. Los filtros de texto libre
+(sector / hazard / division de Rwanda) no se parten por comas porque los
+valores pueden contenerlas: para varios valores se repite el parámetro.
+
+    query_filters = {"taxonomy": id_filter("taxonomy_id"), ...}
+    qs = apply_filters(qs, request.query_params, query_filters)
+"""
+from django.db.models import Q
+
+NEGATE_PREFIX = "!"
+
+
+class InvalidFilter(ValueError):
+    """Valor de filtro no válido; las vistas lo devuelven como 400."""
+
+
+def is_int(value) -> bool:
+    """Entero no negativo en dígitos ASCII: str.isdigit() también acepta "²" o "٣", que int() no siempre traga."""
+    return value.isascii() and value.isdigit()
+
+
+def _split(raw_values):
+    return [part.strip() for raw in raw_values for part in raw.split(",") if part.strip()]
+
+
+def _ids(name, parts):
+    if not all(is_int(part) for part in parts):
+        raise InvalidFilter(f"{name} must be a comma-separated list of integer ids")
+    return [int(part) for part in parts]
+
+
+def _in(lookup, values):
+    return Q(**{lookup: values[0]}) if len(values) == 1 else Q(**{f"{lookup}__in": values})
+
+
+def id_filter(lookup):
+    """?name=1,2,3 -> lookup IN (...)"""
+    def build(name, raw_values):
+        return _in(lookup, _ids(name, _split(raw_values)))
+    return build
+
+
+def value_filter(lookup, split=True):
+    """Valores literales; con split=False solo se admiten parámetros repetidos."""
+    def build(name, raw_values):
+        values = _split(raw_values) if split else [v.strip() for v in raw_values if v.strip()]
+        return _in(lookup, values)
+    return build
+
+
+def prefix_filter(lookup):
+    """?name=CCM 4.,CCA 4. -> lookup empieza por alguno de los prefijos."""
+    def build(name, raw_values):
+        condition = Q()
+        for prefix in _split(raw_values):
+            condition |= Q(**{f"{lookup}__istartswith": prefix})
+        return condition
+    return build
+
+
+def objective_filter(lookup="environmental_objective"):
+    """Ids de objetivo o nombres (generic_name / display_name); los nombres no se parten por comas."""
+    def build(name, raw_values):
+        ids, names = [], []
+        for raw in raw_values:
+            parts = _split([raw])
+            if parts and all(is_int(part) for part in parts):
+                ids.extend(int(part) for part in parts)
+            elif raw.strip():
+                names.append(raw.strip())
+        condition = Q()
+        if ids:
+            condition |= _in(f"{lookup}_id", ids)
+        if names:
+            condition |= _in(f"{lookup}__generic_name", names) | _in(f"{lookup}__display_name", names)
+        return condition
+    return build
+
+
+def apply_filters(qs, params, spec):
+    """Aplica `spec` ({parámetro: filtro}); los valores con "!" delante se excluyen."""
+    for name, build in spec.items():
+        include, exclude = [], []
+        for raw in params.getlist(name):
+            raw = raw.strip()
+            if raw.startswith(NEGATE_PREFIX):
+                exclude.append(raw[len(NEGATE_PREFIX):])
+            elif raw:
+                include.append(raw)
+        if any(v.strip(", ") for v in include):
+            qs = qs.filter(build(name, include))
+        if any(v.strip(", ") for v in exclude):
+            qs = qs.exclude(build(name, exclude))
+    return qs
@@ -0,0 +1,244 @@
+"""
+Grafo en memoria de las dimensiones del dataset (por worker, solo lectura).
+
+Taxonomías, objetivos, sectores, subsectores y (id, código, nombre) de las
+actividades y prácticas ocupan muy poco comparado con los textos de criterios, pero cada
+request de la cascada los volvía a pedir al ORM. Aquí se cargan una vez (seis
+consultas) en nodos con __slots__, con mapas id -> nodo y listas de hijos ya
+ordenadas; las vistas de jerarquía / sectores / objetivos responden sin tocar
+la base de datos.
+
+Los hijos se guardan en el orden en que los devuelve la base (mismo ORDER BY
+que usaban las vistas), así que la colación de Postgres se respeta.
+
+El grafo se reconstruye solo cuando cambia la versión del dataset (una consulta
+mínima por request, igual que el clasificador). Las seis consultas de la carga
+van en una sola transacción (REPEATABLE READ en Postgres): un bloque de import
+confirmado entre medias no deja sectores apuntando a objetivos que no se leyeron.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import connections, router, transaction
+
+from .models import Taxonomy, EnvironmentalObjective, Sector, Subsector, Activity, Practice
+from .querybudget import budget_exempt
+from .versioning import get_dataset_version
+
+
+class TaxonomyNode:
+    __slots__ = ("id", "name", "region", "language", "brief", "objectives", "sectors")
+
+    def __init__(self, id, name, region, language):
+        self.id = id
+        self.name = name
+        self.region = region
+        self.language = language
+        # = TaxonomyBriefSerializer
+        self.brief = {"id": id, "name": name, "region": region, "language": language}
+        self.objectives = []
+        self.sectors = []
+
+
+class ObjectiveNode:
+    __slots__ = ("id", "taxonomy", "generic_name", "display_name", "brief", "data", "sectors")
+
+    def __init__(self, id, taxonomy, generic_name, display_name):
+        self.id = id
+        self.taxonomy = taxonomy
+        self.generic_name = generic_name
+        self.display_name = display_name
+        # = EnvironmentalObjectiveBriefSerializer / EnvironmentalObjectiveSerializer
+        self.brief = {
+            "id": id, "generic_name": generic_name, "display_name": display_name,
+            "name": display_name or generic_name,
+        }
+        self.data = {
+            "id": id, "taxonomy": taxonomy.brief, "generic_name": generic_name, "display_name": display_name,
+        }
+        self.sectors = []
+
+
+class SectorNode:
+    __slots__ = ("id", "taxonomy", "objective", "name", "data", "subsectors", "activities", "practices", "has_case1")
+
+    def __init__(self, id, taxonomy, objective, name):
+        self.id = id
+        self.taxonomy = taxonomy
+        self.objective = objective
+        self.name = name
+        # = SectorSerializer
+        self.data = {"id": id, "taxonomy": taxonomy.brief, "environmental_objective": objective.brief, "name": name}
+        self.subsectors = []
+        self.activities = []
+        self.practices = []
+        # Alguna actividad con la misma taxonomía y objetivo que el sector (?only_case1)
+        self.has_case1 = False
+
+
+class SubsectorNode:
+    __slots__ = ("id", "sector", "name")
+
+    def __init__(self, id, sector, name):
+        self.id = id
+        self.sector = sector
+        self.name = name
+
+
+class ActivityNode:
+    __slots__ = ("id", "taxonomy_code", "name", "taxonomy_id", "objective_id", "sector", "subsector_id")
+
+    def __init__(self, id, taxonomy_code, name, taxonomy_id, objective_id, sector, subsector_id):
+        self.id = id
+        self.taxonomy_code = taxonomy_code
+        self.name = name
+        self.taxonomy_id = taxonomy_id
+        self.objective_id = objective_id
+        self.sector = sector
+        self.subsector_id = subsector_id
+
+
+class PracticeNode:
+    __slots__ = ("id", "name", "level", "sector", "subsector_id")
+
+    def __init__(self, id, name, level, sector, subsector_id):
+        self.id = id
+        self.name = name
+        self.level = level
+        self.sector = sector
+        self.subsector_id = subsector_id
+
+
+@contextmanager
+def _snapshot(alias):
+    """Lecturas consistentes entre consultas: una transacción con una única instantánea."""
+    connection = connections[alias]
+    # Dentro de una transacción ya abierta manda su aislamiento; SET TRANSACTION solo vale al principio
+    outermost = not connection.in_atomic_block
+    with transaction.atomic(using=alias):
+        if connection.vendor == "postgresql" and outermost:
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        yield
+
+
+class TaxonomyGraph:
+    def __init__(self, version):
+        self.version = version
+        self.taxonomies = {}
+        self.objectives = {}
+        self.sectors = {}
+        self.subsectors = {}
+        self.activities = {}
+        self.practices = {}
+
+    @classmethod
+    def load(cls, version=None):
+        # Mismo alias para todo (con réplicas, la del request) y una sola instantánea
+        alias = router.db_for_read(Taxonomy)
+        with _snapshot(alias):
+            return cls._load(alias, get_dataset_version() if version is None else version)
+
+    @classmethod
+    def _load(cls, alias, version):
+        graph = cls(version)
+
+        for row in Taxonomy.objects.using(alias).order_by("id").values_list("id", "name", "region", "language"):
+            graph.taxonomies[row[0]] = TaxonomyNode(*row)
+
+        objectives = EnvironmentalObjective.objects.using(alias).order_by("display_name", "generic_name", "id")
+        for oid, tid, generic, display in objectives.values_list("id", "taxonomy_id", "generic_name", "display_name"):
+            taxonomy = graph.taxonomies[tid]
+            node = graph.objectives[oid] = ObjectiveNode(oid, taxonomy, generic, display)
+            taxonomy.objectives.append(node)
+
+        sectors = Sector.objects.using(alias).order_by("name", "id")
+        for sid, tid, oid, name in sectors.values_list("id", "taxonomy_id", "environmental_objective_id", "name"):
+            taxonomy, objective = graph.taxonomies[tid], graph.objectives[oid]
+            node = graph.sectors[sid] = SectorNode(sid, taxonomy, objective, name)
+            taxonomy.sectors.append(node)
+            objective.sectors.append(node)
+
+        for ssid, sid, name in Subsector.objects.using(alias).order_by("name", "id").values_list("id", "sector_id", "name"):
+            sector = graph.sectors[sid]
+            sector.subsectors.append(graph.subsectors.setdefault(ssid, SubsectorNode(ssid, sector, name)))
+
+        activities = Activity.objects.using(alias).order_by("id").values_list(
+            "id", "taxonomy_code", "name", "taxonomy_id", "environmental_objective_id", "sector_id", "subsector_id",
+        )
+        for aid, code, name, tid, oid, sid, ssid in activities:
+            sector = graph.sectors[sid]
+            node = graph.activities[aid] = ActivityNode(aid, code, name, tid, oid, sector, ssid)
+            sector.activities.append(node)
+            if tid == sector.taxonomy.id and oid == sector.objective.id:
+                sector.has_case1 = True
+
+        practices = Practice.objects.using(alias).order_by("id").values_list("id", "practice_name", "practice_level", "sector_id", "subsector_id")
+        for pid, name, level, sid, ssid in practices:
+            sector = graph.sectors[sid]
+            node = graph.practices[pid] = PracticeNode(pid, name, level, sector, ssid)
+            sector.practices.append(node)
+        return graph
+
+    # -----------------------
+    # Consultas (mismo JSON que las vistas sobre el ORM)
+    # -----------------------
+    def objectives_of(self, taxonomy_id):
+        taxonomy = self.taxonomies.get(taxonomy_id)
+        return [o.data for o in taxonomy.objectives] if taxonomy else []
+
+    def sectors_of(self, taxonomy_id, objective_id=None, only_case1=False):
+        if objective_id is None:
+            taxonomy = self.taxonomies.get(taxonomy_id)
+            sectors = taxonomy.sectors if taxonomy else ()
+        else:
+            objective = self.objectives.get(objective_id)
+            sectors = [s for s in objective.sectors if s.taxonomy.id == taxonomy_id] if objective else ()
+        return [s.data for s in sectors if s.has_case1 or not only_case1]
+
+    def activity_ids(self, taxonomy_id, objective_id, sector_id):
+        sector = self.sectors.get(sector_id)
+        if sector is None:
+            return []
+        return [
+            a.id for a in sector.activities
+            if a.taxonomy_id == taxonomy_id and a.objective_id == objective_id
+        ]
+
+    def hierarchy(self, taxonomy_id):
+        """Objetivos -> sectores -> subsectores (sin criterios); None si no existe."""
+        taxonomy = self.taxonomies.get(taxonomy_id)
+        if taxonomy is None:
+            return None
+        return {
+            "id": taxonomy.id,
+            "name": taxonomy.name,
+            "objectives": [
+                {**o.brief, "sectors": [
+                    {
+                        "id": s.id,
+                        "name": s.name,
+                        "subsectors": [{"id": ss.id, "name": ss.name} for ss in s.subsectors],
+                    }
+                    for s in o.sectors if s.taxonomy is taxonomy
+                ]}
+                for o in taxonomy.objectives
+            ],
+        }
+
+
+_lock = threading.Lock()
+_loaded = None
+
+
+def get_graph() -> TaxonomyGraph:
+    """Grafo de la versión actual; se recarga (una vez por worker) cuando cambia la versión."""
+    global _loaded
+    version = get_dataset_version()
+    if _loaded is not None and _loaded.version == version:
+        return _loaded
+    with _lock:
+        if _loaded is None or _loaded.version != version:
+            with budget_exempt():
+                _loaded = TaxonomyGraph.load(version)
+        return _loaded
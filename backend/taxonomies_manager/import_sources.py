@@ -0,0 +1,261 @@
+"""
+Entradas de los importadores: un Excel o un directorio con un fichero por hoja.
+
+    data/db_taxonomies.xlsx          hoja 0 (principal), Rwanda_Adaptation, Caso2_CR_PAN, Caso3_CR_PAN
+    data/db_taxonomies/              main.parquet, Rwanda_Adaptation.parquet, Caso2_CR_PAN.parquet, ...
+    data/db_taxonomies/main.csv      (o un único .csv / .parquet: solo la hoja principal)
+
+El formato se detecta por la extensión (.xlsx/.xlsm/.xls, .csv, .csv.gz,
+.parquet). Todas las hojas se recorren por bloques de IMPORT_CHUNK_ROWS filas
+(CSV y Parquet sin cargar la hoja entera ni pagar el parseo del Excel; el Excel
+se abre una sola vez para todas las hojas). Los nombres de columna se normalizan
+igual que antes (strip + minúsculas) y el índice es continuo entre bloques
+(fila de Excel = índice + 2), así que `chunks(start)` puede retomar una hoja en
+la fila `start` (imports reanudables, ver import_db_taxonomies --resume).
+
+Los valores llegan como los leía read_excel: vacíos como NaN y, en CSV, todo
+como texto (los importadores hacen str() de cada celda). Los directorios se
+generan con `manage.py convert_import_file` (xlsx -> parquet / csv).
+"""
+import hashlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - dependencia opcional (solo Parquet)
+    pa = pq = None
+
+IMPORT_CHUNK_ROWS = 5000
+
+SHEET_MAIN = "main"
+SHEET_RWANDA = "Rwanda_Adaptation"
+SHEET_CASO2 = "CASO2"
+SHEET_CASO3 = "CASO3"
+
+# Nombres aceptados por hoja, en orden de preferencia. En un Excel la principal
+# es siempre la primera hoja; en un directorio, el fichero "main" (o "Sheet1").
+SHEET_ALIASES = {
+    SHEET_MAIN: ("main", "Sheet1"),
+    SHEET_RWANDA: ("Rwanda_Adaptation",),
+    SHEET_CASO2: ("CASO2 (CR-PAN)", "Caso2_CR_PAN", "CASO2", "Case2", "caso2"),
+    SHEET_CASO3: ("CASO3 (CR-PAN)", "Caso3_CR_PAN", "CASO3", "Case3", "caso3"),
+}
+
+EXCEL_SUFFIXES = (".xlsx", ".xlsm", ".xls")
+TABLE_SUFFIXES = (".parquet", ".csv", ".csv.gz")  # si hay varias para la misma hoja, gana la primera
+
+
+class ImportSourceError(ValueError):
+    """Entrada no válida o formato no soportado."""
+
+
+def normalize_columns(df):
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    return df
+
+
+def _suffix(path):
+    name = path.name.lower()
+    return next((s for s in EXCEL_SUFFIXES + TABLE_SUFFIXES if name.endswith(s)), None)
+
+
+def _stem(path):
+    return path.name[: -len(_suffix(path))]
+
+
+def file_digest(path):
+    """sha256 del contenido; un directorio cuenta con el nombre y contenido de sus ficheros de tabla."""
+    path = Path(path)
+    digest = hashlib.sha256()
+    files = sorted(f for f in path.iterdir() if _suffix(f) in TABLE_SUFFIXES) if path.is_dir() else [path]
+    for file in files:
+        digest.update(file.name.encode() + b"\0")
+        with open(file, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class Sheet(ABC):
+    """Una hoja: `columns` (normalizadas), `row_count` y `chunks(start)` -> DataFrames con índice continuo."""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+
+    @property
+    @abstractmethod
+    def columns(self):
+        ...
+
+    @property
+    @abstractmethod
+    def row_count(self):
+        ...
+
+    @abstractmethod
+    def _frames(self):
+        """Bloques de la hoja completa, con índice 0..n-1 continuo."""
+
+    def chunks(self, start=0):
+        """Bloques a partir de la fila `start` (los anteriores se leen pero no se devuelven)."""
+        for df in self._frames():
+            if len(df) and df.index[-1] >= start:
+                yield df.loc[start:] if df.index[0] < start else df
+
+    def rows(self, start=0):
+        """(índice, fila) como DataFrame.iterrows(), bloque a bloque."""
+        for chunk in self.chunks(start):
+            yield from chunk.iterrows()
+
+
+class ExcelSheet(Sheet):
+    def __init__(self, name, path, workbook, sheet_name):
+        super().__init__(name, path)
+        self.workbook = workbook
+        self.sheet_name = sheet_name
+        self._df = None
+
+    def _frame(self):
+        if self._df is None:
+            self._df = normalize_columns(self.workbook.parse(self.sheet_name))
+        return self._df
+
+    @property
+    def columns(self):
+        return list(self._frame().columns)
+
+    @property
+    def row_count(self):
+        return len(self._frame())
+
+    def _frames(self):
+        df = self._frame()
+        for offset in range(0, len(df), IMPORT_CHUNK_ROWS):
+            yield df.iloc[offset:offset + IMPORT_CHUNK_ROWS]
+
+
+class CSVSheet(Sheet):
+    @property
+    def columns(self):
+        return list(normalize_columns(pd.read_csv(self.path, nrows=0)).columns)
+
+    @property
+    def row_count(self):
+        # Una pasada solo por la primera columna (respeta comillas y saltos de línea dentro de celdas)
+        with pd.read_csv(self.path, dtype=str, usecols=[0], chunksize=IMPORT_CHUNK_ROWS * 10) as reader:
+            return sum(len(chunk) for chunk in reader)
+
+    def _frames(self):
+        # dtype=str: mismos textos que la celda original (sin "001" -> 1)
+        with pd.read_csv(self.path, dtype=str, chunksize=IMPORT_CHUNK_ROWS) as reader:
+            for chunk in reader:
+                yield normalize_columns(chunk)
+
+
+class ParquetSheet(Sheet):
+    def __init__(self, name, path):
+        if pq is None:
+            raise ImportSourceError(f"{path}: leer Parquet requiere pyarrow (pip install pyarrow)")
+        super().__init__(name, path)
+
+    @property
+    def columns(self):
+        return [str(c).strip().lower() for c in pq.read_schema(self.path).names]
+
+    @property
+    def row_count(self):
+        return pq.ParquetFile(self.path).metadata.num_rows
+
+    def _frames(self):
+        offset = 0
+        for batch in pq.ParquetFile(self.path).iter_batches(batch_size=IMPORT_CHUNK_ROWS):
+            # None -> NaN en columnas de texto, como read_excel
+            df = normalize_columns(batch.to_pandas()).fillna(np.nan)
+            df.index = pd.RangeIndex(offset, offset + len(df))
+            offset += len(df)
+            yield df
+
+
+class ImportSource:
+    """Resuelve las hojas por rol (SHEET_MAIN, SHEET_RWANDA, ...) en un Excel, un directorio o un fichero suelto."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.workbook = None
+        self.tables = {}  # nombre de hoja -> fichero (directorio / fichero suelto)
+        if not self.path.exists():
+            raise ImportSourceError(f"No existe: {self.path}")
+        if self.path.is_dir():
+            files = [f for f in self.path.iterdir() if _suffix(f) in TABLE_SUFFIXES]
+            for file in sorted(files, key=lambda f: TABLE_SUFFIXES.index(_suffix(f))):
+                self.tables.setdefault(_stem(file), file)
+            if not self.tables:
+                raise ImportSourceError(f"{self.path}: no hay ficheros {', '.join(TABLE_SUFFIXES)}")
+        elif _suffix(self.path) in EXCEL_SUFFIXES:
+            self.workbook = pd.ExcelFile(self.path)
+        elif _suffix(self.path) in TABLE_SUFFIXES:
+            self.tables = {SHEET_ALIASES[SHEET_MAIN][0]: self.path}
+        else:
+            raise ImportSourceError(f"{self.path}: formato no soportado (Excel, CSV o Parquet)")
+
+    def digest(self):
+        """Huella de la entrada (ver file_digest): identifica el checkpoint de un import."""
+        return file_digest(self.path)
+
+    @property
+    def format(self):
+        if self.workbook is not None:
+            return "xlsx"
+        return ", ".join(sorted({_suffix(f).lstrip(".") for f in self.tables.values()}))
+
+    def sheet(self, role):
+        """Hoja para `role`, o None si la entrada no la trae."""
+        aliases = SHEET_ALIASES[role]
+        if self.workbook is not None:
+            names = self.workbook.sheet_names
+            if role == SHEET_MAIN:
+                return ExcelSheet(role, self.path, self.workbook, 0) if names else None
+            name = next((n for n in aliases if n in names), None)
+            return ExcelSheet(role, self.path, self.workbook, name) if name else None
+
+        by_lower = {stem.lower(): file for stem, file in self.tables.items()}
+        file = next((by_lower[a.lower()] for a in aliases if a.lower() in by_lower), None)
+        if file is None:
+            return None
+        if _suffix(file) == ".parquet":
+            return ParquetSheet(role, file)
+        return CSVSheet(role, file)
+
+
+def convert_workbook(path, out_dir, fmt="parquet"):
+    """
+    Excel -> un fichero por hoja en `out_dir` ("main" para la primera, el resto
+    con su nombre). Devuelve [(hoja, fichero, filas)].
+    """
+    if fmt == "parquet" and pq is None:
+        raise ImportSourceError("Escribir Parquet requiere pyarrow (pip install pyarrow)")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    workbook = pd.ExcelFile(path)
+    written = []
+    for i, sheet_name in enumerate(workbook.sheet_names):
+        df = workbook.parse(sheet_name)
+        name = SHEET_ALIASES[SHEET_MAIN][0] if i == 0 else sheet_name
+        target = out_dir / f"{name}.{fmt}"
+        if fmt == "parquet":
+            # Columnas con números y textos mezclados: Arrow exige un tipo por
+            # columna; str() da lo mismo que el str() que hacen los importadores.
+            for col in df.columns[df.dtypes == object]:
+                df[col] = df[col].map(lambda v: v if pd.isna(v) or isinstance(v, str) else str(v))
+            df.columns = [str(c) for c in df.columns]
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), target)
+        else:
+            df.to_csv(target, index=False)
+        written.append((sheet_name, target, len(df)))
+    return written
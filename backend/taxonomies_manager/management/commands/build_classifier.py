@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from taxonomies_manager.classifier import build_and_save, artifact_dir
+
+
+class Command(BaseCommand):
+    help = "Construye la matriz TF-IDF del clasificador de descripciones para la versión actual del dataset."
+
+    def handle(self, *args, **options):
+        t0 = time.perf_counter()
+        clf = build_and_save()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Clasificador v{clf.version}: {clf.matrix.shape[0]} documentos, "
+            f"{clf.matrix.nnz} términos en {time.perf_counter() - t0:.2f}s -> {artifact_dir(clf.version)}"
+        ))
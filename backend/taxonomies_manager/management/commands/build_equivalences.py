@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from taxonomies_manager.equivalences import rebuild_activity_equivalences
+from taxonomies_manager.versioning import dataset_batch, mark_dataset_changed
+
+
+class Command(BaseCommand):
+    help = "Recalcula la tabla de equivalencias entre actividades de distintas taxonomías."
+
+    @dataset_batch()
+    def handle(self, *args, **options):
+        t0 = time.perf_counter()
+        total = rebuild_activity_equivalences()
+        # las respuestas cacheadas de /equivalents/ dependen de esta tabla
+        mark_dataset_changed()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Equivalencias: {total} filas en {time.perf_counter() - t0:.2f}s"
+        ))
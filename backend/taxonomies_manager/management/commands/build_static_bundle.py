@@ -0,0 +1,113 @@
+import hashlib
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from taxonomies_manager.models import Release, ReleaseBlob
+from taxonomies_manager.releases import (
+    iter_release_paths, render_path, get_published_release_id,
+)
+from taxonomies_manager.versioning import get_dataset_version
+
+MANIFEST_NAME = "manifest.json"
+DOCUMENTS_DIR = "d"
+_LOOKUP_CHUNK = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera un árbol estático de JSON (nombres por hash de contenido + manifest.json) con los "
+        "documentos que lee el frontend, para servirlo desde un CDN (VITE_STATIC_BUNDLE_URL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--out", type=str, default=None,
+                            help="Directorio de salida. Por defecto: settings.STATIC_BUNDLE_DIR")
+        parser.add_argument("--release", type=str, default=None,
+                            help="Release a exportar. Por defecto el publicado; si no hay, las tablas vivas.")
+        parser.add_argument("--live", action="store_true", help="Renderizar desde las tablas vivas aunque haya release.")
+        parser.add_argument("--prune", action="store_true",
+                            help="Borrar documentos que ya no están en el manifest (clientes con el manifest viejo dejarán de encontrarlos).")
+
+    def handle(self, *args, **options):
+        t0 = time.perf_counter()
+        out = Path(options["out"] or settings.STATIC_BUNDLE_DIR)
+        (out / DOCUMENTS_DIR).mkdir(parents=True, exist_ok=True)
+
+        release = self._release(options)
+        if release is not None:
+            source, version = release.name, release.dataset_version
+            contents = self._release_contents(release)
+        else:
+            source, version = "live", get_dataset_version()
+            contents = self._live_contents()
+
+        documents, written = {}, 0
+        for key, content in contents:
+            # Mismo hash que los blobs de releases; 16 hex bastan para nombres de fichero
+            name = f"{DOCUMENTS_DIR}/{hashlib.sha1(content).hexdigest()[:16]}.json"
+            documents[key] = name
+            target = out / name
+            if not target.exists():
+                target.write_bytes(content)
+                written += 1
+
+        manifest = {
+            "version": version,
+            "release": source,
+            "generated_at": timezone.now().isoformat(),
+            "documents": documents,
+        }
+        # Escritura atómica: los clientes nunca leen un manifest a medias
+        tmp = out / f".{MANIFEST_NAME}.tmp"
+        tmp.write_text(json.dumps(manifest, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+        tmp.replace(out / MANIFEST_NAME)
+
+        pruned = 0
+        if options["prune"]:
+            keep = {out / name for name in documents.values()}
+            for path in (out / DOCUMENTS_DIR).glob("*.json"):
+                if path not in keep:
+                    path.unlink()
+                    pruned += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Bundle {source} (v{version}): {len(documents)} documentos, {written} nuevos, "
+            f"{pruned} borrados en {time.perf_counter() - t0:.2f}s -> {out}"
+        ))
+
+    def _release(self, options):
+        if options["live"]:
+            return None
+        if options["release"]:
+            try:
+                return Release.objects.get(name=options["release"])
+            except Release.DoesNotExist:
+                raise CommandError(f"Release '{options['release']}' no existe")
+        release_id = get_published_release_id()
+        return Release.objects.get(id=release_id) if release_id else None
+
+    def _release_contents(self, release):
+        by_digest = {}
+        for key, digest in release.documents.items():
+            by_digest.setdefault(digest, []).append(key)
+        digests = list(by_digest)
+        for i in range(0, len(digests), _LOOKUP_CHUNK):
+            for digest, content in ReleaseBlob.objects.filter(
+                digest__in=digests[i:i + _LOOKUP_CHUNK]
+            ).values_list("digest", "content"):
+                for key in by_digest[digest]:
+                    yield key, bytes(content)
+
+    def _live_contents(self):
+        from django.test import RequestFactory
+
+        factory = RequestFactory()
+        for key in iter_release_paths():
+            content = render_path(key, factory)
+            if content is not None:
+                yield key, content
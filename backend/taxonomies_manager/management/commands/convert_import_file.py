@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from taxonomies_manager.import_sources import ImportSourceError, convert_workbook
+
+
+class Command(BaseCommand):
+    help = ("Convierte el Excel de import en un directorio con un fichero por hoja (Parquet o CSV), "
+            "que import_db_taxonomies / import_taxonomies aceptan con --file <directorio>.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", type=str, help="Excel de entrada. Por defecto: backend/data/db_taxonomies.xlsx")
+        parser.add_argument("--out", type=str, default=None,
+                            help="Directorio de salida. Por defecto, el Excel sin extensión (data/db_taxonomies/).")
+        parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+
+    def handle(self, *args, **options):
+        path = Path(options.get("file") or settings.BASE_DIR / "data" / "db_taxonomies.xlsx")
+        out_dir = Path(options["out"]) if options["out"] else path.with_suffix("")
+        try:
+            written = convert_workbook(path, out_dir, fmt=options["format"])
+        except (ImportSourceError, FileNotFoundError) as exc:
+            raise CommandError(str(exc))
+        for sheet_name, target, rows in written:
+            self.stdout.write(f"• {sheet_name} -> {target} ({rows} filas)")
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(written)} hojas en {out_dir}"))
@@ -1,37 +1,39 @@
-from django.core.management.base import BaseCommand
+from django.db.models import F, Value
+from taxonomies_manager.datafix import DataFix, DataFixCommand, FixStep
 from taxonomies_manager.models import Activity, Taxonomy
 
-class Command(BaseCommand):
-    help = "Fixes EU taxonomy activities with wrong sc_criteria_type and moves SC text if needed."
-
-    def handle(self, *args, **kwargs):
-        try:
-            eu_taxonomy = Taxonomy.objects.get(name="EU")
-            activities = Activity.objects.filter(taxonomy=eu_taxonomy)
+# Vacío o solo espacios (mismo criterio que str.strip() en Python)
+BLANK = r"^\s*$"
 
-            updated = 0
 
-            for activity in activities:
-                needs_update = False
+class FixEUActivities(DataFix):
+    model = Activity
+    label_fields = ("pk", "taxonomy_code", "name")
 
-                if activity.sc_criteria_type == "traffic_light":
-                    activity.sc_criteria_type = "threshold"
-                    needs_update = True
+    def __init__(self, taxonomy):
+        self.taxonomy = taxonomy
 
-                if (
-                    not activity.substantial_contribution_criteria.strip()
-                    and activity.sc_criteria_green
-                    and activity.sc_criteria_green.strip()
-                ):
-                    activity.substantial_contribution_criteria = activity.sc_criteria_green
-                    activity.sc_criteria_green = ""
-                    needs_update = True
+    def steps(self):
+        activities = Activity.objects.filter(taxonomy=self.taxonomy)
+        yield FixStep(
+            "sc_criteria_type traffic_light -> threshold",
+            activities.filter(sc_criteria_type="traffic_light"),
+            sc_criteria_type="threshold",
+        )
+        yield FixStep(
+            "SC vacío: mover sc_criteria_green a substantial_contribution_criteria",
+            activities.filter(substantial_contribution_criteria__regex=BLANK).exclude(sc_criteria_green__regex=BLANK),
+            substantial_contribution_criteria=F("sc_criteria_green"),
+            sc_criteria_green=Value(""),
+        )
 
-                if needs_update:
-                    activity.save()
-                    updated += 1
 
-            self.stdout.write(self.style.SUCCESS(f"{updated} activities were updated."))
+class Command(DataFixCommand):
+    help = "Fixes EU taxonomy activities with wrong sc_criteria_type and moves SC text if needed."
 
-        except Taxonomy.DoesNotExist:
+    def get_fix(self, **options):
+        eu_taxonomy = Taxonomy.objects.filter(name="EU").first()
+        if eu_taxonomy is None:
             self.stdout.write(self.style.ERROR("EU taxonomy not found."))
+            return None
+        return FixEUActivities(eu_taxonomy)
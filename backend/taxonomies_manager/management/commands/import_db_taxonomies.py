@@ -1,13 +1,26 @@
 # backend/taxonomies_manager/management/commands/import_db_taxonomies.py
+import time
+from datetime import timedelta
+
 import pandas as pd
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
+from django.db import transaction
 from taxonomies_manager.models import (
     Taxonomy, EnvironmentalObjective, Sector, Subsector,
     Activity, Practice, RwandaAdaptation,
-    AdaptationWhitelist, AdaptationGeneralCriterion,
+    AdaptationWhitelist, AdaptationGeneralCriterion, ImportCheckpoint,
 )
 from taxonomies_manager.constants import OBJECTIVE_MEO
+from taxonomies_manager.versioning import dataset_batch, flush_dataset_batch, discard_dataset_batch
+from taxonomies_manager.equivalences import rebuild_activity_equivalences
+from taxonomies_manager.texts import prune_shared_texts
+from taxonomies_manager.classifier import build_and_save as build_classifier
+from taxonomies_manager.releases import stage_release, publish_release, prune_releases, freeze_for_import
+from taxonomies_manager.warming import warm_caches, uses_local_memory_cache, WarmingError
+from taxonomies_manager.import_sources import (
+    ImportSource, ImportSourceError, SHEET_MAIN, SHEET_RWANDA, SHEET_CASO2, SHEET_CASO3,
+)
 
 
 # -----------------------
@@ -72,23 +85,66 @@ ALLOWED_PRACTICE_LEVELS = {
     "red",
 }
 
+# Orden fijo de las hojas: el checkpoint (hoja, fila) da por hechas las anteriores
+SHEET_ORDER = (SHEET_MAIN, SHEET_RWANDA, SHEET_CASO2, SHEET_CASO3)
+CHECKPOINT_COMMAND = "import_db_taxonomies"
+
+def new_counters():
+    return {"created": 0, "updated": 0, "skipped": 0, "warnings": 0}
+
+
+class Progress:
+    """Línea de progreso por bloque: filas hechas / total, filas/s de esta ejecución y ETA."""
+
+    def __init__(self, stdout, label, total, start=0):
+        self.stdout = stdout
+        self.label = label
+        self.total = total
+        self.start = start
+        self.t0 = time.perf_counter()
+
+    def update(self, done):
+        elapsed = time.perf_counter() - self.t0
+        rate = (done - self.start) / elapsed if elapsed > 0 else 0.0
+        line = f"   {self.label}: {done}/{self.total} filas"
+        if self.total:
+            line += f" ({100 * done / self.total:.1f}%)"
+        line += f" · {rate:.0f} filas/s"
+        if rate and self.total and done < self.total:
+            line += f" · ETA {timedelta(seconds=round((self.total - done) / rate))}"
+        self.stdout.write(line)
+
 # -----------------------
 # Command
 # -----------------------
 class Command(BaseCommand):
-    help = "Importa taxonomías desde Excel (hoja principal, Rwanda_Adaptation y Caso2/Caso3)."
+    help = ("Importa taxonomías desde Excel o un directorio CSV/Parquet con una hoja por fichero "
+            "(hoja principal, Rwanda_Adaptation y Caso2/Caso3). Escribe por bloques con checkpoint: "
+            "si se corta, --resume sigue desde el último bloque completo.")
 
     # ---- args
     def add_arguments(self, parser):
-        parser.add_argument("--file", type=str, help="Ruta del Excel. Por defecto: backend/data/db_taxonomies.xlsx")
+        parser.add_argument("--file", type=str,
+                            help="Excel, directorio con un .csv/.parquet por hoja o fichero suelto "
+                                 "(ver import_sources.py). Por defecto: backend/data/db_taxonomies.xlsx")
         parser.add_argument("--dry-run", action="store_true", help="No escribe en DB, solo valida y muestra logs.")
+        parser.add_argument("--resume", action="store_true",
+                            help="Continúa un import interrumpido desde su checkpoint (si el fichero no ha cambiado).")
+        parser.add_argument("--no-publish", action="store_true",
+                            help="Deja el release del import en 'staged' (publicar luego con `manage.py releases publish`).")
+        parser.add_argument("--warm", action="store_true",
+                            help="Al terminar, pre-calienta las caches de la API (ver `manage.py warm_caches`).")
+        parser.add_argument("--warm-url", type=str, default=None,
+                            help="Calienta ese servidor vía HTTP (implica --warm). Sin ella, --warm calienta en "
+                                 "proceso, que solo sirve con una cache compartida (CACHE_URL).")
+        parser.add_argument("--warm-budget", type=float, default=60.0, help="Tiempo máximo del calentado (s).")
         parser.add_argument("--caso3-sector", "--c3-sector", dest="caso3_sector", type=str, default=None,
                             help="(Hoy no se usa; CASO3 no lleva sector. Se mantiene por compatibilidad.)")
         parser.add_argument("--caso2-sector", "--c2-sector", dest="caso2_sector", type=str, default=None,
                             help="Sector a usar en CASO2 si faltara (normalmente viene en hoja).")
 
     # ---- CASO2
-    def import_case2(self, df, default_sector=None):
+    def import_case2_row(self, i, row, counters):
         """
         CASO2 (CR/PAN): whitelist por sector.
         Columnas esperadas (alias aceptados):
@@ -101,67 +157,55 @@ class Command(BaseCommand):
           - title (opcional; si falta lo generamos)
         * Cualquier columna DNSH se ignora (no aplica a whitelist).
         """
-        df = df.copy()
-        df.columns = [str(c).strip().lower() for c in df.columns]
-
-        if "taxonomy" not in df.columns or "environmental_objective" not in df.columns:
-            self.stdout.write(self.style.ERROR("❌ CASO2: faltan columnas mínimas 'taxonomy' o 'environmental_objective'"))
-            return (0, 0, 0, 0)
-
-        created = updated = skipped = warnings = 0
-
-        for _, row in df.iterrows():
-            taxonomy_name = pick(row, "taxonomy")
-            language = pick(row, "language", default="ES")
-            objective_name = pick(row, "environmental_objective", "objective", "objetivo")
-            objective_display_name = pick(row,"objective_original_name",default="")
-            sector_name = pick(row, "sector") or (default_sector or "").strip()
-            if not sector_name:
-                warnings += 1
-                self.stdout.write("⚠️  CASO2: no hay 'sector' ni --c2-sector; fila omitida.")
-                skipped += 1
-                continue
-
-            description = pick(row, "description", "descripcion", "descripción")
-            eligible = pick(row, "eligible_activities", "eligible_practices", "acciones_elegibles", "ejemplos")
-
-            given_title = pick(row, "title", "titulo", "título")
-            title = given_title or synth_title(eligible, description, sector_name)
-
-            # Upserts de jerarquía
-            taxonomy, _ = Taxonomy.objects.get_or_create(name=taxonomy_name)
-            objective, _ = EnvironmentalObjective.objects.get_or_create(
-                taxonomy=taxonomy,
-                generic_name=objective_name,
-            )
-            if objective_display_name:
-                if objective.display_name != objective_display_name:
-                    objective.display_name = objective_display_name
-                    objective.save(update_fields=["display_name"])
-            sector, _ = Sector.objects.get_or_create(
-                taxonomy=taxonomy, environmental_objective=objective, name=sector_name
-            )
-
-            obj, was_created = AdaptationWhitelist.objects.update_or_create(
-                taxonomy=taxonomy,
-                environmental_objective=objective,
-                sector=sector,
-                title=title,
-                defaults={
-                    "language": language,
-                    "description": description,
-                    "eligible_activities": eligible,
-                },
-            )
-            if was_created:
-                created += 1
-            else:
-                updated += 1
+        taxonomy_name = pick(row, "taxonomy")
+        language = pick(row, "language", default="ES")
+        objective_name = pick(row, "environmental_objective", "objective", "objetivo")
+        objective_display_name = pick(row,"objective_original_name",default="")
+        sector_name = pick(row, "sector") or (self.c2_sector or "").strip()
+        if not sector_name:
+            counters["warnings"] += 1
+            self.stdout.write("⚠️  CASO2: no hay 'sector' ni --c2-sector; fila omitida.")
+            counters["skipped"] += 1
+            return
+
+        description = pick(row, "description", "descripcion", "descripción")
+        eligible = pick(row, "eligible_activities", "eligible_practices", "acciones_elegibles", "ejemplos")
+
+        given_title = pick(row, "title", "titulo", "título")
+        title = given_title or synth_title(eligible, description, sector_name)
+
+        # Upserts de jerarquía
+        taxonomy, _ = Taxonomy.objects.get_or_create(name=taxonomy_name)
+        objective, _ = EnvironmentalObjective.objects.get_or_create(
+            taxonomy=taxonomy,
+            generic_name=objective_name,
+        )
+        if objective_display_name:
+            if objective.display_name != objective_display_name:
+                objective.display_name = objective_display_name
+                objective.save(update_fields=["display_name"])
+        sector, _ = Sector.objects.get_or_create(
+            taxonomy=taxonomy, environmental_objective=objective, name=sector_name
+        )
 
-        return created, updated, skipped, warnings
+        obj, was_created = AdaptationWhitelist.objects.update_or_create(
+            taxonomy=taxonomy,
+            environmental_objective=objective,
+            sector=sector,
+            title=title,
+            defaults={
+                "language": language,
+                "description": description,
+                "eligible_activities": eligible,
+            },
+        )
+        if was_created:
+            counters["created"] += 1
+        else:
+            counters["updated"] += 1
 
     # ---- CASO3
-    def import_case3(self, df):
+    def import_case3_row(self, i, row, counters):
         """
         CASO3 (CR/PAN): criterios generales sin sector.
         Columnas esperadas (alias aceptados):
@@ -172,244 +216,187 @@ class Command(BaseCommand):
           - subcriteria  (alias: 'subcriterio', 'detalle')  [opcional]
           - title (opcional; si falta lo generamos)
         """
-        df = df.copy()
-        df.columns = [str(c).strip().lower() for c in df.columns]
-
-        if "taxonomy" not in df.columns or "environmental_objective" not in df.columns:
-            self.stdout.write(self.style.ERROR("❌ CASO3: faltan columnas mínimas 'taxonomy' o 'environmental_objective'"))
-            return (0, 0, 0, 0)
-
-        created = updated = skipped = warnings = 0
-
-        for _, row in df.iterrows():
-            taxonomy_name = pick(row, "taxonomy")
-            language = pick(row, "language", default="ES")
-            objective_name = pick(row, "environmental_objective", "objective", "objetivo")
-            objective_display_name = pick(row,"objective_original_name",default="")
-            criteria = pick(row, "criteria", "criterion", "criterio")
-            subcriteria = pick(row, "subcriteria", "subcriterio", "detalle")
-
-            given_title = pick(row, "title", "titulo", "título")
-            title = given_title or synth_title(criteria, subcriteria, objective_name)
-
-            taxonomy, _ = Taxonomy.objects.get_or_create(name=taxonomy_name)
+        taxonomy_name = pick(row, "taxonomy")
+        language = pick(row, "language", default="ES")
+        objective_name = pick(row, "environmental_objective", "objective", "objetivo")
+        objective_display_name = pick(row,"objective_original_name",default="")
+        criteria = pick(row, "criteria", "criterion", "criterio")
+        subcriteria = pick(row, "subcriteria", "subcriterio", "detalle")
+
+        given_title = pick(row, "title", "titulo", "título")
+        title = given_title or synth_title(criteria, subcriteria, objective_name)
+
+        taxonomy, _ = Taxonomy.objects.get_or_create(name=taxonomy_name)
+        objective, _ = EnvironmentalObjective.objects.get_or_create(
+            taxonomy=taxonomy, generic_name=objective_name,
+        )
+        if objective_display_name:
+            if objective.display_name != objective_display_name:
+                objective.display_name = objective_display_name
+                objective.save(update_fields=["display_name"])
+
+        obj, was_created = AdaptationGeneralCriterion.objects.update_or_create(
+            taxonomy=taxonomy,
+            environmental_objective=objective,
+            title=title,
+            subcriteria= subcriteria,
+            defaults={
+                "language": language,
+                "criteria": criteria,
+            },
+        )
+        if was_created:
+            counters["created"] += 1
+        else:
+            counters["updated"] += 1
+
+    # ---- Hoja principal
+    def import_main_row(self, i, row, counters):
+        excel_rownum = i + 2
+        taxonomy_name   = to_str(row.get("taxonomy"))
+        region          = to_str(row.get("region")) or "Other"
+        language        = to_str(row.get("language")) or "EN"
+        objective_name  = to_str(row.get("environmental_objective"))
+        objective_display_name = pick(row,"objective_original_name",default="")
+        sector_name     = to_str(row.get("sector"))
+        subsector_name  = to_str(row.get("subsector")) or ""
+
+        economic_code_system = to_str(row.get("economic_code_system"))
+        economic_code   = to_str(row.get("economic_code"))
+        taxonomy_code   = to_str(row.get("taxonomy_code"))
+        activity_name   = to_str(row.get("activity"))
+        contribution    = to_str(row.get("contribution_type")) or "None"
+        description     = to_str(row.get("description"))
+
+        sc_type         = norm_lower(row.get("sc_criteria_type") or "threshold")
+        sc_threshold    = to_str(row.get("substantial_contribution_criteria"))
+        sc_green        = to_str(row.get("sc_criteria_green"))
+        sc_amber        = to_str(row.get("sc_criteria_amber"))
+        sc_red          = to_str(row.get("sc_criteria_red"))
+        non_elig        = to_str(row.get("non_eligibility_criteria"))
+
+        dnsh_climate_mitigation = to_str(row.get("dnsh_climate_mitigation"))
+        dnsh_climate_adaptation = to_str(row.get("dnsh_climate_adaptation"))
+        dnsh_water      = to_str(row.get("dnsh_water"))
+        dnsh_circular   = to_str(row.get("dnsh_circular_economy"))
+        dnsh_pollution  = to_str(row.get("dnsh_pollution_prevention"))
+        dnsh_biodiv     = to_str(row.get("dnsh_biodiversity"))
+        dnsh_land       = to_str(row.get("dnsh_land_management"))
+
+        practice_level  = norm_practice_level(row.get("practice_level"))
+        practice_name   = to_str(row.get("practice_name"))
+        practice_desc   = to_str(row.get("practice_description"))
+        eligible_prac   = to_str(row.get("eligible_practices"))
+        non_eligible_prac = to_str(row.get("non_eligible_practices"))
+        green_prac      = to_str(row.get("green_practices"))
+        amber_prac      = to_str(row.get("amber_practices"))
+        red_prac        = to_str(row.get("red_practices"))
+
+        if self.dry_run:
+            taxonomy = Taxonomy(name=taxonomy_name)
+            objective = EnvironmentalObjective(
+                taxonomy=taxonomy,
+                generic_name=objective_name,
+                display_name=objective_display_name or objective_name,
+            )
+            sector = Sector(taxonomy=taxonomy, environmental_objective=objective, name=sector_name)
+            subsector = Subsector(sector=sector, name=subsector_name) if subsector_name else None
+        else:
+            taxonomy, _ = Taxonomy.objects.update_or_create(
+                name=taxonomy_name,
+                defaults={
+                    "region": region,
+                    "language": language,
+                    **({"dnsh_general": to_str(row.get("dnsh_general"))} if "dnsh_general" in self.main_columns else {}),
+                    **({"mss": to_str(row.get("mss"))} if "mss" in self.main_columns else {}),
+                },
+            )
             objective, _ = EnvironmentalObjective.objects.get_or_create(
-                taxonomy=taxonomy, generic_name=objective_name,
+                taxonomy=taxonomy, 
+                generic_name=objective_name,
             )
             if objective_display_name:
                 if objective.display_name != objective_display_name:
                     objective.display_name = objective_display_name
                     objective.save(update_fields=["display_name"])
-
-            obj, was_created = AdaptationGeneralCriterion.objects.update_or_create(
-                taxonomy=taxonomy,
-                environmental_objective=objective,
-                title=title,
-                subcriteria= subcriteria,
-                defaults={
-                    "language": language,
-                    "criteria": criteria,
-                },
+            sector, _ = Sector.objects.get_or_create(
+                taxonomy=taxonomy, environmental_objective=objective, name=sector_name
             )
-            if was_created:
-                created += 1
+            subsector = None
+            if subsector_name:
+                subsector, _ = Subsector.objects.get_or_create(sector=sector, name=subsector_name)
+
+        # Activity (clásica)
+        if activity_name:
+            if sc_type not in ("threshold", "traffic_light"):
+                warn(self.stdout, f"[fila {excel_rownum}] sc_criteria_type '{sc_type}' inválido; usando 'threshold'.", counters)
+                sc_type = "threshold"
+
+            defaults = {
+                "economic_code_system": economic_code_system,
+                "economic_code": economic_code,
+                "name": activity_name,
+                "description": description,
+                "contribution_type": contribution,
+                "sc_criteria_type": sc_type,
+                "substantial_contribution_criteria": sc_threshold if sc_type == "threshold" else "",
+                "sc_criteria_green": sc_green if sc_type == "traffic_light" else "",
+                "sc_criteria_amber": sc_amber if sc_type == "traffic_light" else "",
+                "sc_criteria_red": sc_red if sc_type == "traffic_light" else "",
+                "non_eligibility_criteria": non_elig,
+                "dnsh_climate_mitigation": dnsh_climate_mitigation,
+                "dnsh_climate_adaptation": dnsh_climate_adaptation,
+                "dnsh_water": dnsh_water,
+                "dnsh_circular_economy": dnsh_circular,
+                "dnsh_pollution_prevention": dnsh_pollution,
+                "dnsh_biodiversity": dnsh_biodiv,
+                "dnsh_land_management": dnsh_land,
+            }
+
+            if self.dry_run:
+                counters["created"] += 1
             else:
-                updated += 1
-
-        return created, updated, skipped, warnings
-
-    # ---- handle
-    def handle(self, *args, **options):
-        base_default = settings.BASE_DIR / "data" / "db_taxonomies.xlsx"
-        file_path = options.get("file") or base_default
-        dry_run = options.get("dry_run", False)
-        c2_sector_override = options.get("caso2_sector")
-
-        g_created = g_updated = g_skipped = g_warnings = 0
-
-        # ========= Hoja principal =========
-        self.stdout.write("• Importando hoja principal (Sheet1 / Main)…")
-        df_main = pd.read_excel(file_path, sheet_name=0)
-        df_main.columns = [str(c).strip().lower() for c in df_main.columns]
-
-        main_counters = {"created": 0, "updated": 0, "skipped": 0, "warnings": 0}
-
-        if "dnsh_general" not in df_main.columns:
-            warn(self.stdout, "Columna opcional ausente: 'dnsh_general'. Se continuará sin ella.", main_counters)
-        if "mss" not in df_main.columns:
-            warn(self.stdout, "Columna opcional ausente: 'mss'. Se continuará sin ella.", main_counters)
-
-        for i, row in df_main.iterrows():
-            excel_rownum = i + 2
-            taxonomy_name   = to_str(row.get("taxonomy"))
-            region          = to_str(row.get("region")) or "Other"
-            language        = to_str(row.get("language")) or "EN"
-            objective_name  = to_str(row.get("environmental_objective"))
-            objective_display_name = pick(row,"objective_original_name",default="")
-            sector_name     = to_str(row.get("sector"))
-            subsector_name  = to_str(row.get("subsector")) or ""
-
-            economic_code_system = to_str(row.get("economic_code_system"))
-            economic_code   = to_str(row.get("economic_code"))
-            taxonomy_code   = to_str(row.get("taxonomy_code"))
-            activity_name   = to_str(row.get("activity"))
-            contribution    = to_str(row.get("contribution_type")) or "None"
-            description     = to_str(row.get("description"))
-
-            sc_type         = norm_lower(row.get("sc_criteria_type") or "threshold")
-            sc_threshold    = to_str(row.get("substantial_contribution_criteria"))
-            sc_green        = to_str(row.get("sc_criteria_green"))
-            sc_amber        = to_str(row.get("sc_criteria_amber"))
-            sc_red          = to_str(row.get("sc_criteria_red"))
-            non_elig        = to_str(row.get("non_eligibility_criteria"))
-
-            dnsh_climate_mitigation = to_str(row.get("dnsh_climate_mitigation"))
-            dnsh_climate_adaptation = to_str(row.get("dnsh_climate_adaptation"))
-            dnsh_water      = to_str(row.get("dnsh_water"))
-            dnsh_circular   = to_str(row.get("dnsh_circular_economy"))
-            dnsh_pollution  = to_str(row.get("dnsh_pollution_prevention"))
-            dnsh_biodiv     = to_str(row.get("dnsh_biodiversity"))
-            dnsh_land       = to_str(row.get("dnsh_land_management"))
-
-            practice_level  = norm_practice_level(row.get("practice_level"))
-            practice_name   = to_str(row.get("practice_name"))
-            practice_desc   = to_str(row.get("practice_description"))
-            eligible_prac   = to_str(row.get("eligible_practices"))
-            non_eligible_prac = to_str(row.get("non_eligible_practices"))
-            green_prac      = to_str(row.get("green_practices"))
-            amber_prac      = to_str(row.get("amber_practices"))
-            red_prac        = to_str(row.get("red_practices"))
-
-            if dry_run:
-                taxonomy = Taxonomy(name=taxonomy_name)
-                objective = EnvironmentalObjective(
+                obj, was_created = Activity.objects.update_or_create(
                     taxonomy=taxonomy,
-                    generic_name=objective_name,
-                    display_name=objective_display_name or objective_name,
-                )
-                sector = Sector(taxonomy=taxonomy, environmental_objective=objective, name=sector_name)
-                subsector = Subsector(sector=sector, name=subsector_name) if subsector_name else None
-            else:
-                taxonomy, _ = Taxonomy.objects.update_or_create(
-                    name=taxonomy_name,
-                    defaults={
-                        "region": region,
-                        "language": language,
-                        **({"dnsh_general": to_str(row.get("dnsh_general"))} if "dnsh_general" in df_main.columns else {}),
-                        **({"mss": to_str(row.get("mss"))} if "mss" in df_main.columns else {}),
-                    },
-                )
-                objective, _ = EnvironmentalObjective.objects.get_or_create(
-                    taxonomy=taxonomy, 
-                    generic_name=objective_name,
-                )
-                if objective_display_name:
-                    if objective.display_name != objective_display_name:
-                        objective.display_name = objective_display_name
-                        objective.save(update_fields=["display_name"])
-                sector, _ = Sector.objects.get_or_create(
-                    taxonomy=taxonomy, environmental_objective=objective, name=sector_name
+                    environmental_objective=objective,
+                    sector=sector,
+                    subsector=subsector,
+                    name=activity_name,
+                    defaults={**defaults, "taxonomy_code": taxonomy_code},
                 )
-                subsector = None
-                if subsector_name:
-                    subsector, _ = Subsector.objects.get_or_create(sector=sector, name=subsector_name)
-
-            # Activity (clásica)
-            if activity_name:
-                if sc_type not in ("threshold", "traffic_light"):
-                    warn(self.stdout, f"[fila {excel_rownum}] sc_criteria_type '{sc_type}' inválido; usando 'threshold'.", main_counters)
-                    sc_type = "threshold"
-
-                defaults = {
-                    "economic_code_system": economic_code_system,
-                    "economic_code": economic_code,
-                    "name": activity_name,
-                    "description": description,
-                    "contribution_type": contribution,
-                    "sc_criteria_type": sc_type,
-                    "substantial_contribution_criteria": sc_threshold if sc_type == "threshold" else "",
-                    "sc_criteria_green": sc_green if sc_type == "traffic_light" else "",
-                    "sc_criteria_amber": sc_amber if sc_type == "traffic_light" else "",
-                    "sc_criteria_red": sc_red if sc_type == "traffic_light" else "",
-                    "non_eligibility_criteria": non_elig,
-                    "dnsh_climate_mitigation": dnsh_climate_mitigation,
-                    "dnsh_climate_adaptation": dnsh_climate_adaptation,
-                    "dnsh_water": dnsh_water,
-                    "dnsh_circular_economy": dnsh_circular,
-                    "dnsh_pollution_prevention": dnsh_pollution,
-                    "dnsh_biodiversity": dnsh_biodiv,
-                    "dnsh_land_management": dnsh_land,
-                }
-
-                if dry_run:
-                    main_counters["created"] += 1
-                else:
-                    obj, was_created = Activity.objects.update_or_create(
-                        taxonomy=taxonomy,
-                        environmental_objective=objective,
-                        sector=sector,
-                        subsector=subsector,
-                        name=activity_name,
-                        defaults={**defaults, "taxonomy_code": taxonomy_code},
-                    )
-                    if was_created:
-                        main_counters["created"] += 1
-                    else:
-                        main_counters["updated"] += 1
-
-            # Practice (MEO)
-            # Practice (solo cuando el objetivo es MEO)
-            if practice_level and (objective.generic_name == OBJECTIVE_MEO):
-                norm_level = practice_level
-                if norm_level not in ALLOWED_PRACTICE_LEVELS:
-                    warn(
-                        self.stdout,
-                        f"[fila {excel_rownum}] practice_level '{practice_level}' no reconocido, "
-                        f"permitido: {sorted(list(ALLOWED_PRACTICE_LEVELS))}",
-                        main_counters,
-                    )
+                if was_created:
+                    counters["created"] += 1
                 else:
-                    if norm_level in {"amber", "red"}:
-                        filled = sum(bool(x) for x in [green_prac, amber_prac, red_prac])
-                        if filled != 1:
-                            warn(self.stdout, f"[fila {excel_rownum}] MEO traffic: debe haber exactamente UNA de green/amber/red con texto.", main_counters)
-                            main_counters["skipped"] += 1
-                        else:
-                            defaults = {
-                                "practice_description": practice_desc,
-                                "eligible_practices": "",
-                                "non_eligible_practices": "",
-                                "green_practices": green_prac,
-                                "amber_practices": amber_prac,
-                                "red_practices": red_prac,
-                            }
-                            if dry_run:
-                                main_counters["created"] += 1
-                            else:
-                                obj, was_created = Practice.objects.update_or_create(
-                                    taxonomy=taxonomy,
-                                    environmental_objective=objective,
-                                    sector=sector,
-                                    subsector=subsector,
-                                    practice_level=norm_level,
-                                    practice_name=practice_name,
-                                    defaults=defaults,
-                                )
-                                if was_created:
-                                    main_counters["created"] += 1
-                                else:
-                                    main_counters["updated"] += 1
+                    counters["updated"] += 1
+
+        # Practice (MEO)
+        # Practice (solo cuando el objetivo es MEO)
+        if practice_level and (objective.generic_name == OBJECTIVE_MEO):
+            norm_level = practice_level
+            if norm_level not in ALLOWED_PRACTICE_LEVELS:
+                warn(
+                    self.stdout,
+                    f"[fila {excel_rownum}] practice_level '{practice_level}' no reconocido, "
+                    f"permitido: {sorted(list(ALLOWED_PRACTICE_LEVELS))}",
+                    counters,
+                )
+            else:
+                if norm_level in {"amber", "red"}:
+                    filled = sum(bool(x) for x in [green_prac, amber_prac, red_prac])
+                    if filled != 1:
+                        warn(self.stdout, f"[fila {excel_rownum}] MEO traffic: debe haber exactamente UNA de green/amber/red con texto.", counters)
+                        counters["skipped"] += 1
                     else:
                         defaults = {
                             "practice_description": practice_desc,
-                            "eligible_practices": eligible_prac,
-                            "non_eligible_practices": non_eligible_prac,
-                            "green_practices": "",
-                            "amber_practices": "",
-                            "red_practices": "",
+                            "eligible_practices": "",
+                            "non_eligible_practices": "",
+                            "green_practices": green_prac,
+                            "amber_practices": amber_prac,
+                            "red_practices": red_prac,
                         }
-                        if dry_run:
-                            main_counters["created"] += 1
+                        if self.dry_run:
+                            counters["created"] += 1
                         else:
                             obj, was_created = Practice.objects.update_or_create(
                                 taxonomy=taxonomy,
@@ -421,134 +408,311 @@ class Command(BaseCommand):
                                 defaults=defaults,
                             )
                             if was_created:
-                                main_counters["created"] += 1
+                                counters["created"] += 1
                             else:
-                                main_counters["updated"] += 1
-            
-            elif practice_level and (objective.generic_name != OBJECTIVE_MEO):
-                # Seguridad: si el Excel trae "practice_level" para adaptación u otros objetivos, lo ignoramos.
-                warn(self.stdout, f"[fila {excel_rownum}] practice_level presente pero objetivo no es MEO; se ignora fila de Practice.", main_counters)
+                                counters["updated"] += 1
+                else:
+                    defaults = {
+                        "practice_description": practice_desc,
+                        "eligible_practices": eligible_prac,
+                        "non_eligible_practices": non_eligible_prac,
+                        "green_practices": "",
+                        "amber_practices": "",
+                        "red_practices": "",
+                    }
+                    if self.dry_run:
+                        counters["created"] += 1
+                    else:
+                        obj, was_created = Practice.objects.update_or_create(
+                            taxonomy=taxonomy,
+                            environmental_objective=objective,
+                            sector=sector,
+                            subsector=subsector,
+                            practice_level=norm_level,
+                            practice_name=practice_name,
+                            defaults=defaults,
+                        )
+                        if was_created:
+                            counters["created"] += 1
+                        else:
+                            counters["updated"] += 1
+
+        elif practice_level and (objective.generic_name != OBJECTIVE_MEO):
+            # Seguridad: si el Excel trae "practice_level" para adaptación u otros objetivos, lo ignoramos.
+            warn(self.stdout, f"[fila {excel_rownum}] practice_level presente pero objetivo no es MEO; se ignora fila de Practice.", counters)
+
+
+        if activity_name and sc_type == "threshold" and not sc_threshold:
+            warn(self.stdout, f"[fila {excel_rownum}] clásico/threshold sin substantial_contribution_criteria. Se importa igual pero revisa.", counters)
+
+    # ---- Rwanda_Adaptation
+    def import_rwanda_row(self, i, row, counters):
+        excel_rownum = i + 2
+        taxonomy_name = to_str(row.get("taxonomy"))
+        language = to_str(row.get("language")) or "EN"
+
+        environmental_objective = to_str(row.get("environmental_objective"))
+        sector = to_str(row.get("sector"))
+        hazard = to_str(row.get("hazard"))
+        division = to_str(row.get("division"))
+        investment = to_str(row.get("investment"))
+
+        expected_effect = to_str(row.get("expected effect")) or to_str(row.get("expected_effect"))
+        expected_result = to_str(row.get("expected result")) or to_str(row.get("expected_result"))
+
+        type_ = to_str(row.get("type"))
+        level = to_str(row.get("level"))
+        criteria_type = to_str(row.get("criteria type")) or to_str(row.get("criteria_type"))
+
+        generic_dnsh = to_str(row.get("generic dnsh")) or to_str(row.get("generic_dnsh"))
+        source_ref = to_str(row.get("source_ref"))
+
+        taxonomy, _ = Taxonomy.objects.get_or_create(name=taxonomy_name)
+
+        defaults = {
+            "language": language,
+            "expected_effect": expected_effect,
+            "expected_result": expected_result,
+            "type": type_,
+            "level": level,
+            "criteria_type": criteria_type,
+            "generic_dnsh": generic_dnsh,
+            "source_ref": source_ref,
+        }
+
+        if not (taxonomy_name and environmental_objective and sector and hazard and division and investment):
+            warn(self.stdout, f"[fila {excel_rownum}] RWANDA: faltan campos clave para unique_together, se omite.", counters)
+            counters["skipped"] += 1
+            return
+
+        obj, was_created = RwandaAdaptation.objects.update_or_create(
+            taxonomy=taxonomy,
+            environmental_objective=environmental_objective,
+            sector=sector,
+            hazard=hazard,
+            division=division,
+            investment=investment,
+            type=type_,
+            level=level,
+            criteria_type=criteria_type,
+            expected_effect=expected_effect,
+            expected_result=expected_result,
+            defaults=defaults,
+        )
+        if was_created:
+            counters["created"] += 1
+        else:
+            counters["updated"] += 1
+
+    # ---- columnas
+    def check_columns(self, sheet, label, counters):
+        """Avisos / columnas mínimas antes de la primera fila. False = la hoja no se importa."""
+        columns = sheet.columns
+        if sheet.name == SHEET_MAIN:
+            if "dnsh_general" not in columns:
+                warn(self.stdout, "Columna opcional ausente: 'dnsh_general'. Se continuará sin ella.", counters)
+            if "mss" not in columns:
+                warn(self.stdout, "Columna opcional ausente: 'mss'. Se continuará sin ella.", counters)
+        elif sheet.name in (SHEET_CASO2, SHEET_CASO3):
+            if "taxonomy" not in columns or "environmental_objective" not in columns:
+                self.stdout.write(self.style.ERROR(f"❌ {label}: faltan columnas mínimas 'taxonomy' o 'environmental_objective'"))
+                return False
+        return True
+
+    # ---- checkpoint
+    def open_checkpoint(self, source, resume):
+        """Checkpoint de este import: el guardado si --resume y la entrada no ha cambiado; si no, uno nuevo."""
+        digest = source.digest()
+        previous = ImportCheckpoint.objects.filter(command=CHECKPOINT_COMMAND).first()
+        if resume and previous is not None and previous.source_hash == digest:
+            self.stdout.write(
+                f"↻ Reanudando import de {previous.source}: {previous.sheet}, {previous.offset} filas hechas "
+                f"(checkpoint {previous.updated_at:%Y-%m-%d %H:%M})"
+            )
+            self.touch_checkpoint(previous)
+            return previous
+        if resume:
+            reason = "el checkpoint es de otra versión de la entrada" if previous else "no hay checkpoint"
+            self.stdout.write(self.style.WARNING(f"⚠️  --resume: {reason}; se importa desde el principio."))
+        elif previous is not None:
+            self.stdout.write(
+                f"• Se descarta el checkpoint de un import a medias ({previous.sheet}@{previous.offset}); "
+                f"para continuarlo, --resume."
+            )
+        checkpoint, _ = ImportCheckpoint.objects.update_or_create(
+            command=CHECKPOINT_COMMAND,
+            defaults={"source": str(source.path), "source_hash": digest, "sheet": SHEET_MAIN, "offset": 0, "counters": {}},
+        )
+        return checkpoint
 
+    def touch_checkpoint(self, checkpoint):
+        # Latido: un checkpoint sin actualizar en IMPORT_STALE_AFTER_MINUTES se da por abandonado
+        checkpoint.save(update_fields=["updated_at"])
 
-            if activity_name and sc_type == "threshold" and not sc_threshold:
-                warn(self.stdout, f"[fila {excel_rownum}] clásico/threshold sin substantial_contribution_criteria. Se importa igual pero revisa.", main_counters)
+    def save_checkpoint(self, checkpoint, sheet, offset, counters):
+        checkpoint.sheet = sheet
+        checkpoint.offset = offset
+        checkpoint.counters = {**checkpoint.counters, sheet: dict(counters)}
+        checkpoint.save(update_fields=["sheet", "offset", "counters", "updated_at"])
 
-        self.stdout.write(
-            f"✅ MAIN listo. created={main_counters['created']} updated={main_counters['updated']} "
-            f"skipped={main_counters['skipped']} warnings={main_counters['warnings']}"
+    # ---- hoja por bloques
+    def import_sheet(self, sheet, label, title, handle_row, checkpoint=None):
+        """
+        Recorre la hoja por bloques de IMPORT_CHUNK_ROWS filas. Cada bloque se
+        escribe en una transacción junto con su incremento de versión / change
+        log y el checkpoint: un fallo deja la DB en el último bloque completo y
+        --resume sigue desde ahí (las hojas anteriores al checkpoint no se releen).
+        """
+        counters = new_counters()
+        start = 0
+        if checkpoint is not None:
+            counters.update(checkpoint.counters.get(sheet.name, {}))
+            position, done_at = SHEET_ORDER.index(sheet.name), SHEET_ORDER.index(checkpoint.sheet)
+            if position < done_at:
+                self.stdout.write(self.summary(f"{label} listo (checkpoint)", counters))
+                return counters
+            if position == done_at:
+                start = checkpoint.offset
+
+        if start:
+            self.stdout.write(f"• Reanudando {title} desde la fila {start + 2}…")
+        else:
+            self.stdout.write(f"• Importando {title}…")
+            if not self.check_columns(sheet, label, counters):
+                self.stdout.write(self.summary(f"{label} listo", counters))
+                return counters
+
+        progress = Progress(self.stdout, label, sheet.row_count, start)
+        for chunk in sheet.chunks(start):
+            offset = int(chunk.index[-1]) + 1
+            try:
+                with transaction.atomic():
+                    for i, row in chunk.iterrows():
+                        handle_row(i, row, counters)
+                    flush_dataset_batch()
+                    if checkpoint is not None:
+                        self.save_checkpoint(checkpoint, sheet.name, offset, counters)
+            except BaseException:
+                # rollback del bloque: sus cambios tampoco van al change log
+                discard_dataset_batch()
+                raise
+            progress.update(offset)
+
+        self.stdout.write(self.summary(f"{label} listo", counters))
+        return counters
+
+    @staticmethod
+    def summary(title, counters):
+        return (
+            f"✅ {title}. created={counters['created']} updated={counters['updated']} "
+            f"skipped={counters['skipped']} warnings={counters['warnings']}"
         )
-        g_created += main_counters["created"]; g_updated += main_counters["updated"]
-        g_skipped += main_counters["skipped"]; g_warnings += main_counters["warnings"]
 
-        # ========= Rwanda_Adaptation =========
+    # ---- caches
+    def warm(self, base_url, budget):
+        """El import ya está publicado: un problema al calentar se avisa pero no hace fallar el comando."""
+        if base_url is None and uses_local_memory_cache():
+            self.stdout.write(self.style.WARNING(
+                "⚠️ CACHES sin calentar: con cache locmem no llega a los workers (usa --warm-url o CACHE_URL compartido)."
+            ))
+            return
         try:
-            self.stdout.write("• Importando hoja Rwanda_Adaptation…")
-            df_rw = pd.read_excel(file_path, sheet_name="Rwanda_Adaptation")
-            df_rw.columns = [str(c).strip().lower() for c in df_rw.columns]
-
-            rw_counters = {"created": 0, "updated": 0, "skipped": 0, "warnings": 0}
-
-            for i, row in df_rw.iterrows():
-                excel_rownum = i + 2
-                taxonomy_name = to_str(row.get("taxonomy"))
-                language = to_str(row.get("language")) or "EN"
-
-                environmental_objective = to_str(row.get("environmental_objective"))
-                sector = to_str(row.get("sector"))
-                hazard = to_str(row.get("hazard"))
-                division = to_str(row.get("division"))
-                investment = to_str(row.get("investment"))
-
-                expected_effect = to_str(row.get("expected effect")) or to_str(row.get("expected_effect"))
-                expected_result = to_str(row.get("expected result")) or to_str(row.get("expected_result"))
-
-                type_ = to_str(row.get("type"))
-                level = to_str(row.get("level"))
-                criteria_type = to_str(row.get("criteria type")) or to_str(row.get("criteria_type"))
-
-                generic_dnsh = to_str(row.get("generic dnsh")) or to_str(row.get("generic_dnsh"))
-                source_ref = to_str(row.get("source_ref"))
+            stats = warm_caches(base_url=base_url, budget=budget)
+        except WarmingError as exc:
+            self.stderr.write(self.style.ERROR(f"❌ CACHES: {exc}"))
+            return
+        self.stdout.write(
+            f"✅ CACHES calentadas={stats['warmed']} errores={stats['failed']} "
+            f"sin_tiempo={stats['skipped']} en {stats['elapsed']:.2f}s"
+        )
 
-                taxonomy, _ = Taxonomy.objects.get_or_create(name=taxonomy_name)
+    # ---- handle
+    @dataset_batch()
+    def handle(self, *args, **options):
+        base_default = settings.BASE_DIR / "data" / "db_taxonomies.xlsx"
+        file_path = options.get("file") or base_default
+        self.dry_run = options.get("dry_run", False)
+        self.c2_sector = options.get("caso2_sector")
 
-                defaults = {
-                    "language": language,
-                    "expected_effect": expected_effect,
-                    "expected_result": expected_result,
-                    "type": type_,
-                    "level": level,
-                    "criteria_type": criteria_type,
-                    "generic_dnsh": generic_dnsh,
-                    "source_ref": source_ref,
-                }
-
-                if not (taxonomy_name and environmental_objective and sector and hazard and division and investment):
-                    warn(self.stdout, f"[fila {excel_rownum}] RWANDA: faltan campos clave para unique_together, se omite.", rw_counters)
-                    rw_counters["skipped"] += 1
+        try:
+            source = ImportSource(file_path)
+        except ImportSourceError as exc:
+            raise CommandError(str(exc))
+        main_sheet = source.sheet(SHEET_MAIN)
+        if main_sheet is None:
+            raise CommandError(f"{file_path}: falta la hoja principal")
+        self.main_columns = main_sheet.columns
+
+        # Sin checkpoint en dry-run: no hay nada que reanudar
+        checkpoint = None if self.dry_run else self.open_checkpoint(source, options.get("resume"))
+        if checkpoint is not None:
+            # Con el checkpoint abierto la API sirve solo el release publicado: si no lo hay, se congela el actual
+            frozen = freeze_for_import()
+            if frozen is not None:
+                self.stdout.write(f"• Sin release publicado: se publica {frozen.name} con el estado previo al import.")
+
+        # Varios nombres de hoja comunes para Rwanda / CASO2 / CASO3 (ver import_sources.SHEET_ALIASES)
+        steps = {
+            SHEET_MAIN: ("MAIN", f"hoja principal (Sheet1 / Main, {source.format})", self.import_main_row),
+            SHEET_RWANDA: ("RWANDA", "hoja Rwanda_Adaptation", self.import_rwanda_row),
+            SHEET_CASO2: ("CASO2", "hoja CASO2 (CR-PAN)", self.import_case2_row),
+            SHEET_CASO3: ("CASO3", "hoja CASO3 (CR-PAN)", self.import_case3_row),
+        }
+        totals = new_counters()
+        try:
+            for role in SHEET_ORDER:
+                sheet = main_sheet if role == SHEET_MAIN else source.sheet(role)
+                if sheet is None:
+                    if role == SHEET_RWANDA:
+                        self.stdout.write("• Hoja Rwanda_Adaptation no encontrada (se omite).")
                     continue
-
-                obj, was_created = RwandaAdaptation.objects.update_or_create(
-                    taxonomy=taxonomy,
-                    environmental_objective=environmental_objective,
-                    sector=sector,
-                    hazard=hazard,
-                    division=division,
-                    investment=investment,
-                    type=type_,
-                    level=level,
-                    criteria_type=criteria_type,
-                    expected_effect=expected_effect,
-                    expected_result=expected_result,
-                    defaults=defaults,
+                label, title, handle_row = steps[role]
+                counters = self.import_sheet(sheet, label, title, handle_row, checkpoint)
+                for key in totals:
+                    totals[key] += counters[key]
+        except BaseException:
+            if checkpoint is not None:
+                self.stderr.write(
+                    f"❌ Import interrumpido. Escrito hasta {checkpoint.sheet}, {checkpoint.offset} filas; "
+                    f"--resume continúa desde ahí."
                 )
-                if was_created:
-                    rw_counters["created"] += 1
-                else:
-                    rw_counters["updated"] += 1
-
-            self.stdout.write(
-                f"✅ RWANDA listo. created={rw_counters['created']} updated={rw_counters['updated']} "
-                f"skipped={rw_counters['skipped']} warnings={rw_counters['warnings']}"
-            )
-            g_created += rw_counters["created"]; g_updated += rw_counters["updated"]
-            g_skipped += rw_counters["skipped"]; g_warnings += rw_counters["warnings"]
-        except ValueError:
-            self.stdout.write("• Hoja Rwanda_Adaptation no encontrada (se omite).")
-
-        # ========= CASO2 (CR-PAN) =========
-        # Intentamos varios nombres de hoja comunes
-        for sheet_name in ["CASO2 (CR-PAN)", "Caso2_CR_PAN", "CASO2", "Case2", "caso2"]:
-            try:
-                df_c2 = pd.read_excel(file_path, sheet_name=sheet_name)
-                self.stdout.write("• Importando hoja CASO2 (CR-PAN)…")
-                c2_created, c2_updated, c2_skipped, c2_warn = self.import_case2(df_c2, default_sector=c2_sector_override)
-                self.stdout.write(
-                    f"✅ CASO2 listo. created={c2_created} updated={c2_updated} skipped={c2_skipped} warnings={c2_warn}"
-                )
-                g_created += c2_created; g_updated += c2_updated
-                g_skipped += c2_skipped; g_warnings += c2_warn
-                break
-            except ValueError:
-                # hoja no existe con ese nombre; probamos el siguiente
-                continue
-
-        # ========= CASO3 (CR-PAN) =========
-        for sheet_name in ["CASO3 (CR-PAN)", "Caso3_CR_PAN", "CASO3", "Case3", "caso3"]:
-            try:
-                df_c3 = pd.read_excel(file_path, sheet_name=sheet_name)
-                self.stdout.write("• Importando hoja CASO3 (CR-PAN)…")
-                c3_created, c3_updated, c3_skipped, c3_warn = self.import_case3(df_c3)
-                self.stdout.write(
-                    f"✅ CASO3 listo. created={c3_created} updated={c3_updated} skipped={c3_skipped} warnings={c3_warn}"
-                )
-                g_created += c3_created; g_updated += c3_updated
-                g_skipped += c3_skipped; g_warnings += c3_warn
-                break
-            except ValueError:
-                continue
+            raise
+
+        # ========= Equivalencias entre taxonomías =========
+        if not self.dry_run:
+            self.touch_checkpoint(checkpoint)
+            total_eq = rebuild_activity_equivalences()
+            self.stdout.write(f"✅ EQUIVALENCIAS listas. rows={total_eq}")
+
+            # textos DNSH que ya no usa ninguna fila (cambiaron en este import)
+            pruned = prune_shared_texts()
+            if pruned:
+                self.stdout.write(f"• Textos compartidos huérfanos podados: {pruned}")
+
+            # el clasificador se guarda con la versión final del import
+            self.touch_checkpoint(checkpoint)
+            clf = build_classifier(flush_dataset_batch())
+            self.stdout.write(f"✅ CLASIFICADOR listo. v{clf.version} docs={clf.matrix.shape[0]}")
+
+            # Release inmutable: los lectores siguen en el anterior hasta el cambio de puntero
+            self.touch_checkpoint(checkpoint)
+            release = stage_release()
+            if not options.get("no_publish"):
+                publish_release(release)
+            self.stdout.write(f"✅ RELEASE {release.name} ({release.status}) docs={len(release.documents)}")
+            deleted, blobs = prune_releases()
+            if deleted:
+                self.stdout.write(f"• Releases antiguos podados: {deleted} objetos, {blobs} blobs huérfanos")
+
+            # Import completo: el siguiente empieza de cero
+            checkpoint.delete()
+
+            if options.get("warm") or options.get("warm_url"):
+                self.warm(options.get("warm_url"), options.get("warm_budget"))
 
         # ========= Resumen global =========
         self.stdout.write(
-            f"🏁 FIN: created={g_created} updated={g_updated} skipped={g_skipped} warnings={g_warnings}"
-            + (" (dry-run)" if dry_run else "")
-        )
\ No newline at end of file
+            f"🏁 FIN: created={totals['created']} updated={totals['updated']} "
+            f"skipped={totals['skipped']} warnings={totals['warnings']}"
+            + (" (dry-run)" if self.dry_run else "")
+        )
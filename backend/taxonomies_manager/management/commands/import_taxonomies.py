@@ -1,8 +1,10 @@
 # backend/taxonomies_manager/management/commands/import_taxonomies.py
 import pandas as pd
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 from taxonomies_manager.models import Taxonomy, EnvironmentalObjective, Sector, Activity
+from taxonomies_manager.versioning import dataset_batch
+from taxonomies_manager.import_sources import ImportSource, ImportSourceError, SHEET_MAIN
 
 REQUIRED_COLUMNS = [
     "taxonomy",
@@ -38,26 +40,30 @@ def to_str(val: object) -> str:
     return str(val).strip()
 
 class Command(BaseCommand):
-    help = "Import taxonomies from Excel"
+    help = "Import taxonomies from Excel, CSV or Parquet"
 
     def add_arguments(self, parser):
         parser.add_argument(
             "--file",
             type=str,
-            help="Path to the Excel file (defaults to backend/data/eu_taxonomy_cleaned.xlsx)",
+            help="Path to the Excel file, a .csv/.parquet file or a directory with main.csv/main.parquet "
+                 "(defaults to backend/data/eu_taxonomy_cleaned.xlsx)",
         )
 
+    @dataset_batch()
     def handle(self, *args, **options):
         default_path = settings.BASE_DIR / "data" / "eu_taxonomy_cleaned.xlsx"
         file_path = options.get("file") or default_path
 
-        df = pd.read_excel(file_path)
+        try:
+            sheet = ImportSource(file_path).sheet(SHEET_MAIN)
+        except ImportSourceError as exc:
+            raise CommandError(str(exc))
+        if sheet is None:
+            raise CommandError(f"{file_path}: no main sheet")
 
-        # Normalize column names to lowercase (so Excel case won’t matter)
-        df.columns = [str(c).strip().lower() for c in df.columns]
-
-        # Validate required columns are present
-        missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+        # Validate required columns are present (names come lowercased, so Excel case won’t matter)
+        missing = [c for c in REQUIRED_COLUMNS if c not in sheet.columns]
         if missing:
             self.stdout.write(self.style.ERROR(f"❌ Missing required columns: {missing}"))
             return
@@ -65,7 +71,7 @@ class Command(BaseCommand):
         created_or_updated = 0
         warnings = 0
 
-        for idx, row in df.iterrows():
+        for idx, row in sheet.rows():
             # --- taxonomy hierarchy ---
             taxonomy_name   = to_str(row["taxonomy"])
             region          = to_str(row["region"]) or "Other"
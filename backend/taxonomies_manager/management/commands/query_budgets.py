@@ -0,0 +1,129 @@
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, resolve, Resolver404
+
+from taxonomies_manager import querybudget
+from taxonomies_manager.querybudget import MODE_LOG, budget_for
+from taxonomies_manager.releases import API_PREFIX, RELEASE_LIVE, RELEASE_PARAM, iter_release_paths
+
+# Rutas que no forman parte de un release (listas, facetas, acciones, POST)
+EXTRA_REQUESTS = [
+    ("GET", "", None),
+    ("GET", "objectives/", None),
+    ("GET", "sectors/?taxonomy=1&objective=1,2", None),
+    ("GET", "subsectors/", None),
+    ("GET", "subsectors/1/", None),
+    ("GET", "activities/", None),
+    ("GET", "activities/?facets=1", None),
+    ("GET", "activities/1/", None),
+    ("GET", "activities/1/equivalents/", None),
+    ("GET", "practices/", None),
+    ("GET", "practices/?facets=1", None),
+    ("GET", "practices/1/", None),
+    ("GET", "practices/ladder/", None),
+    ("GET", "rwanda-adaptation/", None),
+    ("GET", "rwanda-adaptation/1/", None),
+    ("GET", "rwanda-adaptation/grouped/?taxonomy=5", None),
+    ("GET", "adaptation-whitelists/1/", None),
+    ("GET", "adaptation-general-criteria/1/", None),
+    ("GET", "taxonomies/1/hierarchy/", None),
+    ("GET", "matrix/equivalences/", None),
+    ("GET", "changes/", None),
+    ("GET", "releases/", None),
+    ("GET", "suggest/?q=solar", None),
+    ("POST", "classify/", {"descriptions": ["solar photovoltaic panels on roofs"]}),
+]
+
+MISS_CACHES = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+# Variantes ".json" que añade DefaultRouter: misma vista que la ruta sin sufijo
+FORMAT_SUFFIX = "format>"
+
+
+def _api_routes(patterns=None, prefix=""):
+    """(ruta, vista) de todas las URLs de la API."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for p in patterns:
+        route = prefix + str(p.pattern).lstrip("^")
+        if isinstance(p, URLResolver):
+            yield from _api_routes(p.url_patterns, route)
+        elif isinstance(p, URLPattern) and route.startswith(API_PREFIX.lstrip("/")) and FORMAT_SUFFIX not in route:
+            yield route, p.callback
+
+
+class Command(BaseCommand):
+    help = ("Pide una muestra de cada ruta de la API (tablas vivas, sin cache de respuestas) y compara "
+            "las consultas SQL con el presupuesto de la vista (ver taxonomies_manager/querybudget.py).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--per-route", type=int, default=5, help="Máximo de URLs medidas por ruta.")
+        parser.add_argument("--strict", action="store_true",
+                            help="Termina con error si alguna ruta supera su presupuesto (para CI).")
+
+    def handle(self, *args, **options):
+        requests = list(EXTRA_REQUESTS) + [("GET", key, None) for key in iter_release_paths()]
+
+        client = Client(HTTP_HOST="localhost", raise_request_exception=False)
+        observed = defaultdict(list)  # vista -> [(consultas, url)]
+        per_route = defaultdict(int)
+        # DummyCache: cada petición paga la consulta de la cache y la vista completa (peor caso)
+        with override_settings(QUERY_BUDGET_MODE=MODE_LOG, CACHES=MISS_CACHES), self._quiet():
+            for method, key, body in requests:
+                try:
+                    match = resolve(API_PREFIX + key.partition("?")[0])
+                except Resolver404:
+                    continue
+                if per_route[match.func] >= options["per_route"]:
+                    continue
+                per_route[match.func] += 1
+                count = self._measure(client, method, key, body)
+                observed[match.func].append((count, key, budget_for(match, method)))
+
+        over, missing = 0, []
+        self.stdout.write(f"{'consultas':>9} {'presup.':>7}  ruta")
+        for route, view in _api_routes():
+            if view not in observed:
+                missing.append(route)
+                continue
+            count, key, budget = max(observed[view], key=lambda item: item[0])
+            if budget is None:
+                status = self.style.WARNING("sin presupuesto")
+            elif count > budget:
+                status = self.style.ERROR(f"EXCEDIDO ({key})")
+                over += 1
+            else:
+                status = self.style.SUCCESS("ok")
+            self.stdout.write(f"{count:>9} {budget if budget is not None else '-':>7}  {route}  {status}")
+
+        if missing:
+            self.stdout.write(self.style.WARNING(f"\nRutas sin muestra ({len(missing)}):"))
+            for route in missing:
+                self.stdout.write(f"  {route}")
+        if over and options["strict"]:
+            raise CommandError(f"{over} ruta(s) por encima de su presupuesto de consultas")
+        self.stdout.write(self.style.SUCCESS(f"\n✅ {len(observed)} rutas medidas, {over} por encima del presupuesto"))
+
+    @staticmethod
+    @contextmanager
+    def _quiet():
+        # El informe ya muestra los excesos; sin los warnings del middleware
+        logger = logging.getLogger(querybudget.__name__)
+        disabled, logger.disabled = logger.disabled, True
+        try:
+            yield
+        finally:
+            logger.disabled = disabled
+
+    def _measure(self, client, method, key, body):
+        url = API_PREFIX + key + ("&" if "?" in key else "?") + f"{RELEASE_PARAM}={RELEASE_LIVE}"
+        kwargs = {"HTTP_ACCEPT": "application/json"}
+        if body is not None:
+            kwargs.update(data=body, content_type="application/json")
+        request = getattr(client, method.lower())
+        request(url, **kwargs)  # en frío: cargas por worker (grafo, clasificador), fuera del presupuesto
+        return request(url, **kwargs).query_count
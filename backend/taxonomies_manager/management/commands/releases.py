@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from taxonomies_manager.models import Release
+from taxonomies_manager.releases import (
+    stage_release, publish_release, prune_releases, get_published_release_id,
+)
+
+
+class Command(BaseCommand):
+    help = "Gestiona releases inmutables del dataset: list | stage [--publish] | publish <nombre> | prune."
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["list", "stage", "publish", "prune"])
+        parser.add_argument("name", nargs="?", help="Nombre del release (stage: opcional; publish: obligatorio).")
+        parser.add_argument("--publish", action="store_true", help="stage: publicar el release al terminar.")
+        parser.add_argument("--keep", type=int, default=None,
+                            help="prune: releases más recientes a conservar (por defecto settings.RELEASES_KEEP).")
+
+    def handle(self, *args, **options):
+        action, name = options["action"], options.get("name")
+
+        if action == "list":
+            current = get_published_release_id()
+            for r in Release.objects.all():
+                mark = "*" if r.id == current else " "
+                self.stdout.write(
+                    f"{mark} {r.name:<12} v{r.dataset_version:<6} {r.status:<10} "
+                    f"{len(r.documents):>5} docs  {r.created_at:%Y-%m-%d %H:%M}"
+                )
+            return
+
+        if action == "stage":
+            t0 = time.perf_counter()
+            release = stage_release(name)
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Release {release.name}: {len(release.documents)} documentos en {time.perf_counter() - t0:.2f}s"
+            ))
+            if options["publish"]:
+                publish_release(release)
+                self.stdout.write(self.style.SUCCESS(f"✅ Publicado {release.name}"))
+            return
+
+        if action == "publish":
+            if not name:
+                raise CommandError("publish requiere el nombre del release")
+            try:
+                release = Release.objects.get(name=name)
+            except Release.DoesNotExist:
+                raise CommandError(f"Release '{name}' no existe")
+            publish_release(release)
+            self.stdout.write(self.style.SUCCESS(f"✅ Publicado {release.name}"))
+            return
+
+        deleted, blobs = prune_releases(keep=options["keep"])
+        self.stdout.write(self.style.SUCCESS(f"✅ Borrados {deleted} objetos de release y {blobs} blobs huérfanos"))
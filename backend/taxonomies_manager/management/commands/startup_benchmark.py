@@ -0,0 +1,86 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Librerías que el proceso web no debería cargar (solo comandas / desarrollo)
+HEAVY_MODULES = (
+    "pandas", "numpy", "scipy", "openpyxl", "pyarrow",
+    "django_extensions", "smart_selects", "django.test",
+)
+
+# Se ejecuta en un intérprete limpio: mide lo que paga cada worker al arrancar
+PROBE = r"""
+import json, resource, sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{
+    "seconds": elapsed,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Mide el arranque de un worker web (import de backend.wsgi/asgi): tiempo, RSS y módulos cargados."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--entry", choices=["wsgi", "asgi"], default="wsgi")
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                            help="Variables extra para el worker medido (p.ej. --env DEBUG=False).")
+        parser.add_argument("--top", type=int, default=10, help="Paquetes más lentos de importar (-X importtime).")
+
+    def handle(self, *args, **options):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "backend.settings")}
+        for item in options["env"]:
+            key, sep, value = item.partition("=")
+            if not sep:
+                raise CommandError(f"--env espera KEY=VALUE, no '{item}'")
+            env[key] = value
+
+        module = f"backend.{options['entry']}"
+        code = PROBE.format(module=module, heavy=HEAVY_MODULES)
+        runs = [self._run([sys.executable, "-c", code], env) for _ in range(max(1, options["runs"]))]
+        results = [json.loads(r.stdout.strip().splitlines()[-1]) for r in runs]
+
+        seconds = [r["seconds"] for r in results]
+        rss = [r["rss_mb"] for r in results]
+        self.stdout.write(f"{module} x{len(results)}")
+        self.stdout.write(f"  import:  median {statistics.median(seconds) * 1000:.0f} ms  (min {min(seconds) * 1000:.0f} ms)")
+        self.stdout.write(f"  RSS:     median {statistics.median(rss):.1f} MB")
+        self.stdout.write(f"  módulos: {results[0]['modules']}")
+        heavy = results[0]["heavy"]
+        style = self.style.WARNING if heavy else self.style.SUCCESS
+        self.stdout.write(style(f"  pesados: {', '.join(heavy) or 'ninguno'}"))
+
+        if options["top"]:
+            trace = self._run([sys.executable, "-X", "importtime", "-c", f"import {module}"], env)
+            self.stdout.write("  más lentos (self, por paquete):")
+            for package, micros in self._by_package(trace.stderr).most_common(options["top"]):
+                self.stdout.write(f"    {package:<24} {micros / 1000:7.1f} ms")
+
+    def _run(self, cmd, env):
+        result = subprocess.run(cmd, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip()[-2000:])
+        return result
+
+    @staticmethod
+    def _by_package(importtime_output):
+        totals = Counter()
+        for line in importtime_output.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            self_us, _, name = line[len("import time:"):].split("|")
+            if self_us.strip().isdigit():
+                totals[name.strip().split(".")[0]] += int(self_us)
+        return totals
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from taxonomies_manager.warming import warm_caches, uses_local_memory_cache, WarmingError, DEFAULT_CONCURRENCY
+
+
+class Command(BaseCommand):
+    help = "Pre-calienta las caches de la API (respuestas, blobs de releases) pidiendo todos los documentos de lectura."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", type=str, default=None,
+                            help="Servidor a calentar vía HTTP (p.ej. https://taxonomy-website.onrender.com). "
+                                 "Sin --url se calienta en proceso (sirve con una cache compartida).")
+        parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Peticiones simultáneas.")
+        parser.add_argument("--budget", type=float, default=None, help="Tiempo máximo en segundos.")
+
+    def handle(self, *args, **options):
+        if not options["url"] and uses_local_memory_cache():
+            self.stdout.write(self.style.WARNING(
+                "⚠️ Cache locmem: calentar en proceso no sirve a los workers; usa --url o CACHE_URL compartido."
+            ))
+        try:
+            stats = warm_caches(
+                base_url=options["url"], concurrency=options["concurrency"], budget=options["budget"],
+            )
+        except WarmingError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Caches: {stats['warmed']} calentadas, {stats['failed']} con error, "
+            f"{stats['skipped']} sin tiempo en {stats['elapsed']:.2f}s"
+        ))
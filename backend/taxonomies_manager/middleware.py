@@ -0,0 +1,96 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .compression import choose_encoding, compress
+from .releases import API_PREFIX, release_response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise con modo async. El original solo es síncrono y, bajo ASGI, obliga
+    a Django a pasar toda la cadena (y las vistas async) por un hilo.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class ApiCompressionMiddleware(MiddlewareMixin):
+    """
+    Comprime las respuestas JSON de la API (gzip / brotli según Accept-Encoding).
+
+    - Solo rutas en settings.API_COMPRESSION_PATH_PREFIXES y respuestas JSON 200.
+    - Por debajo de settings.API_COMPRESSION_MIN_SIZE bytes no compensa: se sirve tal cual.
+    - Si la respuesta trae `precompressed` (dict encoding -> bytes, ver caching.py)
+      se usa esa variante en lugar de comprimir otra vez.
+    WhiteNoise sigue encargándose de los estáticos. Bajo ASGI, MiddlewareMixin
+    comprime en un hilo y no en el event loop.
+    """
+
+    def process_response(self, request, response):
+        if not self._is_eligible(request, response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        precompressed = getattr(response, "precompressed", None) or {}
+        if len(response.content) < settings.API_COMPRESSION_MIN_SIZE and not precompressed:
+            return response
+
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        body = precompressed.get(encoding)
+        if body is None:
+            body = compress(response.content, encoding)
+            if len(body) >= len(response.content):
+                return response
+
+        response.content = body
+        response["Content-Length"] = str(len(body))
+        response["Content-Encoding"] = encoding
+        return response
+
+    def _is_eligible(self, request, response):
+        return (
+            request.path.startswith(tuple(settings.API_COMPRESSION_PATH_PREFIXES))
+            and response.status_code == 200
+            and not response.streaming
+            and not response.has_header("Content-Encoding")
+            and response.get("Content-Type", "").startswith("application/json")
+        )
+
+
+class ReleaseMiddleware(MiddlewareMixin):
+    """
+    Sirve los GET de la API desde el release publicado (o ?release=<nombre>)
+    cuando el documento forma parte de él; si no, sigue la vista normal.
+    Ver releases.py.
+    """
+
+    def process_request(self, request):
+        if request.method == "GET" and request.path.startswith(API_PREFIX):
+            return release_response(request)
+        return None
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taxonomies_manager', '0008_datasetversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEquivalence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('code_score', models.FloatField(default=0)),
+                ('name_score', models.FloatField(default=0)),
+                ('method', models.CharField(choices=[('code', 'Economic code'), ('name', 'Name similarity'), ('code+name', 'Economic code + name')], max_length=20)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='equivalences', to='taxonomies_manager.activity')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='taxonomies_manager.activity')),
+                ('target_taxonomy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='taxonomies_manager.taxonomy')),
+            ],
+            options={
+                'verbose_name': 'Activity equivalence',
+                'verbose_name_plural': 'Activity equivalences',
+                'indexes': [models.Index(fields=['source', '-score'], name='equiv_source_score_idx'), models.Index(fields=['source', 'target_taxonomy', '-score'], name='equiv_source_tax_idx')],
+                'unique_together': {('source', 'target')},
+            },
+        ),
+    ]
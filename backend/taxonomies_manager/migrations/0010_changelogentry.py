@@ -0,0 +1,67 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:01
+
+import json
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+# Mismo orden que signals.TRACKED_MODELS (padres antes que hijos)
+BASELINE_MODELS = (
+    "Taxonomy", "EnvironmentalObjective", "Sector", "Subsector",
+    "Activity", "Practice", "RwandaAdaptation",
+    "AdaptationWhitelist", "AdaptationGeneralCriterion",
+)
+
+
+def log_existing_rows(apps, schema_editor):
+    """Las filas ya existentes entran como "create" en la versión actual: ?since=0 = dataset completo."""
+    DatasetVersion = apps.get_model("taxonomies_manager", "DatasetVersion")
+    ChangeLogEntry = apps.get_model("taxonomies_manager", "ChangeLogEntry")
+    encoder = django.core.serializers.json.DjangoJSONEncoder
+
+    entries = []
+    for name in BASELINE_MODELS:
+        model = apps.get_model("taxonomies_manager", name)
+        fields = model._meta.concrete_fields
+        for obj in model.objects.order_by("pk").iterator():
+            data = {f.attname: f.value_from_object(obj) for f in fields}
+            entries.append((model._meta.model_name, obj.pk, json.loads(json.dumps(data, cls=encoder))))
+    if not entries:
+        return
+
+    dv, _ = DatasetVersion.objects.get_or_create(pk=1, defaults={"version": 1})
+    if dv.version < 1:
+        dv.version = 1
+        dv.save(update_fields=["version"])
+    ChangeLogEntry.objects.bulk_create(
+        [ChangeLogEntry(version=dv.version, model=m, object_id=pk, action="create", data=d) for m, pk, d in entries],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taxonomies_manager', '0009_activityequivalence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField()),
+                ('model', models.CharField(max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=10)),
+                ('data', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Change log entry',
+                'verbose_name_plural': 'Change log',
+                'indexes': [models.Index(fields=['version', 'id'], name='changelog_version_idx'), models.Index(fields=['model', 'object_id', '-id'], name='changelog_object_idx')],
+            },
+        ),
+        migrations.RunPython(log_existing_rows, migrations.RunPython.noop),
+    ]
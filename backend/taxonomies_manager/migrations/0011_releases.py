@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taxonomies_manager', '0010_changelogentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Release',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('dataset_version', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('staged', 'Staged'), ('published', 'Published')], default='staged', max_length=20)),
+                ('documents', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReleaseBlob',
+            fields=[
+                ('digest', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('content', models.BinaryField()),
+            ],
+            options={
+                'verbose_name': 'Release blob',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReleasePointer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('release', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='taxonomies_manager.release')),
+            ],
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# Índices GIN para la búsqueda del admin (admin_utils.FullTextSearchMixin).
+# La expresión tiene que coincidir con admin_utils.fulltext_sql() y con el
+# `fulltext_fields` de cada ModelAdmin. Solo Postgres; en SQLite no se crea nada.
+FULLTEXT_INDEXES = (
+    ("activity_fulltext_idx", "taxonomies_manager_activity", ("taxonomy_code", "economic_code", "name", "description")),
+    ("practice_fulltext_idx", "taxonomies_manager_practice", ("practice_name", "practice_description")),
+    ("rwanda_fulltext_idx", "taxonomies_manager_rwandaadaptation", ("sector", "hazard", "division", "investment")),
+)
+
+
+def _expression(columns):
+    parts = " || ' ' || ".join(f"coalesce(\"{c}\", '')" for c in columns)
+    return f"to_tsvector('simple', {parts})"
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, table, columns in FULLTEXT_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" USING gin ({_expression(columns)})')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in FULLTEXT_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taxonomies_manager', '0011_releases'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
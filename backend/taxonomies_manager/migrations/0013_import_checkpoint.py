@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taxonomies_manager', '0012_fulltext_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('command', models.CharField(max_length=100, unique=True)),
+                ('source', models.TextField(blank=True)),
+                ('source_hash', models.CharField(max_length=64)),
+                ('sheet', models.CharField(max_length=50)),
+                ('offset', models.PositiveIntegerField(default=0)),
+                ('counters', models.JSONField(default=dict)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
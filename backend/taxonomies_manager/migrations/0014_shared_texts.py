@@ -0,0 +1,150 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:14
+
+import hashlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SHARED_TEXT_FIELDS = {
+    "Activity": (
+        "dnsh_climate_mitigation", "dnsh_climate_adaptation", "dnsh_water",
+        "dnsh_circular_economy", "dnsh_pollution_prevention",
+        "dnsh_biodiversity", "dnsh_land_management",
+    ),
+    "RwandaAdaptation": ("generic_dnsh",),
+}
+BATCH_SIZE = 500
+
+
+def shared_text_ref():
+    return models.ForeignKey(
+        blank=True, null=True, on_delete=django.db.models.deletion.PROTECT,
+        related_name='+', to='taxonomies_manager.sharedtext',
+    )
+
+
+def move_texts_to_store(apps, schema_editor):
+    """Cada texto distinto pasa una sola vez a SharedText; las filas guardan su digest."""
+    SharedText = apps.get_model("taxonomies_manager", "SharedText")
+    for name, fields in SHARED_TEXT_FIELDS.items():
+        model = apps.get_model("taxonomies_manager", name)
+        texts, updated = {}, []
+        for obj in model.objects.only("pk", *fields).order_by("pk").iterator():
+            for field in fields:
+                text = getattr(obj, field)
+                if text:
+                    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+                    texts.setdefault(digest, text)
+                    setattr(obj, f"{field}_ref_id", digest)
+            updated.append(obj)
+        SharedText.objects.bulk_create(
+            [SharedText(digest=d, content=t) for d, t in texts.items()],
+            batch_size=BATCH_SIZE, ignore_conflicts=True,
+        )
+        model.objects.bulk_update(updated, [f"{field}_ref" for field in fields], batch_size=BATCH_SIZE)
+
+
+def copy_texts_back(apps, schema_editor):
+    SharedText = apps.get_model("taxonomies_manager", "SharedText")
+    texts = dict(SharedText.objects.values_list("digest", "content"))
+    for name, fields in SHARED_TEXT_FIELDS.items():
+        model = apps.get_model("taxonomies_manager", name)
+        updated = []
+        for obj in model.objects.order_by("pk").iterator():
+            for field in fields:
+                setattr(obj, field, texts.get(getattr(obj, f"{field}_ref_id"), ""))
+            updated.append(obj)
+        model.objects.bulk_update(updated, list(fields), batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taxonomies_manager', '0013_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SharedText',
+            fields=[
+                ('digest', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('content', models.TextField()),
+            ],
+            options={
+                'verbose_name': 'Shared text',
+            },
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='dnsh_climate_mitigation_ref',
+            field=shared_text_ref(),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='dnsh_climate_adaptation_ref',
+            field=shared_text_ref(),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='dnsh_water_ref',
+            field=shared_text_ref(),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='dnsh_circular_economy_ref',
+            field=shared_text_ref(),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='dnsh_pollution_prevention_ref',
+            field=shared_text_ref(),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='dnsh_biodiversity_ref',
+            field=shared_text_ref(),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='dnsh_land_management_ref',
+            field=shared_text_ref(),
+        ),
+        migrations.AddField(
+            model_name='rwandaadaptation',
+            name='generic_dnsh_ref',
+            field=shared_text_ref(),
+        ),
+        migrations.RunPython(move_texts_to_store, copy_texts_back),
+        migrations.RemoveField(
+            model_name='activity',
+            name='dnsh_climate_mitigation',
+        ),
+        migrations.RemoveField(
+            model_name='activity',
+            name='dnsh_climate_adaptation',
+        ),
+        migrations.RemoveField(
+            model_name='activity',
+            name='dnsh_water',
+        ),
+        migrations.RemoveField(
+            model_name='activity',
+            name='dnsh_circular_economy',
+        ),
+        migrations.RemoveField(
+            model_name='activity',
+            name='dnsh_pollution_prevention',
+        ),
+        migrations.RemoveField(
+            model_name='activity',
+            name='dnsh_biodiversity',
+        ),
+        migrations.RemoveField(
+            model_name='activity',
+            name='dnsh_land_management',
+        ),
+        migrations.RemoveField(
+            model_name='rwandaadaptation',
+            name='generic_dnsh',
+        ),
+    ]
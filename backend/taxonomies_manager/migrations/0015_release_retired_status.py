@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taxonomies_manager', '0014_shared_texts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='release',
+            name='status',
+            field=models.CharField(choices=[('staged', 'Staged'), ('published', 'Published'), ('retired', 'Retired')], default='staged', max_length=20),
+        ),
+    ]
@@ -1,3 +1,6 @@
+import hashlib
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from .constants import (
     DJANGO_SC_CRITERIA_CHOICES,
@@ -81,6 +84,59 @@ class Subsector(models.Model):
     def __str__(self):
         return f"{self.name} ({self.sector})"
 
+# -------------------------
+# Textos compartidos (DNSH repetidos entre filas)
+# -------------------------
+
+class SharedText(models.Model):
+    """
+    Texto largo direccionado por contenido (sha1). Las filas que repiten el
+    mismo DNSH (muchas actividades de una taxonomía, `generic_dnsh` en todas
+    las filas Rwanda) apuntan a una sola fila de esta tabla. Ver shared_text().
+    """
+    digest = models.CharField(max_length=40, primary_key=True)
+    content = models.TextField()
+
+    class Meta:
+        verbose_name = "Shared text"
+
+    def __str__(self):
+        return self.digest
+
+    @classmethod
+    def intern(cls, text):
+        """Fila de `text` (la crea si no existe); None para el texto vacío."""
+        if not text:
+            return None
+        obj, _ = cls.objects.get_or_create(
+            digest=hashlib.sha1(text.encode("utf-8")).hexdigest(), defaults={"content": text}
+        )
+        return obj
+
+
+def shared_text_ref():
+    """FK `<campo>_ref` a SharedText; el texto se lee y asigna con shared_text("<campo>_ref")."""
+    return models.ForeignKey(SharedText, on_delete=models.PROTECT, null=True, blank=True, related_name="+")
+
+
+def shared_text(ref_name):
+    """
+    Propiedad de texto plano sobre un FK a SharedText: devuelve el contenido
+    ("" si no hay) y al asignar un str lo interna. Como es una propiedad con
+    setter vale también en Model(**kwargs), create() y los defaults de
+    update_or_create(). Para no hacer una consulta por fila, leer con
+    select_related (texts.with_shared_texts) o .values (texts.values_with_texts).
+    """
+    def fget(self):
+        ref = getattr(self, ref_name)
+        return ref.content if ref is not None else ""
+
+    def fset(self, value):
+        setattr(self, ref_name, SharedText.intern(value))
+
+    return property(fget, fset)
+
+
 # -------------------------
 # Activities (objetivos 'clásicos', no MEO)
 # -------------------------
@@ -118,14 +174,22 @@ class Activity(models.Model):
     sc_criteria_amber = models.TextField(blank=True)
     sc_criteria_red = models.TextField(blank=True)
 
-    # Fixed DNSH criteria fields
-    dnsh_climate_mitigation = models.TextField(blank=True)
-    dnsh_climate_adaptation = models.TextField(blank=True)
-    dnsh_water = models.TextField(blank=True)
-    dnsh_circular_economy = models.TextField(blank=True)
-    dnsh_pollution_prevention = models.TextField(blank=True)
-    dnsh_biodiversity = models.TextField(blank=True)
-    dnsh_land_management = models.TextField(blank=True)
+    # Fixed DNSH criteria fields (textos compartidos: se repiten mucho entre actividades)
+    dnsh_climate_mitigation_ref = shared_text_ref()
+    dnsh_climate_adaptation_ref = shared_text_ref()
+    dnsh_water_ref = shared_text_ref()
+    dnsh_circular_economy_ref = shared_text_ref()
+    dnsh_pollution_prevention_ref = shared_text_ref()
+    dnsh_biodiversity_ref = shared_text_ref()
+    dnsh_land_management_ref = shared_text_ref()
+
+    dnsh_climate_mitigation = shared_text("dnsh_climate_mitigation_ref")
+    dnsh_climate_adaptation = shared_text("dnsh_climate_adaptation_ref")
+    dnsh_water = shared_text("dnsh_water_ref")
+    dnsh_circular_economy = shared_text("dnsh_circular_economy_ref")
+    dnsh_pollution_prevention = shared_text("dnsh_pollution_prevention_ref")
+    dnsh_biodiversity = shared_text("dnsh_biodiversity_ref")
+    dnsh_land_management = shared_text("dnsh_land_management_ref")
 
     class Meta:
         unique_together = ("taxonomy", "environmental_objective", "sector", "subsector", "name")
@@ -197,7 +261,8 @@ class RwandaAdaptation(models.Model):
     level = models.CharField(max_length=50, choices=DJANGO_RW_LEVEL_CHOICES)        # Activity | Measure
     criteria_type = models.CharField(max_length=50, choices=DJANGO_RW_CRITERIA_CHOICES)  # Process-based | Quantitative | Qualitative | Whitelist
 
-    generic_dnsh = models.TextField(blank=True)  # por ahora repetido por fila, como acordaste
+    generic_dnsh_ref = shared_text_ref()  # mismo texto en todas las filas: una sola fila en SharedText
+    generic_dnsh = shared_text("generic_dnsh_ref")
     source_ref = models.CharField(max_length=255, blank=True)
 
     class Meta:
@@ -269,3 +334,179 @@ class AdaptationGeneralCriterion(models.Model):
     def __str__(self):
         obj_name = self.environmental_objective.display_name or self.environmental_objective.generic_name
         return f"{self.taxonomy.name} | {obj_name} | {self.title}"
+
+
+# -------------------------
+# Estado del dataset (versión global para caches/snapshots)
+# -------------------------
+
+class DatasetVersion(models.Model):
+    """
+    Fila única (pk=1) con un contador que sube cada vez que cambia cualquier
+    dato de taxonomías (admin, imports, fixes). Las caches de respuestas usan
+    la versión en su clave, así que un cambio invalida todo sin borrar nada.
+    Ver taxonomies_manager/versioning.py.
+    """
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Dataset version"
+
+    def __str__(self):
+        return f"v{self.version}"
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Cambio a nivel de fila (alta / modificación / baja) de un modelo de
+    taxonomías, con la versión del dataset en la que quedó visible. Lo usan
+    los espejos para sincronizar incrementalmente (GET /api/changes/?since=N).
+    `data` guarda la fila completa (columnas planas, FKs como *_id); en bajas es null.
+    """
+    ACTION_CREATE = "create"
+    ACTION_UPDATE = "update"
+    ACTION_DELETE = "delete"
+    ACTION_CHOICES = [
+        (ACTION_CREATE, "Create"),
+        (ACTION_UPDATE, "Update"),
+        (ACTION_DELETE, "Delete"),
+    ]
+
+    version = models.BigIntegerField()
+    model = models.CharField(max_length=50)  # _meta.model_name, p.ej. "activity"
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["version", "id"], name="changelog_version_idx"),
+            models.Index(fields=["model", "object_id", "-id"], name="changelog_object_idx"),
+        ]
+        verbose_name = "Change log entry"
+        verbose_name_plural = "Change log"
+
+    def __str__(self):
+        return f"v{self.version} {self.action} {self.model}#{self.object_id}"
+
+
+# -------------------------
+# Releases inmutables (snapshots de los documentos de lectura de la API)
+# -------------------------
+
+class ReleaseBlob(models.Model):
+    """
+    Cuerpo JSON de un documento de la API, direccionado por contenido (sha1).
+    Los documentos que no cambian entre releases comparten el mismo blob.
+    """
+    digest = models.CharField(max_length=40, primary_key=True)
+    content = models.BinaryField()
+
+    class Meta:
+        verbose_name = "Release blob"
+
+    def __str__(self):
+        return self.digest
+
+
+class Release(models.Model):
+    """
+    Snapshot inmutable de los documentos que lee el frontend: `documents` mapea
+    la ruta relativa a /api/ (p.ej. "taxonomies/3/detail/") al digest del blob.
+    Ver taxonomies_manager/releases.py.
+    """
+    STATUS_STAGED = "staged"
+    STATUS_PUBLISHED = "published"
+    STATUS_RETIRED = "retired"  # las tablas vivas cambiaron fuera de un import (releases.retire_published_release)
+    STATUS_CHOICES = [
+        (STATUS_STAGED, "Staged"),
+        (STATUS_PUBLISHED, "Published"),
+        (STATUS_RETIRED, "Retired"),
+    ]
+
+    name = models.CharField(max_length=50, unique=True)
+    dataset_version = models.BigIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_STAGED)
+    documents = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class ReleasePointer(models.Model):
+    """Fila única (pk=1): release que se sirve por defecto. Publicar = cambiar este FK."""
+    release = models.ForeignKey(Release, on_delete=models.PROTECT, related_name="+")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"-> {self.release_id}"
+
+
+# -------------------------
+# Equivalencias entre actividades de distintas taxonomías (precalculadas)
+# -------------------------
+
+class ActivityEquivalence(models.Model):
+    """
+    Par (source -> target) de actividades de taxonomías distintas que parecen
+    equivalentes por código económico y/o nombre. Se guarda en ambos sentidos
+    para leer por `source` con un índice. Lo recalcula equivalences.py al final
+    de cada import (o con `manage.py build_equivalences`).
+    """
+    METHOD_CHOICES = [
+        ("code", "Economic code"),
+        ("name", "Name similarity"),
+        ("code+name", "Economic code + name"),
+    ]
+
+    source = models.ForeignKey(Activity, on_delete=models.CASCADE, related_name="equivalences")
+    target = models.ForeignKey(Activity, on_delete=models.CASCADE, related_name="+")
+    target_taxonomy = models.ForeignKey(Taxonomy, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+    code_score = models.FloatField(default=0)
+    name_score = models.FloatField(default=0)
+    method = models.CharField(max_length=20, choices=METHOD_CHOICES)
+
+    class Meta:
+        unique_together = ("source", "target")
+        indexes = [
+            models.Index(fields=["source", "-score"], name="equiv_source_score_idx"),
+            models.Index(fields=["source", "target_taxonomy", "-score"], name="equiv_source_tax_idx"),
+        ]
+        verbose_name = "Activity equivalence"
+        verbose_name_plural = "Activity equivalences"
+
+    def __str__(self):
+        return f"{self.source_id} -> {self.target_id} ({self.score:.2f})"
+
+
+# -------------------------
+# Imports reanudables
+# -------------------------
+
+class ImportCheckpoint(models.Model):
+    """
+    Progreso de un import por bloques (una fila por comando): las hojas
+    anteriores a `sheet` y las primeras `offset` filas de `sheet` ya están
+    escritas. Se actualiza en la misma transacción que cada bloque y se borra
+    al terminar. `source_hash` es la huella de la entrada (import_sources.file_digest):
+    --resume solo continúa si el fichero no ha cambiado.
+    """
+    command = models.CharField(max_length=100, unique=True)
+    source = models.TextField(blank=True)
+    source_hash = models.CharField(max_length=64)
+    sheet = models.CharField(max_length=50)
+    offset = models.PositiveIntegerField(default=0)
+    counters = models.JSONField(default=dict)  # hoja -> {"created": n, "updated": n, ...}
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.command}: {self.sheet}@{self.offset}"
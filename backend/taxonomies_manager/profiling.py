@@ -0,0 +1,403 @@
+"""
+Perfilado bajo demanda de un request concreto (solo staff).
+
+    GET /api/taxonomies/3/detail/?_profile=1          muestreo de pilas (flamegraph)
+    GET /api/taxonomies/3/detail/?_profile=cprofile   determinista (cProfile, más overhead)
+    o la cabecera "X-Profile: 1" / "X-Profile: cprofile"
+
+Solo cuenta para usuarios staff con sesión del admin; para el resto el
+parámetro se ignora. El request perfilado va a las tablas vivas, sin release ni
+cache de respuestas (si no, se perfilaría la lectura de un blob). La respuesta
+lleva X-Profile-Id y X-Profile-Url con el informe en el admin (/admin/profiles/).
+
+Cada informe guarda:
+    - samples:   pilas "a;b;c" -> nº de muestras (modo muestreo; flamegraph)
+    - functions: funciones más caras (tiempo propio y acumulado)
+    - sql:       línea de tiempo de consultas (inicio, duración, alias, SQL)
+                 + huellas repetidas (querybudget.fingerprint)
+    - split:     tiempo propio por categoría: sql / orm / serializer / render / other
+
+Los informes van a PROFILE_DIR como un anillo de PROFILE_KEEP ficheros
+(<id>.json.gz + <id>.meta.json para el listado); al guardar uno nuevo se
+borran los más antiguos. Solo stdlib: el muestreo es un hilo que lee
+sys._current_frames() cada PROFILE_SAMPLE_INTERVAL segundos (durante el request
+se baja sys.setswitchinterval para que reciba el GIL). Las respuestas en
+streaming solo se perfilan hasta el primer byte.
+"""
+import cProfile
+import gzip
+import json
+import os
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from importlib import import_module
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import add_never_cache_headers
+
+from .caching import SKIP_CACHE_META
+from .querybudget import fingerprint
+
+PROFILE_PARAM = "_profile"
+PROFILE_HEADER = "HTTP_X_PROFILE"
+MODE_SAMPLE, MODE_CPROFILE = "sample", "cprofile"
+
+PROFILE_MAX_QUERIES = 1000
+PROFILE_SQL_CHARS = 2000
+PROFILE_TOP_FUNCTIONS = 40
+PROFILE_TOP_REPEATED = 10
+
+# Tiempo propio por categoría: la primera que aparezca desde la hoja de la pila
+SPLIT_CATEGORIES = (
+    ("sql", ("/django/db/backends/", "sqlite3", "psycopg")),
+    ("orm", ("/django/db/models/",)),
+    ("serializer", (
+        "/rest_framework/serializers.py", "/rest_framework/fields.py", "/rest_framework/relations.py",
+        "taxonomies_manager/serializers.py", "taxonomies_manager/texts.py",
+    )),
+    ("render", (
+        "/rest_framework/renderers.py", "taxonomies_manager/renderers.py",
+        "/json/", "orjson", "/django/template/",
+    )),
+)
+SPLIT_OTHER = "other"
+
+_ID_RE = re.compile(r"^\d{13}-[0-9a-f]{6}$")
+
+
+# -----------------------
+# Activación
+# -----------------------
+def requested_mode(request):
+    """Modo pedido por querystring / cabecera, o None."""
+    raw = request.GET.get(PROFILE_PARAM) or request.META.get(PROFILE_HEADER)
+    if not raw:
+        return None
+    return MODE_CPROFILE if raw.strip().lower() == MODE_CPROFILE else MODE_SAMPLE
+
+
+def _staff_user(request):
+    """Usuario staff de la sesión del admin (el middleware va antes de SessionMiddleware)."""
+    from django.contrib.auth import get_user
+
+    engine = import_module(settings.SESSION_ENGINE)
+    request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    try:
+        user = get_user(request)
+    finally:
+        del request.session
+    return user if user.is_active and user.is_staff else None
+
+
+# -----------------------
+# Recolectores
+# -----------------------
+_labels = {}
+
+
+def _short_path(filename):
+    for marker in ("site-packages/", "lib/python"):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    base = str(settings.BASE_DIR) + os.sep
+    return filename[len(base):] if filename.startswith(base) else filename
+
+
+def _label(code):
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+    return label
+
+
+def _category(text):
+    for name, markers in SPLIT_CATEGORIES:
+        if any(marker in text for marker in markers):
+            return name
+    return None
+
+
+class StackSampler(threading.Thread):
+    """Muestrea la pila del hilo `thread_id` por encima de `base` (el frame del middleware)."""
+
+    def __init__(self, thread_id, base, interval):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.base = base
+        self.interval = interval
+        self.stacks = Counter()
+        self.categories = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack, category = [], None
+            while frame is not None and frame is not self.base:
+                code = frame.f_code
+                stack.append(_label(code))
+                if category is None:
+                    category = _category(code.co_filename)
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.categories[category or SPLIT_OTHER] += 1
+
+    def finish(self):
+        self._done.set()
+        self.join()
+
+
+class SQLTimeline:
+    """execute_wrapper: inicio y duración de cada consulta, relativos al inicio del request."""
+
+    def __init__(self, t0):
+        self.t0 = t0
+        self.queries = []
+        self.fingerprints = Counter()
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.total += elapsed
+            self.fingerprints[fingerprint(sql)] += 1
+            if len(self.queries) < PROFILE_MAX_QUERIES:
+                self.queries.append({
+                    "start_ms": round((start - self.t0) * 1000, 3),
+                    "ms": round(elapsed * 1000, 3),
+                    "alias": context["connection"].alias,
+                    "many": many,
+                    "sql": sql[:PROFILE_SQL_CHARS],
+                })
+
+
+def _sample_functions(stacks, ms_per_sample):
+    own, total = Counter(), Counter()
+    for stack, n in stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += n
+        for label in set(frames):
+            total[label] += n
+    return [
+        {"function": label, "calls": None,
+         "self_ms": round(own[label] * ms_per_sample, 2), "total_ms": round(total[label] * ms_per_sample, 2)}
+        for label, _n in own.most_common(PROFILE_TOP_FUNCTIONS)
+    ]
+
+
+def _cprofile_report(profiler):
+    stats = pstats.Stats(profiler)
+    rows, split = [], Counter()
+    for (filename, line, name), (cc, ncalls, tottime, cumtime, _callers) in stats.stats.items():
+        label = f"{name} ({_short_path(filename)}:{line})"
+        split[_category(f"{filename}:{name}") or SPLIT_OTHER] += tottime * 1000
+        rows.append({"function": label, "calls": ncalls, "self_ms": round(tottime * 1000, 2),
+                     "total_ms": round(cumtime * 1000, 2)})
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows[:PROFILE_TOP_FUNCTIONS], split
+
+
+# -----------------------
+# Perfilado
+# -----------------------
+def profile_request(get_response, request, mode):
+    """Ejecuta get_response(request) bajo el perfilador; devuelve (response, informe)."""
+    t0 = time.perf_counter()
+    timeline = SQLTimeline(t0)
+    sampler = profiler = None
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(timeline))
+        if mode == MODE_CPROFILE:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            stack.callback(profiler.disable)
+        else:
+            # Con el switch interval por defecto (5 ms) el hilo de muestreo casi no obtiene el GIL
+            interval = settings.PROFILE_SAMPLE_INTERVAL
+            stack.callback(sys.setswitchinterval, sys.getswitchinterval())
+            sys.setswitchinterval(min(sys.getswitchinterval(), interval))
+            sampler = StackSampler(threading.get_ident(), sys._getframe(), interval)
+            sampler.start()
+            stack.callback(sampler.finish)
+        response = get_response(request)
+    total_ms = (time.perf_counter() - t0) * 1000
+
+    report = {
+        "created": timezone.now().isoformat(),
+        "method": request.method,
+        "path": request.get_full_path(),
+        "status": response.status_code,
+        "mode": mode,
+        "total_ms": round(total_ms, 2),
+        "sql_ms": round(timeline.total * 1000, 2),
+        "query_count": sum(timeline.fingerprints.values()),
+        "sql": timeline.queries,
+        "repeated": [[n, sql] for sql, n in timeline.fingerprints.most_common(PROFILE_TOP_REPEATED) if n > 1],
+        "samples": [],
+        "sample_count": 0,
+    }
+    if profiler is not None:
+        report["functions"], split = _cprofile_report(profiler)
+    else:
+        count = sum(sampler.stacks.values())
+        ms_per_sample = total_ms / count if count else 0.0
+        report["samples"] = [[stack, n] for stack, n in sampler.stacks.most_common()]
+        report["sample_count"] = count
+        report["functions"] = _sample_functions(sampler.stacks, ms_per_sample)
+        split = {name: n * ms_per_sample for name, n in sampler.categories.items()}
+    report["split"] = {
+        name: round(split.get(name, 0.0), 2) for name in [c for c, _ in SPLIT_CATEGORIES] + [SPLIT_OTHER]
+    }
+    return response, report
+
+
+# -----------------------
+# Almacén (anillo en disco)
+# -----------------------
+def _profile_dir():
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def _write_atomic(path, data):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def save_profile(report):
+    """Guarda el informe y poda el anillo; devuelve su id (ordenable por fecha)."""
+    directory = _profile_dir()
+    profile_id = f"{int(time.time() * 1000):013d}-{secrets.token_hex(3)}"
+    report = {"id": profile_id, **report}
+    meta = {key: report[key] for key in (
+        "id", "created", "method", "path", "status", "mode", "user", "total_ms", "sql_ms", "query_count",
+    )}
+    _write_atomic(directory / f"{profile_id}.json.gz", gzip.compress(json.dumps(report).encode(), 6))
+    _write_atomic(directory / f"{profile_id}.meta.json", json.dumps(meta).encode())
+
+    for stale in _profile_ids(directory)[settings.PROFILE_KEEP:]:
+        for suffix in (".json.gz", ".meta.json"):
+            (directory / f"{stale}{suffix}").unlink(missing_ok=True)
+    return profile_id
+
+
+def _profile_ids(directory):
+    """Ids guardados, el más reciente primero."""
+    return sorted((p.name[:-len(".meta.json")] for p in directory.glob("*.meta.json")), reverse=True)
+
+
+def list_profiles():
+    directory = _profile_dir()
+    profiles = []
+    for profile_id in _profile_ids(directory):
+        try:
+            profiles.append(json.loads((directory / f"{profile_id}.meta.json").read_bytes()))
+        except (OSError, ValueError):
+            continue  # podado entre el listado y la lectura
+    return profiles
+
+
+def load_profile(profile_id):
+    if not _ID_RE.match(profile_id):
+        return None
+    try:
+        return json.loads(gzip.decompress((_profile_dir() / f"{profile_id}.json.gz").read_bytes()))
+    except (OSError, ValueError):
+        return None
+
+
+def flame_rows(samples, min_fraction=0.002):
+    """
+    Pilas muestreadas -> filas del flamegraph (raíz arriba):
+    [[{"name", "samples", "left", "width"}, ...], ...] con left/width en % del total.
+    Se omiten los nodos por debajo de `min_fraction` del total.
+    """
+    root = {}
+    total = 0
+    for stack, n in samples:
+        total += n
+        node = root
+        for label in stack.split(";"):
+            entry = node.setdefault(label, [0, {}])
+            entry[0] += n
+            node = entry[1]
+    rows = []
+
+    def walk(children, depth, left):
+        for label, (n, grandchildren) in sorted(children.items(), key=lambda item: -item[1][0]):
+            if n / total < min_fraction:
+                continue
+            if len(rows) <= depth:
+                rows.append([])
+            rows[depth].append({
+                "name": label, "samples": n,
+                "left": round(left * 100 / total, 3), "width": round(n * 100 / total, 3),
+            })
+            walk(grandchildren, depth + 1, left)
+            left += n
+
+    if total:
+        walk(root, 0, 0)
+    return rows
+
+
+# -----------------------
+# Middleware
+# -----------------------
+class ProfilingMiddleware:
+    """?_profile=1|cprofile o X-Profile: perfila el request (solo staff) y guarda el informe."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = requested_mode(request) if settings.PROFILE_ENABLED else None
+        user = _staff_user(request) if mode else None
+        if user is None:
+            return self.get_response(request)
+        return self._profile(self.get_response, request, mode, user)
+
+    async def __acall__(self, request):
+        mode = requested_mode(request) if settings.PROFILE_ENABLED else None
+        user = await sync_to_async(_staff_user)(request) if mode else None
+        if user is None:
+            return await self.get_response(request)
+        # Los perfiladores miran un hilo: el resto de la cadena corre desde el de sync_to_async,
+        # que es también donde el ORM async ejecuta el SQL (thread_sensitive)
+        return await sync_to_async(self._profile)(async_to_sync(self.get_response), request, mode, user)
+
+    def _profile(self, get_response, request, mode, user):
+        request.META[SKIP_CACHE_META] = True  # tablas vivas: sin release ni cache de respuestas
+        response, report = profile_request(get_response, request, mode)
+        report["user"] = user.get_username()
+        profile_id = save_profile(report)
+
+        response["X-Profile-Id"] = profile_id
+        response["X-Profile-Url"] = reverse("admin-profile-detail", args=[profile_id])
+        add_never_cache_headers(response)
+        return response
@@ -0,0 +1,185 @@
+"""
+Presupuesto de consultas SQL por vista.
+
+Un prefetch que se pierde (p.ej. un .select_related() sobre un manager ya
+precargado) no rompe nada visible: solo multiplica las consultas. Cada vista
+declara cuántas puede hacer y QueryBudgetMiddleware lo comprueba por request:
+
+    @query_budget(3)              # vistas función, encima de @cache_api_response / @api_view
+    def mi_vista(request): ...
+
+    class MiViewSet(...):
+        query_budget = 2          # o por acción: {"list": 2, "grouped": 6}
+
+    QUERY_BUDGETS = {"taxonomy-detail-nested": 15}   # settings: por nombre de URL o ruta
+
+El contador usa connection.execute_wrapper (funciona sin DEBUG) sobre todas
+las conexiones del hilo del request y cuenta desde process_view: el coste fijo
+del resto de middleware (release publicado, réplicas) no entra, la consulta de
+la cache de respuestas (caching.py) sí. Con QUERY_BUDGET_MODE:
+    "log"   -> warning con las huellas SQL repetidas (producción)
+    "raise" -> QueryBudgetExceeded (tests)
+    "off"   -> no se cuenta
+
+Bajo ASGI el contador se instala en el hilo de sync_to_async del request
+(thread_sensitive), que es donde el ORM async ejecuta el SQL. Límites: las
+respuestas en streaming solo cuentan las consultas previas al primer byte, y
+las lecturas concurrentes de async_views.py (cada una en su conexión) no cuentan.
+
+Las cargas únicas por worker (grafo en memoria, clasificador) van dentro de
+`budget_exempt()`: no cuentan para el request que las dispara.
+Ver `manage.py query_budgets` para el informe de todas las rutas.
+"""
+import contextvars
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+MODE_LOG, MODE_RAISE, MODE_OFF = "log", "raise", "off"
+REPORTED_FINGERPRINTS = 5
+
+_exempt = contextvars.ContextVar("query_budget_exempt", default=False)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN \((?:\s*(?:\?|%s)\s*,?)+\)", re.IGNORECASE)
+_SPACES_RE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(n):
+    """Declara el máximo de consultas de una vista función."""
+    def decorator(view):
+        view.query_budget = n
+        return view
+    return decorator
+
+
+@contextmanager
+def budget_exempt():
+    token = _exempt.set(True)
+    try:
+        yield
+    finally:
+        _exempt.reset(token)
+
+
+def fingerprint(sql: str) -> str:
+    """SQL sin literales: 'WHERE id = 5' y 'WHERE id = 7' cuentan como la misma consulta."""
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    return _SPACES_RE.sub(" ", sql).strip()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.view_start = None
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        if not _exempt.get():
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def view_count(self):
+        return 0 if self.view_start is None else self.count - self.view_start
+
+    def duplicates(self, limit=REPORTED_FINGERPRINTS):
+        return [(n, sql) for sql, n in self.fingerprints.most_common(limit) if n > 1]
+
+    @contextmanager
+    def installed(self):
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(self))
+            yield self
+
+
+def budget_for(match, method="GET"):
+    """Presupuesto de la vista resuelta (settings.QUERY_BUDGETS > decorador > atributo de clase)."""
+    if match is None:
+        return None
+    overrides = settings.QUERY_BUDGETS
+    for key in (match.url_name, match.route):
+        if key and key in overrides:
+            return overrides[key]
+    func = match.func
+    budget = getattr(func, "query_budget", None)
+    if budget is None:
+        budget = getattr(getattr(func, "cls", None), "query_budget", None)
+    if isinstance(budget, dict):
+        action = getattr(func, "actions", {}).get(method.lower())
+        budget = budget.get(action)
+    return budget if budget is not None else settings.QUERY_BUDGET_DEFAULT
+
+
+def budget_message(request, count, budget, counter):
+    lines = [f"{request.method} {request.get_full_path()}: {count} queries (budget {budget})"]
+    lines += [f"  x{n}  {sql[:300]}" for n, sql in counter.duplicates()]
+    return "\n".join(lines)
+
+
+class QueryBudgetMiddleware:
+    """Cuenta las consultas de cada request y aplica el presupuesto de su vista (ver arriba)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if settings.QUERY_BUDGET_MODE == MODE_OFF:
+            return self.get_response(request)
+
+        counter = request._query_counter = QueryCounter()
+        with counter.installed():
+            response = self.get_response(request)
+        return self._check(request, response, counter)
+
+    async def __acall__(self, request):
+        if settings.QUERY_BUDGET_MODE == MODE_OFF:
+            return await self.get_response(request)
+
+        counter = request._query_counter = QueryCounter()
+        stack = ExitStack()
+        await sync_to_async(stack.enter_context)(counter.installed())
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self._check(request, response, counter)
+
+    def _check(self, request, response, counter):
+        response.query_count = count = counter.view_count
+
+        budget = budget_for(getattr(request, "resolver_match", None), request.method)
+        if budget is not None and count > budget:
+            message = budget_message(request, count, budget, counter)
+            if settings.QUERY_BUDGET_MODE == MODE_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.warning("Query budget exceeded: %s", message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        counter = getattr(request, "_query_counter", None)
+        if counter is not None:
+            counter.view_start = counter.count
@@ -0,0 +1,312 @@
+"""
+Releases inmutables del dataset.
+
+Un import escribe en las tablas "vivas" fila a fila; mientras tanto un lector
+podría ver datos a medias. Para evitarlo, los documentos de lectura que usa el
+frontend (lista de taxonomías, detail/, cascada objetivo -> sector ->
+actividades, criterios, matriz, ...) se congelan en un Release:
+
+    documents = {"taxonomies/3/detail/": "<sha1>", ...}   # ruta relativa a /api/
+
+Cada cuerpo JSON se guarda una sola vez en ReleaseBlob (direccionado por
+contenido), así que los documentos que no cambian entre releases comparten
+almacenamiento. Publicar es cambiar el FK de ReleasePointer (O(1), atómico).
+
+Lectura (ReleaseMiddleware):
+    - sin parámetro         -> documento del release publicado (si existe);
+                               lo que no esté en el release sale de las tablas vivas,
+                               salvo con un import en curso (503: las tablas están a medias).
+    - ?release=<nombre>     -> documento de ese release (404 si no lo contiene).
+    - ?release=live         -> siempre las tablas vivas (p.ej. revisar un import).
+
+El release publicado tiene que coincidir con las tablas vivas fuera de un
+import: cualquier cambio de versión confirmado fuera de uno (admin, DataFix,
+build_equivalences, ...) retira el puntero y las lecturas vuelven a las tablas
+vivas hasta el siguiente release. Un import en curso es un ImportCheckpoint
+abierto y actualizado hace menos de IMPORT_STALE_AFTER_MINUTES (import_db_taxonomies);
+al empezar, el import publica el estado actual si no había release
+(freeze_for_import) y publica uno nuevo al terminar.
+
+    python manage.py releases stage --publish    # o automáticamente al final del import
+"""
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.urls import resolve
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+
+from .caching import SKIP_CACHE_META
+from .compression import compressed_variants
+from .models import (
+    Taxonomy, EnvironmentalObjective, Sector, Activity,
+    Release, ReleaseBlob, ReleasePointer, ImportCheckpoint,
+)
+from .versioning import get_dataset_version
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/api/"
+RELEASE_PARAM = "release"
+RELEASE_LIVE = "live"
+RELEASE_HEADER = "X-Dataset-Release"
+# Parámetros que no forman parte de la identidad del documento
+IGNORED_PARAMS = frozenset({RELEASE_PARAM, "format"})
+# Rutas fuera del release que se sirven vivas aunque haya un import en curso (no exponen filas)
+LIVE_DURING_IMPORT = ("releases/",)
+IMPORT_RETRY_AFTER = 60  # segundos (cabecera Retry-After del 503)
+
+BLOB_CACHE_PREFIX = "release-blob"
+_LOOKUP_CHUNK = 500
+_MAX_CACHED_MANIFESTS = 8
+
+
+# -----------------------
+# Documentos
+# -----------------------
+def document_key(path: str, params=None) -> str:
+    """'taxonomies/3/objectives/5/sectors/' + {'only_case1': '1'} -> clave estable (query ordenada)."""
+    params = params or {}
+    getlist = getattr(params, "getlist", lambda k: [params[k]])  # QueryDict o dict
+    items = sorted((k, v) for k in params if k not in IGNORED_PARAMS for v in getlist(k))
+    if not items:
+        return path
+    return path + "?" + "&".join(f"{k}={v}" for k, v in items)
+
+
+def iter_release_paths():
+    """Todas las rutas de lectura del frontend, en claves de document_key()."""
+    yield "taxonomies/"
+    yield "matrix/objectives/"
+    for t in Taxonomy.objects.order_by("id").values_list("id", flat=True):
+        yield f"taxonomies/{t}/"
+        yield f"taxonomies/{t}/detail/"
+        yield f"taxonomies/{t}/environmental-objectives/"
+        yield f"taxonomies/{t}/sectors/"
+    for o, t in EnvironmentalObjective.objects.order_by("id").values_list("id", "taxonomy_id"):
+        yield f"objectives/{o}/"
+        yield f"taxonomies/{t}/objectives/{o}/sectors/"
+        yield document_key(f"taxonomies/{t}/objectives/{o}/sectors/", {"only_case1": "1"})
+        yield document_key("adaptation-whitelists/", {"taxonomy": str(t), "objective": str(o)})
+        yield document_key("adaptation-general-criteria/", {"taxonomy": str(t), "objective": str(o)})
+    for s, t, o in Sector.objects.order_by("id").values_list("id", "taxonomy_id", "environmental_objective_id"):
+        yield f"sectors/{s}/"
+        yield f"taxonomies/{t}/objectives/{o}/sectors/{s}/activities/"
+    for a in Activity.objects.order_by("id").values_list("id", flat=True):
+        yield f"activities/{a}/criteria/"
+
+
+def render_path(key: str, factory=None):
+    """Renderiza un documento desde las tablas vivas (misma vista que la API); None si no es 200."""
+    from django.test import RequestFactory  # solo al construir releases
+
+    factory = factory or RequestFactory()
+    match = resolve(API_PREFIX + key.partition("?")[0])
+    request = factory.get(API_PREFIX + key, HTTP_ACCEPT="application/json", **{SKIP_CACHE_META: True})
+    response = match.func(request, *match.args, **match.kwargs)
+    if hasattr(response, "render") and not response.is_rendered:
+        response.render()
+    if response.status_code != 200:
+        return None
+    return response.content
+
+
+# -----------------------
+# Staging / publicación
+# -----------------------
+def _default_name(version: int) -> str:
+    name, n = f"v{version}", 1
+    while Release.objects.filter(name=name).exists():
+        n += 1
+        name = f"v{version}-{n}"
+    return name
+
+
+def stage_release(name=None) -> Release:
+    """Congela los documentos actuales en un Release nuevo (sin publicarlo)."""
+    from django.test import RequestFactory
+
+    version = get_dataset_version()
+    factory = RequestFactory()
+    documents, blobs = {}, {}
+    for key in iter_release_paths():
+        content = render_path(key, factory)
+        if content is None:
+            continue
+        digest = hashlib.sha1(content).hexdigest()
+        documents[key] = digest
+        blobs.setdefault(digest, content)
+
+    digests = list(blobs)
+    existing = set()
+    for i in range(0, len(digests), _LOOKUP_CHUNK):
+        existing.update(
+            ReleaseBlob.objects.filter(digest__in=digests[i:i + _LOOKUP_CHUNK]).values_list("digest", flat=True)
+        )
+    with transaction.atomic():
+        ReleaseBlob.objects.bulk_create(
+            [ReleaseBlob(digest=d, content=c) for d, c in blobs.items() if d not in existing],
+            batch_size=200, ignore_conflicts=True,
+        )
+        return Release.objects.create(
+            name=name or _default_name(version), dataset_version=version, documents=documents,
+        )
+
+
+def publish_release(release: Release) -> Release:
+    """Cambio atómico del puntero: a partir de aquí las lecturas sirven este release."""
+    with transaction.atomic():
+        ReleasePointer.objects.update_or_create(pk=1, defaults={"release": release})
+        # staged, o retirado y vuelto a publicar a mano (releases publish): conserva la primera fecha
+        release.status = Release.STATUS_PUBLISHED
+        release.published_at = release.published_at or timezone.now()
+        release.save(update_fields=["status", "published_at"])
+    return release
+
+
+def get_published_release_id():
+    return ReleasePointer.objects.filter(pk=1).values_list("release_id", flat=True).first()
+
+
+def import_in_progress() -> bool:
+    """
+    Hay un import a medias: las tablas vivas no son un estado coherente. Un
+    checkpoint que nadie actualiza desde hace settings.IMPORT_STALE_AFTER_MINUTES
+    es de un import muerto o abandonado sin --resume: no cuenta, y las lecturas
+    vuelven a las tablas vivas en vez de 503 indefinidos.
+    """
+    cutoff = timezone.now() - timedelta(minutes=settings.IMPORT_STALE_AFTER_MINUTES)
+    return ImportCheckpoint.objects.filter(updated_at__gte=cutoff).exists()
+
+
+def retire_published_release(version=None, **kwargs):
+    """
+    Receptor de versioning.dataset_committed: un cambio fuera de un import deja
+    el release publicado por detrás de las tablas, así que se retira el puntero
+    (las lecturas vuelven a las tablas vivas) y el release queda en estado
+    "retired" con un warning en el log: hasta el siguiente `releases stage
+    --publish` o import no hay release publicado. Dentro de un import no se toca:
+    los lectores siguen en el release hasta que el import publique el suyo.
+    """
+    if import_in_progress():
+        return
+    with transaction.atomic():
+        pointer = ReleasePointer.objects.select_for_update().select_related("release").filter(pk=1).first()
+        if pointer is None:
+            return
+        release = pointer.release
+        pointer.delete()
+        release.status = Release.STATUS_RETIRED
+        release.save(update_fields=["status"])
+    logger.warning(
+        "Release %s retirado: el dataset cambió fuera de un import (v%s); se sirven las tablas vivas "
+        "hasta publicar otro release (manage.py releases stage --publish).",
+        release.name, version,
+    )
+
+
+def freeze_for_import():
+    """Al empezar un import: si no hay release publicado, congela y publica el estado actual. None si ya lo había."""
+    if get_published_release_id() is not None:
+        return None
+    return publish_release(stage_release())
+
+
+def prune_releases(keep=None):
+    """Borra releases antiguos (nunca el publicado) y los blobs que ya nadie referencia. keep: settings.RELEASES_KEEP."""
+    if keep is None:
+        keep = settings.RELEASES_KEEP
+    current = get_published_release_id()
+    keep_ids = set(Release.objects.values_list("id", flat=True)[:keep])
+    if current is not None:
+        keep_ids.add(current)
+    with transaction.atomic():
+        deleted, _ = Release.objects.exclude(id__in=keep_ids).delete()
+        referenced = set()
+        for documents in Release.objects.values_list("documents", flat=True):
+            referenced.update(documents.values())
+        orphans = [d for d in ReleaseBlob.objects.values_list("digest", flat=True) if d not in referenced]
+        for i in range(0, len(orphans), _LOOKUP_CHUNK):
+            ReleaseBlob.objects.filter(digest__in=orphans[i:i + _LOOKUP_CHUNK]).delete()
+    _manifests.clear()
+    return deleted, len(orphans)
+
+
+# -----------------------
+# Lectura
+# -----------------------
+_manifests = {}  # release_id -> (name, documents); los releases son inmutables
+
+
+def _manifest(release_id):
+    entry = _manifests.get(release_id)
+    if entry is None:
+        row = Release.objects.filter(id=release_id).values_list("name", "documents").first()
+        if row is None:
+            return None
+        if len(_manifests) >= _MAX_CACHED_MANIFESTS:
+            _manifests.clear()
+        entry = _manifests[release_id] = row
+    return entry
+
+
+def _blob_entry(digest):
+    key = f"{BLOB_CACHE_PREFIX}:{digest}"
+    entry = cache.get(key)
+    if entry is None:
+        content = ReleaseBlob.objects.filter(digest=digest).values_list("content", flat=True).first()
+        if content is None:
+            return None
+        content = bytes(content)
+        entry = {"content": content, "variants": compressed_variants(content)}
+        cache.set(key, entry, settings.API_RESPONSE_CACHE_TIMEOUT)
+    return entry
+
+
+def _wants_json(request):
+    fmt = request.GET.get("format")
+    if fmt:
+        return fmt == "json"
+    return "text/html" not in request.META.get("HTTP_ACCEPT", "")
+
+
+def release_response(request):
+    """Respuesta servida desde un release, o None para seguir con la vista normal."""
+    name = request.GET.get(RELEASE_PARAM)
+    if name == RELEASE_LIVE or request.META.get(SKIP_CACHE_META):
+        return None
+    if name is None:
+        if not _wants_json(request):
+            return None
+        release_id = get_published_release_id()
+        if release_id is None:
+            return None
+    else:
+        release_id = Release.objects.filter(name=name).values_list("id", flat=True).first()
+        if release_id is None:
+            return JsonResponse({"error": "Release not found"}, status=404)
+
+    manifest = _manifest(release_id)
+    path = request.path[len(API_PREFIX):]
+    key = document_key(path, request.GET)
+    entry = _blob_entry(manifest[1][key]) if manifest and key in manifest[1] else None
+    if entry is None:
+        if name is not None:
+            return JsonResponse({"error": "Document not part of this release"}, status=404)
+        if path.startswith(LIVE_DURING_IMPORT) or not import_in_progress():
+            return None
+        # Las tablas vivas están a medias: no mezclar con el release publicado
+        response = JsonResponse({"error": "Import in progress; document not part of the published release"}, status=503)
+        response["Retry-After"] = str(IMPORT_RETRY_AFTER)
+        return response
+
+    response = HttpResponse(entry["content"], content_type="application/json")
+    response.precompressed = entry["variants"]
+    response[RELEASE_HEADER] = manifest[0]
+    patch_vary_headers(response, ("Accept",))
+    return response
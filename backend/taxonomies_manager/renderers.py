@@ -0,0 +1,71 @@
+"""
+Renderer JSON rápido para respuestas grandes (listas de actividades, detail/).
+
+Produce exactamente los mismos bytes que rest_framework.renderers.JSONRenderer
+con la configuración por defecto (UTF-8, separadores compactos, sin NaN y con
+U+2028/U+2029 escapados), pero usando orjson cuando está instalado. Si orjson
+no está disponible, o se pide indentación (?format=json; indent=4, browsable
+API), se delega en el renderer de DRF.
+
+Donde orjson escribe distinto que json.dumps también se delega o se usa el
+encoder de DRF:
+    - fechas/horas: OPT_PASSTHROUGH_DATETIME -> encoder de DRF ("Z" para UTC,
+      milisegundos), igual que el resto de tipos que orjson no conoce
+    - floats con exponente en repr() (|x| < 1e-4 o >= 1e16: "1e-05", no
+      "0.00001") y NaN/inf (DRF los rechaza con ValueError): la respuesta
+      entera va por DRF. Se detectan con un recorrido previo (~1 ms por 1000
+      filas, muy por debajo de lo que cuesta DRF).
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+
+def _has_special_float(data):
+    """True si hay algún float que orjson no escribe como repr() (o que DRF rechaza)."""
+    stack = [(data,)]
+    while stack:
+        obj = stack.pop()
+        for value in (obj.values() if isinstance(obj, dict) else obj):
+            kind = type(value)
+            if kind is str or kind is int or kind is bool or value is None:
+                continue
+            if kind is float:
+                if not (value == 0 or 1e-4 <= abs(value) < 1e16):
+                    return True
+            elif isinstance(value, (dict, list, tuple)):
+                stack.append(value)
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def _can_use_orjson(self, indent):
+        return orjson is not None and indent is None and self.compact and not self.ensure_ascii
+
+    def _default(self, obj):
+        # Tipos que orjson no conoce (Decimal, lazy strings, ...) -> mismo encoder que DRF
+        return self.encoder_class().default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if not self._can_use_orjson(indent) or _has_special_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data, default=self._default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except TypeError:
+            # p.ej. enteros fuera de 64 bits: que decida el camino de DRF
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Igual que DRF: \u2028 y \u2029 siempre escapados (subset estricto de JS)
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,155 @@
+"""
+Lecturas de la API contra réplicas (DATABASE_REPLICA_URLS).
+
+La API solo lee; las escrituras vienen del admin y de los comandos de import.
+ReadReplicaMiddleware marca los GET de /api/ y ReplicaRouter manda sus lecturas
+a una réplica (round-robin por request, la misma réplica durante todo el
+request). Todo lo demás (admin, comandos, escrituras) va a "default".
+
+- Retraso: cada REPLICA_CHECK_INTERVAL segundos se compara DatasetVersion de
+  cada réplica con la del primario; las que van por detrás (o no responden)
+  quedan fuera hasta el siguiente chequeo. Si no queda ninguna, primario.
+- Leer lo que uno acaba de escribir: si un request escribe, la respuesta deja
+  la cookie REPLICA_PIN_COOKIE durante REPLICA_PIN_SECONDS y los requests de
+  ese cliente leen del primario mientras tanto. Dentro del mismo request,
+  después de una escritura, las lecturas también van al primario.
+
+Sin réplicas configuradas ni el router ni el middleware se instalan.
+"""
+import contextvars
+import itertools
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+
+REPLICA_PREFIX = "replica"
+REPLICA_PIN_COOKIE = "db_pin_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# {"replica": alias o None, "wrote": bool} mientras dura un request
+_request_db = contextvars.ContextVar("request_db", default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+# -----------------------
+# Salud / retraso de las réplicas (por worker)
+# -----------------------
+_lock = threading.Lock()
+_health = {"checked": None, "replicas": []}
+_round_robin = itertools.count()
+
+
+def _version(alias):
+    from .models import DatasetVersion
+
+    version = DatasetVersion.objects.using(alias).filter(pk=1).values_list("version", flat=True).first()
+    return version or 0
+
+
+def healthy_replicas():
+    """Réplicas al día con el primario (misma versión del dataset), revisadas cada REPLICA_CHECK_INTERVAL s."""
+    now = time.monotonic()
+    checked = _health["checked"]
+    if checked is not None and now - checked < settings.REPLICA_CHECK_INTERVAL:
+        return _health["replicas"]
+    with _lock:
+        if _health["checked"] is None or now - _health["checked"] >= settings.REPLICA_CHECK_INTERVAL:
+            primary = _version(DEFAULT_DB_ALIAS)
+            healthy = []
+            for alias in replica_aliases():
+                try:
+                    if _version(alias) >= primary:
+                        healthy.append(alias)
+                except DatabaseError:
+                    continue
+            _health.update(checked=time.monotonic(), replicas=healthy)
+        return _health["replicas"]
+
+
+def choose_replica():
+    replicas = healthy_replicas()
+    if not replicas:
+        return None
+    return replicas[next(_round_robin) % len(replicas)]
+
+
+# -----------------------
+# Router
+# -----------------------
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request_db.get()
+        if state is None or state["wrote"] or state["replica"] is None:
+            return DEFAULT_DB_ALIAS
+        return state["replica"]
+
+    def db_for_write(self, model, **hints):
+        state = _request_db.get()
+        # Las escrituras de DatabaseCache (app_label "django_cache") no son datos
+        if state is not None and model._meta.app_label != "django_cache":
+            state["wrote"] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mismos datos en primario y réplicas
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por replicación
+        return not db.startswith(REPLICA_PREFIX)
+
+
+class ReadReplicaMiddleware:
+    """GET/HEAD de la API -> réplica (salvo cookie de pin); cualquier escritura deja la cookie de pin."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = {"replica": self._replica(request), "wrote": False}
+        token = _request_db.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_db.reset(token)
+        return self._pin(request, response, state)
+
+    async def __acall__(self, request):
+        # sync_to_async copia el contexto: el ORM async ve el mismo estado (mismo dict)
+        state = {"replica": await sync_to_async(self._replica)(request), "wrote": False}
+        token = _request_db.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_db.reset(token)
+        return self._pin(request, response, state)
+
+    def _replica(self, request):
+        if (
+            request.method in SAFE_METHODS
+            and request.path.startswith(tuple(settings.REPLICA_READ_PATH_PREFIXES))
+            and REPLICA_PIN_COOKIE not in request.COOKIES
+        ):
+            return choose_replica()
+        return None
+
+    def _pin(self, request, response, state):
+        if state["wrote"]:
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, "1", max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite="Lax", secure=request.is_secure(),
+            )
+        return response
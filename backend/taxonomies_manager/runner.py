@@ -0,0 +1,20 @@
+"""
+Runner de `manage.py test` (settings.TEST_RUNNER): toda la suite corre con
+QUERY_BUDGET_MODE="raise", así que cualquier test que pase por una vista con
+presupuesto falla si lo supera (ver querybudget.py), no solo QueryBudgetTests.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from .querybudget import MODE_RAISE
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._query_budget = override_settings(QUERY_BUDGET_MODE=MODE_RAISE)
+        self._query_budget.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._query_budget.disable()
+        super().teardown_test_environment(**kwargs)
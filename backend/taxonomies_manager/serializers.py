@@ -2,10 +2,13 @@ from rest_framework import serializers
 from .models import (
     Taxonomy, EnvironmentalObjective, Sector, Subsector,
     Activity, Practice, 
-    RwandaAdaptation, AdaptationWhitelist, AdaptationGeneralCriterion
-
+    RwandaAdaptation, AdaptationWhitelist, AdaptationGeneralCriterion,
+    ActivityEquivalence,
 )
-from .constants import OBJECTIVE_MEO
+from .constants import OBJECTIVE_MEO, PRACTICE_LEVEL_ORDER
+from .texts import values_with_texts, with_shared_texts
+from django.db.models import Case, Count, F, IntegerField, QuerySet, Value, When
+from django.db.models.functions import Lower
 import unicodedata
 
 def _norm(s: str) -> str:
@@ -73,7 +76,18 @@ class ActivitySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Activity
-        fields = "__all__"
+        # explícitos: los DNSH son textos compartidos (propiedades sobre *_ref), no columnas
+        fields = (
+            "id", "taxonomy", "environmental_objective", "sector",
+            "taxonomy_code", "economic_code_system", "economic_code", "name", "description",
+            "contribution_type", "sc_criteria_type",
+            "substantial_contribution_criteria", "non_eligibility_criteria",
+            "sc_criteria_green", "sc_criteria_amber", "sc_criteria_red",
+            "dnsh_climate_mitigation", "dnsh_climate_adaptation", "dnsh_water",
+            "dnsh_circular_economy", "dnsh_pollution_prevention",
+            "dnsh_biodiversity", "dnsh_land_management",
+            "subsector",
+        )
 
 class ActivityCriteriaSerializer(serializers.ModelSerializer):
     class Meta:
@@ -96,6 +110,24 @@ class ActivityCriteriaSerializer(serializers.ModelSerializer):
             "dnsh_land_management",
         ]
 
+class ActivityBriefSerializer(serializers.ModelSerializer):
+    taxonomy = TaxonomyBriefSerializer(read_only=True)
+    environmental_objective = EnvironmentalObjectiveBriefSerializer(read_only=True)
+
+    class Meta:
+        model = Activity
+        fields = (
+            "id", "taxonomy", "environmental_objective",
+            "taxonomy_code", "economic_code_system", "economic_code", "name",
+        )
+
+class ActivityEquivalenceSerializer(serializers.ModelSerializer):
+    activity = ActivityBriefSerializer(source="target", read_only=True)
+
+    class Meta:
+        model = ActivityEquivalence
+        fields = ("score", "code_score", "name_score", "method", "activity")
+
 # --- Practices (MEO) ---
 class PracticeSerializer(serializers.ModelSerializer):
     """
@@ -112,11 +144,17 @@ class PracticeSerializer(serializers.ModelSerializer):
 
 
 class RwandaAdaptationSerializer(serializers.ModelSerializer):
-    taxonomy = TaxonomySerializer(read_only=True)
+    # Brief: description/dnsh_general/mss de la taxonomía no se repiten en cada fila
+    taxonomy = TaxonomyBriefSerializer(read_only=True)
 
     class Meta:
         model = RwandaAdaptation
-        fields = "__all__"
+        fields = (
+            "id", "taxonomy", "language", "environmental_objective",
+            "sector", "hazard", "division", "investment",
+            "expected_effect", "expected_result",
+            "type", "level", "criteria_type", "generic_dnsh", "source_ref",
+        )
 
 # --- Adaptation: CASO2 (whitelist por sector) ---
 class AdaptationWhitelistSerializer(serializers.ModelSerializer):
@@ -182,10 +220,180 @@ class PracticeSlimSerializer(serializers.ModelSerializer):
         ]
 
 
+def slim_rows(items, serializer_class):
+    """
+    Camino rápido para los slim serializers: dicts planos en el mismo orden de
+    campos que `serializer_class.Meta.fields`, sin pasar campo a campo por DRF.
+
+    Todos los campos de los slim serializers son columnas simples (texto, choices
+    o id) o textos compartidos, así que el JSON resultante es idéntico al de
+    `serializer_class(...).data`.
+    - QuerySet sin evaluar -> una sola consulta (values_with_texts).
+    - QuerySet ya evaluado/prefetch o lista de instancias -> getattr sobre las
+      instancias (precargar con with_shared_texts).
+    """
+    fields = serializer_class.Meta.fields
+    if isinstance(items, QuerySet) and items._result_cache is None:
+        return list(values_with_texts(items, *fields))
+    return [{f: getattr(obj, f) for f in fields} for obj in items]
+
+
+class RwandaMeasureSlimSerializer(serializers.ModelSerializer):
+    """Fila Rwanda sin taxonomía ni sector/hazard/division (van en la agrupación)."""
+    class Meta:
+        model = RwandaAdaptation
+        fields = [
+            "id", "language", "environmental_objective", "investment",
+            "expected_effect", "expected_result",
+            "type", "level", "criteria_type", "generic_dnsh", "source_ref",
+        ]
+
+
+RWANDA_FACET_FIELDS = ("type", "level", "criteria_type")
+
+
+def count_facets(qs, fields):
+    """
+    {campo: {valor: n}} para cada campo de `fields` con un solo GROUP BY sobre
+    todos ellos; luego se pliega en Python (pocas combinaciones).
+    """
+    facets = {field: {} for field in fields}
+    grouped = qs.order_by().values(*fields).annotate(n=Count("id"))
+    for row in grouped:
+        for field in fields:
+            facets[field][row[field]] = facets[field].get(row[field], 0) + row["n"]
+    return facets
+
+
+def rwanda_facets(qs):
+    """Conteos por type / level / criteria_type (ver count_facets)."""
+    return count_facets(qs, RWANDA_FACET_FIELDS)
+
+
+def rwanda_grouped(qs):
+    """
+    Medidas Rwanda agrupadas sector -> hazard -> division, desde una sola
+    consulta ordenada, más los conteos por faceta:
+      {"count", "facets", "generic_dnsh", "sectors": [{"name", "hazards": [{"name", "divisions": [{"name", "measures": [...]}]}]}]}
+
+    `generic_dnsh` suele ser el mismo texto en todas las filas: si es único se
+    emite una sola vez en la raíz y se quita de cada medida (si no, null en la
+    raíz y se mantiene por medida).
+    """
+    fields = RwandaMeasureSlimSerializer.Meta.fields
+    dnsh_values = list(qs.order_by().values_list("generic_dnsh_ref__content", flat=True).distinct()[:2])
+    common_dnsh = (dnsh_values[0] or "") if len(dnsh_values) == 1 else None
+    if common_dnsh is not None:
+        fields = [f for f in fields if f != "generic_dnsh"]
+    rows = values_with_texts(qs.order_by("sector", "hazard", "division", "id"), "sector", "hazard", "division", *fields)
+
+    sectors = []
+    count = 0
+    sector = hazard = division = None
+    for row in rows:
+        count += 1
+        if sector is None or sector["name"] != row["sector"]:
+            sector = {"name": row["sector"], "hazards": []}
+            sectors.append(sector)
+            hazard = None
+        if hazard is None or hazard["name"] != row["hazard"]:
+            hazard = {"name": row["hazard"], "divisions": []}
+            sector["hazards"].append(hazard)
+            division = None
+        if division is None or division["name"] != row["division"]:
+            division = {"name": row["division"], "measures": []}
+            hazard["divisions"].append(division)
+        division["measures"].append({f: row[f] for f in fields})
+
+    return {"count": count, "facets": rwanda_facets(qs), "generic_dnsh": common_dnsh, "sectors": sectors}
+
+
+def practice_level_rank():
+    """
+    Posición del nivel en PRACTICE_LEVEL_ORDER como expresión SQL (los niveles
+    se guardan en minúsculas: "additional eligible green practices"); los
+    niveles desconocidos van al final.
+    """
+    return Case(
+        *[When(practice_level__iexact=level, then=Value(i)) for i, level in enumerate(PRACTICE_LEVEL_ORDER)],
+        default=Value(len(PRACTICE_LEVEL_ORDER)),
+        output_field=IntegerField(),
+    )
+
+
+def practice_ladder(qs):
+    """
+    Prácticas MEO agrupadas sector -> subsector -> nivel (orden canónico de
+    PRACTICE_LEVEL_ORDER), desde una sola consulta ordenada en la base, con
+    conteos por nivel:
+      {"count", "levels", "counts", "sectors": [{"id", "name", "count", "counts",
+        "subsectors": [{"id", "name", "levels": [{"level", "count", "practices": [...]}]}]}]}
+    Las prácticas sin subsector van en un subsector {"id": null, "name": null}.
+    Los niveles se agrupan sin distinguir mayúsculas ("BASIC" = "basic"); un
+    nivel desconocido sale con la primera grafía que aparece.
+    """
+    canonical = {level.lower(): level for level in PRACTICE_LEVEL_ORDER}
+    fields = [f for f in PracticeSlimSerializer.Meta.fields if f != "practice_level"]
+    rows = (
+        qs.annotate(level_rank=practice_level_rank())
+        .order_by(
+            "sector__name", "sector_id",
+            F("subsector__name").asc(nulls_first=True), F("subsector_id").asc(nulls_first=True),
+            "level_rank", Lower("practice_level"), "practice_name", "id",
+        )
+        .values("sector_id", "sector__name", "subsector_id", "subsector__name", "practice_level", *fields)
+    )
+
+    totals = dict.fromkeys(PRACTICE_LEVEL_ORDER, 0)
+    sectors = []
+    sector = subsector = level = None
+    for row in rows:
+        name = canonical.setdefault(row["practice_level"].lower(), row["practice_level"])
+        if sector is None or sector["id"] != row["sector_id"]:
+            sector = {"id": row["sector_id"], "name": row["sector__name"], "count": 0, "counts": {}, "subsectors": []}
+            sectors.append(sector)
+            subsector = None
+        if subsector is None or subsector["id"] != row["subsector_id"]:
+            subsector = {"id": row["subsector_id"], "name": row["subsector__name"], "levels": []}
+            sector["subsectors"].append(subsector)
+            level = None
+        if level is None or level["level"] != name:
+            level = {"level": name, "count": 0, "practices": []}
+            subsector["levels"].append(level)
+        level["practices"].append({f: row[f] for f in fields})
+        level["count"] += 1
+        sector["count"] += 1
+        sector["counts"][name] = sector["counts"].get(name, 0) + 1
+        totals[name] = totals.get(name, 0) + 1
+
+    return {
+        "count": sum(totals.values()),
+        "levels": list(totals),
+        "counts": totals,
+        "sectors": sectors,
+    }
+
+
 # ==================================================
 #  Serializers anidados para navegación FE
 # ==================================================
 
+def adaptation_whitelists_queryset(qs=None):
+    """Orden y select_related con los que ObjectiveDetailSerializer agrupa el Caso 2 (también para Prefetch)."""
+    qs = AdaptationWhitelist.objects.all() if qs is None else qs
+    return qs.select_related("taxonomy", "environmental_objective", "sector").order_by("sector__name", "title")
+
+
+def adaptation_general_criteria_queryset(qs=None):
+    qs = AdaptationGeneralCriterion.objects.all() if qs is None else qs
+    return qs.select_related("taxonomy", "environmental_objective").order_by("title")
+
+
+def _prefetched(obj, name):
+    """Resultado de prefetch_related para `name`, o None si no se precargó."""
+    return getattr(obj, "_prefetched_objects_cache", {}).get(name)
+
+
 class SectorWithContentSerializer(serializers.ModelSerializer):
     """
     Devuelve, por sector, sus Activities (clásicas) y sus Practices (solo si el objetivo es MEO).
@@ -200,7 +408,9 @@ class SectorWithContentSerializer(serializers.ModelSerializer):
 
     def get_activities(self, obj):
         # actividades del sector (para objetivos clásicos)
-        qs = obj.activities.all().select_related("sector", "environmental_objective", "taxonomy")
+        if self.context.get("fast_rows"):
+            return slim_rows(obj.activities.all(), ActivitySlimSerializer)
+        qs = with_shared_texts(obj.activities.all().select_related("sector", "environmental_objective", "taxonomy"))
         return ActivitySlimSerializer(qs, many=True).data
 
     def get_practices(self, obj):
@@ -208,6 +418,8 @@ class SectorWithContentSerializer(serializers.ModelSerializer):
         label = _norm((obj.environmental_objective.display_name or obj.environmental_objective.generic_name or ""))
         if label not in (_norm(OBJECTIVE_MEO), "multiple environmental objectives", "meo"):
             return []
+        if self.context.get("fast_rows"):
+            return slim_rows(obj.practices.all(), PracticeSlimSerializer)
         qs = obj.practices.all().select_related("sector", "environmental_objective", "taxonomy")
         return PracticeSlimSerializer(qs, many=True).data
 
@@ -246,19 +458,20 @@ class ObjectiveDetailSerializer(serializers.ModelSerializer):
         return "adapt" in norm  # cubre "adaptation" y "adaptación"
 
     def get_sectors(self, obj):
-        qs = obj.sectors.all().select_related("taxonomy", "environmental_objective")
-        return SectorWithContentSerializer(qs, many=True).data
+        # Con prefetch (taxonomy_detail_nested) no hay que volver a consultar: un
+        # .select_related() aquí descartaría la precarga de subsectors/activities/practices
+        sectors = _prefetched(obj, "sectors")
+        if sectors is None:
+            sectors = obj.sectors.all().select_related("taxonomy", "environmental_objective")
+        return SectorWithContentSerializer(sectors, many=True, context=self.context).data
 
     def get_adaptation_whitelists(self, obj):
         # ✅ solo si es objetivo de adaptación
         if not self._is_adaptation(obj):
             return []
-        items = (
-            obj.adaptation_whitelists
-            .select_related("taxonomy", "environmental_objective", "sector")
-            .all()
-            .order_by("sector__name", "title")
-        )
+        items = _prefetched(obj, "adaptation_whitelists")
+        if items is None:
+            items = adaptation_whitelists_queryset(obj.adaptation_whitelists.all())
         # Agrupar por sector
         grouped = {}
         for it in items:
@@ -274,34 +487,52 @@ class ObjectiveDetailSerializer(serializers.ModelSerializer):
     def get_adaptation_general_criteria(self, obj):
         if not self._is_adaptation(obj):
             return []
-        items = (
-            obj.adaptation_general_criteria
-            .select_related("taxonomy", "environmental_objective")
-            .all()
-            .order_by("title")
-        )
+        items = _prefetched(obj, "adaptation_general_criteria")
+        if items is None:
+            items = adaptation_general_criteria_queryset(obj.adaptation_general_criteria.all())
         return AdaptationGeneralCriterionSerializer(items, many=True).data
 
 
 class TaxonomyDetailSerializer(serializers.ModelSerializer):
     """
     Una taxonomía con objetivos (anidados) + (opcional) medidas Rwanda.
+
+    `rwanda_adaptation` es la lista de filas de siempre. Con el contexto
+    `rwanda_grouped` (?rwanda=grouped en el detalle) sale en su lugar
+    `rwanda_adaptation_grouped`, con la forma de rwanda_grouped().
+    Si la taxonomía viene anotada con `has_rwanda` (Exists) y es False, no se
+    consulta la tabla Rwanda.
     """
     objectives = ObjectiveDetailSerializer(many=True, read_only=True)
     # Si quieres adjuntar Rwanda en el detalle de la taxonomía:
     rwanda_adaptation = serializers.SerializerMethodField()
+    rwanda_adaptation_grouped = serializers.SerializerMethodField()
 
     class Meta:
         model = Taxonomy
         fields = [
             "id", "name", "description", "region", "country_code", "language",
-            "dnsh_general", "mss", "objectives", "rwanda_adaptation"
+            "dnsh_general", "mss", "objectives", "rwanda_adaptation", "rwanda_adaptation_grouped",
         ]
 
+    def get_fields(self):
+        fields = super().get_fields()
+        fields.pop("rwanda_adaptation" if self.context.get("rwanda_grouped") else "rwanda_adaptation_grouped")
+        return fields
+
+    def _rwanda_rows(self, obj):
+        # none(): sin filas Rwanda no se lanza ninguna consulta
+        has_rwanda = getattr(obj, "has_rwanda", True)
+        return obj.rwanda_adaptation_rows.all() if has_rwanda else RwandaAdaptation.objects.none()
+
     def get_rwanda_adaptation(self, obj):
-        rows = obj.rwanda_adaptation_rows.all()
+        rows = with_shared_texts(self._rwanda_rows(obj).select_related("taxonomy")).order_by("id")
         return RwandaAdaptationSerializer(rows, many=True).data
 
+    def get_rwanda_adaptation_grouped(self, obj):
+        # Agrupado sector -> hazard -> division; la taxonomía ya va en la raíz
+        return rwanda_grouped(self._rwanda_rows(obj))
+
 
 # ========================================
 #  Validaciones extra (opcional pero útil)
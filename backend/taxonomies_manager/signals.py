@@ -0,0 +1,31 @@
+from django.db.models.signals import post_save, post_delete
+
+from .models import (
+    Taxonomy, EnvironmentalObjective, Sector, Subsector,
+    Activity, Practice, RwandaAdaptation,
+    AdaptationWhitelist, AdaptationGeneralCriterion,
+)
+from .versioning import record_change, dataset_committed, CREATE, UPDATE, DELETE
+from .releases import retire_published_release
+
+# Modelos cuyo contenido sale por la API (cualquier cambio sube la versión y queda en el change log)
+TRACKED_MODELS = (
+    Taxonomy, EnvironmentalObjective, Sector, Subsector,
+    Activity, Practice, RwandaAdaptation,
+    AdaptationWhitelist, AdaptationGeneralCriterion,
+)
+
+
+def _on_save(sender, instance, created, **kwargs):
+    record_change(instance, CREATE if created else UPDATE)
+
+
+def _on_delete(sender, instance, **kwargs):
+    record_change(instance, DELETE)
+
+
+def connect_signals():
+    dataset_committed.connect(retire_published_release, dispatch_uid="retire_published_release")
+    for model in TRACKED_MODELS:
+        post_save.connect(_on_save, sender=model, dispatch_uid=f"dataset_version_save_{model.__name__}")
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=f"dataset_version_delete_{model.__name__}")
@@ -0,0 +1,203 @@
+"""
+Sugerencias para autocompletar (GET /api/suggest/?q=&taxonomy=&limit=).
+
+Índice en memoria sobre Activity.name / taxonomy_code, Practice.practice_name,
+Sector.name y Subsector.name, construido a partir del grafo (graph.py) y
+reconstruido con él cuando cambia la versión del dataset. Textos normalizados
+con serializers._norm (sin acentos, minúsculas).
+
+Orden de los resultados:
+    0. el código empieza por la consulta ("CCM 4." -> CCM 4.1, 4.2, ..., 4.10),
+       luego los nombres que empiezan por ella
+    1. cada palabra de la consulta es prefijo de alguna palabra ("sol ener")
+    2. parecido por trigramas palabra a palabra (erratas: "hydrogne"), solo si
+       faltan resultados
+Dentro de cada grupo, textos más cortos primero.
+"""
+import bisect
+import re
+import threading
+from collections import Counter
+
+from .graph import get_graph
+from .serializers import _norm
+
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_DEFAULT_LIMIT = 10
+SUGGEST_MAX_LIMIT = 50
+TRIGRAM_MIN_SIMILARITY = 0.4
+
+# Palabras y códigos tipo "4.1"; en la consulta se admite el punto final ("4.")
+_WORD_RE = re.compile(r"\w+(?:\.\w+)*")
+_QUERY_WORD_RE = re.compile(r"\w+(?:\.\w+)*\.?")
+_KIND_ORDER = {"activity": 0, "practice": 1, "sector": 2, "subsector": 3}
+
+
+def _code_key(code):
+    # "CCM 4.10" después de "CCM 4.9"
+    return tuple((0, int(p), "") if p.isascii() and p.isdigit() else (1, 0, p) for p in re.findall(r"\d+|\D+", code))
+
+
+def _trigrams(word):
+    # Como pg_trgm: "  hydrogen " -> "  h", " hy", "hyd", ...
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Entry:
+    __slots__ = ("kind", "node", "taxonomy_id", "label", "code", "norm", "norm_code")
+
+    def __init__(self, kind, node, taxonomy_id, label, code=""):
+        self.kind = kind
+        self.node = node
+        self.taxonomy_id = taxonomy_id
+        self.label = label
+        self.code = code
+        self.norm = _norm(label)
+        self.norm_code = _norm(code)
+
+
+def _path(graph, sector, subsector_id=None):
+    objective = sector.objective
+    path = [
+        {"type": "taxonomy", "id": sector.taxonomy.id, "name": sector.taxonomy.name},
+        {"type": "objective", "id": objective.id, "name": objective.display_name or objective.generic_name},
+        {"type": "sector", "id": sector.id, "name": sector.name},
+    ]
+    subsector = graph.subsectors.get(subsector_id)
+    if subsector is not None:
+        path.append({"type": "subsector", "id": subsector.id, "name": subsector.name})
+    return path
+
+
+class SuggestIndex:
+    def __init__(self, graph):
+        self.graph = graph
+        entries = []
+        for s in graph.sectors.values():
+            entries.append(_Entry("sector", s, s.taxonomy.id, s.name))
+            for a in s.activities:
+                entries.append(_Entry("activity", a, a.taxonomy_id, a.name, a.taxonomy_code))
+            for p in s.practices:
+                if p.name:
+                    entries.append(_Entry("practice", p, s.taxonomy.id, p.name))
+        for ss in graph.subsectors.values():
+            entries.append(_Entry("subsector", ss, ss.sector.taxonomy.id, ss.name))
+        self.entries = entries
+
+        # Palabras ordenadas -> entradas (prefijos con bisect); trigramas -> palabras (erratas)
+        postings = {}
+        for i, e in enumerate(entries):
+            for word in set(_WORD_RE.findall(f"{e.norm_code} {e.norm}")):
+                postings.setdefault(word, []).append(i)
+        self.words = sorted(postings)
+        self.postings = postings
+        self.word_trigrams = [_trigrams(w) for w in self.words]
+        self.trigrams = {}
+        for w, grams in enumerate(self.word_trigrams):
+            for tri in grams:
+                self.trigrams.setdefault(tri, []).append(w)
+
+    def _prefix_matches(self, token):
+        lo = bisect.bisect_left(self.words, token)
+        hi = bisect.bisect_left(self.words, token + "\uffff")
+        found = set()
+        for word in self.words[lo:hi]:
+            found.update(self.postings[word])
+        return found
+
+    def _similar(self, token):
+        """Entradas con alguna palabra parecida a `token` (Jaccard de trigramas) -> mejor parecido."""
+        grams = _trigrams(token.rstrip("."))
+        shared = Counter()
+        for tri in grams:
+            shared.update(self.trigrams.get(tri, ()))
+        scores = {}
+        for w, n in shared.items():
+            similarity = n / (len(grams) + len(self.word_trigrams[w]) - n)
+            if similarity >= TRIGRAM_MIN_SIMILARITY:
+                for i in self.postings[self.words[w]]:
+                    scores[i] = max(scores.get(i, 0.0), similarity)
+        return scores
+
+    def _fuzzy_matches(self, tokens):
+        """Cada palabra de la consulta por prefijo o por parecido; puntuación = el peor parecido."""
+        result = None
+        for token in tokens:
+            scores = dict.fromkeys(self._prefix_matches(token), 1.0)
+            if len(token) >= 3:
+                for i, similarity in self._similar(token).items():
+                    scores.setdefault(i, similarity)
+            if result is None:
+                result = scores
+            else:
+                result = {i: min(score, scores[i]) for i, score in result.items() if i in scores}
+            if not result:
+                break
+        return result or {}
+
+    def search(self, q, taxonomy_id=None, limit=SUGGEST_DEFAULT_LIMIT):
+        query = _norm(q)
+        tokens = _QUERY_WORD_RE.findall(query)
+        if not tokens:
+            return []
+        entries = self.entries
+
+        candidates = None
+        for token in tokens:
+            found = self._prefix_matches(token)
+            candidates = found if candidates is None else candidates & found
+            if not candidates:
+                break
+
+        ranked = {}
+        for i in candidates or ():
+            e = entries[i]
+            if taxonomy_id is not None and e.taxonomy_id != taxonomy_id:
+                continue
+            if e.norm_code and e.norm_code.startswith(query):
+                ranked[i] = (0, 0, _code_key(e.norm_code))
+            elif e.norm.startswith(query):
+                ranked[i] = (0, 1, (len(e.label),))
+            else:
+                ranked[i] = (1, 0, (len(e.label),))
+        if len(ranked) < limit and len(query) >= 3:
+            for i, score in self._fuzzy_matches(tokens).items():
+                if i not in ranked and (taxonomy_id is None or entries[i].taxonomy_id == taxonomy_id):
+                    ranked[i] = (2, 0, (-score, len(entries[i].label)))
+
+        best = sorted(ranked, key=lambda i: (ranked[i], _KIND_ORDER[entries[i].kind], entries[i].node.id))[:limit]
+        return [self._result(entries[i]) for i in best]
+
+    def _result(self, e):
+        node, graph = e.node, self.graph
+        if e.kind == "sector":
+            path = _path(graph, node)[:-1]
+        elif e.kind == "subsector":
+            path = _path(graph, node.sector)
+        else:
+            path = _path(graph, node.sector, node.subsector_id)
+        return {
+            "type": e.kind,
+            "id": node.id,
+            "label": e.label,
+            "code": e.code or None,
+            "taxonomy_id": e.taxonomy_id,
+            "path": path,
+        }
+
+
+_lock = threading.Lock()
+_index = None
+
+
+def get_suggest_index() -> SuggestIndex:
+    """Índice del grafo actual (se reconstruye cuando get_graph() devuelve otro grafo)."""
+    global _index
+    graph = get_graph()
+    if _index is not None and _index.graph is graph:
+        return _index
+    with _lock:
+        if _index is None or _index.graph is not graph:
+            _index = SuggestIndex(graph)
+        return _index
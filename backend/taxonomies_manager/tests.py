@@ -1,3 +1,1322 @@
-from django.test import TestCase
+import datetime
+import json
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.module_loading import import_string
+import pandas as pd
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+
+from . import classifier, equivalences, import_sources, routers
+from .management.commands import import_db_taxonomies
+from .models import (
+    Taxonomy, EnvironmentalObjective, Sector, Subsector, Activity, Practice,
+    AdaptationWhitelist, AdaptationGeneralCriterion, ActivityEquivalence, ChangeLogEntry, ImportCheckpoint,
+    RwandaAdaptation, SharedText, Release,
+)
+from .admin import ActivityAdmin
+from .renderers import FastJSONRenderer
+from .serializers import (
+    ActivitySlimSerializer, PracticeSlimSerializer, TaxonomyDetailSerializer, slim_rows,
+)
+from .datafix import DataFix
+from .constants import ENV_OBJECTIVES, OBJECTIVE_MEO, PRACTICE_LEVEL_ORDER
+from .querybudget import QueryBudgetExceeded, fingerprint
+from .texts import TEXT_REF_KEY, prune_shared_texts, with_shared_texts
+from .versioning import (
+    CREATE, DELETE, UPDATE, _merge, bump_dataset_version, dataset_batch, get_dataset_version,
+)
+from .warming import WarmingError, warm_caches
+from .graph import TaxonomyGraph
+from .suggest import SuggestIndex
+from .views import MATRIX_COUNTED_MODELS, ActivityViewSet
+from .releases import (
+    RELEASE_HEADER, RELEASE_LIVE, RELEASE_PARAM, get_published_release_id, publish_release, stage_release,
+)
+
+
+# Las páginas del admin usan {% static %}: sin collectstatic, el storage sin manifest
+PLAIN_STATIC_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+def make_dataset():
+    """Taxonomía mínima con una actividad clásica y una práctica MEO (textos con acentos y U+2028)."""
+    taxonomy = Taxonomy.objects.create(name="Test", region="Europe", dnsh_general="DNSH común", mss="MSS")
+    mitigation = EnvironmentalObjective.objects.create(
+        taxonomy=taxonomy, generic_name="Climate mitigation", display_name="Mitigación",
+    )
+    meo = EnvironmentalObjective.objects.create(
+        taxonomy=taxonomy, generic_name=OBJECTIVE_MEO, display_name=OBJECTIVE_MEO,
+    )
+    energy = Sector.objects.create(taxonomy=taxonomy, environmental_objective=mitigation, name="Energía")
+    afolu = Sector.objects.create(taxonomy=taxonomy, environmental_objective=meo, name="AFOLU")
+    Activity.objects.create(
+        taxonomy=taxonomy, environmental_objective=mitigation, sector=energy,
+        taxonomy_code="CCM 4.1", economic_code="D35.11", name="Generación solar",
+        description="Línea 1\u2028línea 2 \"citada\" \\ barra",
+        substantial_contribution_criteria="≤ 100 gCO2e/kWh",
+        dnsh_water="Sin impacto\tsignificativo\n",
+    )
+    Practice.objects.create(
+        taxonomy=taxonomy, environmental_objective=meo, sector=afolu,
+        practice_level="basic", practice_name="Rotación de cultivos",
+        eligible_practices="Práctica \u2029 elegible",
+    )
+    return taxonomy
+
+
+def admin_change_form(client, obj):
+    """GET de la página de cambio del admin: (url, form) con los valores actuales como datos del POST."""
+    url = f"/admin/taxonomies_manager/{obj._meta.model_name}/{obj.pk}/change/"
+    return url, client.get(url).context["adminform"].form
+
+
+class FastJSONPathTests(TestCase):
+    """El camino rápido (slim_rows + FastJSONRenderer) debe producir los mismos bytes que DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.taxonomy = make_dataset()
+
+    def assertSameBytes(self, fast_data, drf_data):
+        self.assertEqual(FastJSONRenderer().render(fast_data), JSONRenderer().render(drf_data))
+
+    def test_activity_slim_rows_match_serializer(self):
+        qs = Activity.objects.all()
+        self.assertSameBytes(slim_rows(qs, ActivitySlimSerializer), ActivitySlimSerializer(qs, many=True).data)
+        # misma salida desde instancias ya cargadas (prefetch)
+        self.assertSameBytes(slim_rows(list(qs), ActivitySlimSerializer), ActivitySlimSerializer(qs, many=True).data)
+
+    def test_practice_slim_rows_match_serializer(self):
+        qs = Practice.objects.all()
+        self.assertSameBytes(slim_rows(qs, PracticeSlimSerializer), PracticeSlimSerializer(qs, many=True).data)
+
+    def test_renderer_matches_drf_for_indent_and_empty(self):
+        data = {"texto": "ñ\u2028\u2029", "n": 1, "vacío": None, "lista": [True, False]}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+        indented = "application/json; indent=2"
+        self.assertEqual(
+            FastJSONRenderer().render(data, indented), JSONRenderer().render(data, indented),
+        )
+
+    def test_renderer_matches_drf_for_datetimes_and_floats(self):
+        moment = datetime.datetime(2026, 3, 1, 9, 30, 15, 123456, tzinfo=datetime.timezone.utc)
+        data = [{
+            "utc": moment, "naive": moment.replace(tzinfo=None), "fecha": moment.date(), "hora": moment.time(),
+            "decimal": Decimal("0.50"),
+            "floats": [0.0, -0.0, 0.3, 1.0, 0.0001, 1e-05, 5e-05, -2.5e-07, 1e15, 1e16, 1.5e300],
+        }]
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render({"score": 0.8125}), JSONRenderer().render({"score": 0.8125}))
+        for value in (float("nan"), float("inf")):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                FastJSONRenderer().render([{"score": value}])
+
+    def test_releases_endpoint_uses_drf_datetimes(self):
+        release = publish_release(stage_release())
+        response = self.client.get("/api/releases/", HTTP_ACCEPT="application/json")
+        self.assertEqual(response.json()[0]["created_at"], json.loads(JSONRenderer().render(release.created_at)))
+        self.assertTrue(response.json()[0]["created_at"].endswith("Z"))
+
+    def test_detail_endpoint_matches_classic_serializer(self):
+        response = self.client.get(f"/api/taxonomies/{self.taxonomy.id}/detail/", HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200)
+        expected = JSONRenderer().render(TaxonomyDetailSerializer(self.taxonomy).data)
+        self.assertEqual(response.content, expected)
+
+    def test_activities_endpoint_matches_classic_serializer(self):
+        a = Activity.objects.get()
+        url = f"/api/taxonomies/{self.taxonomy.id}/objectives/{a.environmental_objective_id}/sectors/{a.sector_id}/activities/"
+        response = self.client.get(url, HTTP_ACCEPT="application/json")
+        expected = JSONRenderer().render(ActivitySlimSerializer(Activity.objects.all(), many=True).data)
+        self.assertEqual(response.content, expected)
+
+
+def add_adaptation_objectives(taxonomy, n=6, start=0):
+    """Objetivos de adaptación con sectores, whitelists y criterios: una consulta por objetivo salta el presupuesto."""
+    for i in range(start, start + n):
+        objective = EnvironmentalObjective.objects.create(
+            taxonomy=taxonomy, generic_name=f"Climate adaptation {i}", display_name=f"Adaptación {i}",
+        )
+        sector = Sector.objects.create(taxonomy=taxonomy, environmental_objective=objective, name=f"Agua {i}")
+        Activity.objects.create(
+            taxonomy=taxonomy, environmental_objective=objective, sector=sector,
+            taxonomy_code=f"CCA {i}.1", name=f"Riego eficiente {i}",
+        )
+        AdaptationWhitelist.objects.create(
+            taxonomy=taxonomy, environmental_objective=objective, sector=sector, title=f"Lista {i}",
+        )
+        AdaptationGeneralCriterion.objects.create(
+            taxonomy=taxonomy, environmental_objective=objective, title=f"Criterio {i}",
+        )
+
+
+@override_settings(API_RESPONSE_CACHE_ENABLED=False)
+class AsyncViewTests(TransactionTestCase):
+    """
+    Las variantes async devuelven lo mismo que las sync sin tocar FKs perezosas en el event loop.
+    TransactionTestCase: las lecturas concurrentes van por otras conexiones y deben ver los datos.
+    """
+
+    def setUp(self):
+        self.taxonomy = make_dataset()
+        add_adaptation_objectives(self.taxonomy, n=1)
+
+    def test_middleware_chain_is_async_capable(self):
+        # Un solo middleware solo-sync hace que Django pase todo el request (y la vista) a un hilo
+        for path in settings.MIDDLEWARE:
+            with self.subTest(middleware=path):
+                self.assertTrue(getattr(import_string(path), "async_capable", False))
+
+    async def test_async_views_match_sync_views(self):
+        activity = await Activity.objects.filter(taxonomy_code="CCM 4.1").afirst()
+        adaptation = await AdaptationWhitelist.objects.afirst()
+        t, o, sec = self.taxonomy.id, activity.environmental_objective_id, activity.sector_id
+        paths = [
+            f"taxonomies/{t}/hierarchy/",
+            f"taxonomies/{t}/environmental-objectives/",
+            f"taxonomies/{t}/sectors/",
+            f"taxonomies/{t}/objectives/{o}/sectors/?only_case1=1",
+            f"taxonomies/{t}/objectives/{o}/sectors/{sec}/activities/",
+            f"activities/{activity.id}/criteria/",
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                response = await self.async_client.get(f"/api/async/{path}")
+                self.assertEqual(response.status_code, 200)
+                expected = await sync_to_async(self.client.get)(f"/api/{path}", HTTP_ACCEPT="application/json")
+                self.assertEqual(response.json(), expected.json())
+
+        response = await self.async_client.get(
+            f"/api/async/taxonomies/{t}/objectives/{adaptation.environmental_objective_id}/adaptation/"
+        )
+        self.assertEqual(response.status_code, 200)
+        [group] = response.json()["adaptation_whitelists"]
+        self.assertEqual(group["sector"]["name"], "Agua 0")
+        self.assertEqual(group["entries"][0]["sector"]["name"], "Agua 0")
+        self.assertEqual(len(response.json()["adaptation_general_criteria"]), 1)
+
+        response = await self.async_client.get("/api/async/search/", {"q": "solar", "taxonomy": str(t)})
+        self.assertEqual([row["taxonomy_code"] for row in response.json()], ["CCM 4.1"])
+
+
+@override_settings(QUERY_BUDGET_MODE="raise", API_RESPONSE_CACHE_ENABLED=False)
+class QueryBudgetTests(TestCase):
+    """Cada vista con presupuesto debe cumplirlo aunque crezca el número de objetivos / sectores / filas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.taxonomy = make_dataset()
+        add_adaptation_objectives(cls.taxonomy)
+
+    def get(self, url):
+        response = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertIn(response.status_code, (200, 404), url)
+        return response
+
+    def test_read_endpoints_stay_within_budget(self):
+        t = self.taxonomy
+        a = Activity.objects.filter(taxonomy_code="CCA 0.1").get()
+        urls = [
+            "/api/taxonomies/", f"/api/taxonomies/{t.id}/", f"/api/taxonomies/{t.id}/detail/",
+            f"/api/taxonomies/{t.id}/environmental-objectives/", f"/api/taxonomies/{t.id}/sectors/",
+            f"/api/taxonomies/{t.id}/objectives/{a.environmental_objective_id}/sectors/",
+            f"/api/taxonomies/{t.id}/objectives/{a.environmental_objective_id}/sectors/{a.sector_id}/activities/",
+            f"/api/taxonomies/{t.id}/hierarchy/", f"/api/activities/{a.id}/criteria/",
+            "/api/objectives/", "/api/sectors/", "/api/activities/", "/api/activities/?facets=1",
+            "/api/practices/", "/api/practices/?facets=1", "/api/practices/ladder/",
+            "/api/adaptation-whitelists/", "/api/adaptation-general-criteria/",
+            "/api/matrix/objectives/", "/api/changes/", "/api/suggest/?q=riego",
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.get(url)  # en frío: carga del grafo (exenta)
+                response = self.get(url)
+                self.assertGreater(response.query_count, 0)
+
+    def test_detail_query_count_does_not_grow_with_objectives(self):
+        url = f"/api/taxonomies/{self.taxonomy.id}/detail/"
+        before = self.get(url).query_count
+        add_adaptation_objectives(self.taxonomy, n=3, start=6)
+        self.assertEqual(self.get(url).query_count, before)
+
+    def test_over_budget_raises(self):
+        url = f"/api/taxonomies/{self.taxonomy.id}/detail/"
+        with override_settings(QUERY_BUDGETS={"taxonomy-detail-nested": 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(url, HTTP_ACCEPT="application/json")
+
+    def test_fingerprint_ignores_literals(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 5 AND name = 'a''b' AND x IN (%s, %s)"),
+            fingerprint("SELECT  *\nFROM t WHERE id = 7 AND name = 'c' AND x IN (%s)"),
+        )
+
+
+class ResumableImportTests(TestCase):
+    """Un import cortado a mitad deja los bloques completos y --resume termina sin repetirlos."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.source = Path(tmp.name)
+        lines = ["taxonomy,environmental_objective,sector,activity,taxonomy_code,substantial_contribution_criteria"]
+        lines += [f"Test,Climate mitigation,Energía,Actividad {i},CCM {i},umbral" for i in range(7)]
+        (self.source / "main.csv").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    def run_import(self, *args, fail_at=None):
+        original = import_db_taxonomies.Command.import_main_row
+
+        def import_main_row(command, i, row, counters):
+            if i == fail_at:
+                raise RuntimeError("fallo simulado")
+            return original(command, i, row, counters)
+
+        with mock.patch.object(import_sources, "IMPORT_CHUNK_ROWS", 3), \
+                mock.patch.object(import_db_taxonomies.Command, "import_main_row", import_main_row):
+            call_command("import_db_taxonomies", "--file", str(self.source), *args, stdout=StringIO(), stderr=StringIO())
+
+    def test_resume_continues_from_last_chunk(self):
+        with self.assertRaises(RuntimeError):
+            self.run_import(fail_at=4)
+        # filas 0-2 escritas; el bloque 3-5 hizo rollback (también en el change log)
+        self.assertEqual(Activity.objects.count(), 3)
+        self.assertEqual(ChangeLogEntry.objects.filter(model="activity").count(), 3)
+        checkpoint = ImportCheckpoint.objects.get()
+        self.assertEqual((checkpoint.sheet, checkpoint.offset), (import_sources.SHEET_MAIN, 3))
+
+        with mock.patch.object(Activity.objects, "update_or_create", wraps=Activity.objects.update_or_create) as upsert:
+            self.run_import("--resume")
+        self.assertEqual(upsert.call_count, 4)
+        self.assertEqual(Activity.objects.count(), 7)
+        self.assertEqual(ChangeLogEntry.objects.filter(model="activity", action="create").count(), 7)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+
+class ReleaseReadTests(TestCase):
+    """El release publicado nunca se mezcla con tablas vivas de otro momento."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.taxonomy = make_dataset()
+
+    def setUp(self):
+        self.release = publish_release(stage_release())
+        self.sector = Sector.objects.get(name="Energía")
+
+    def get(self, url):
+        return self.client.get(url, HTTP_ACCEPT="application/json")
+
+    def edit_sector(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sector.name = "Energía editada"
+            self.sector.save()
+
+    def test_edit_outside_import_retires_release(self):
+        url = f"/api/sectors/{self.sector.id}/"
+        self.assertEqual(self.get(url)[RELEASE_HEADER], self.release.name)
+        with self.assertLogs("taxonomies_manager.releases", "WARNING"):
+            self.edit_sector()
+        with self.captureOnCommitCallbacks(execute=True):
+            Taxonomy.objects.create(name="Nueva")
+
+        response = self.get(url)
+        self.assertNotIn(RELEASE_HEADER, response)
+        self.assertEqual(response.json()["name"], "Energía editada")
+        self.assertIn("Nueva", [t["name"] for t in self.get("/api/taxonomies/").json()])
+
+    def test_import_in_progress_serves_only_the_release(self):
+        ImportCheckpoint.objects.create(command="import_db_taxonomies", source_hash="x", sheet="main")
+        self.edit_sector()
+
+        response = self.get(f"/api/sectors/{self.sector.id}/")
+        self.assertEqual(response[RELEASE_HEADER], self.release.name)
+        self.assertEqual(response.json()["name"], "Energía")
+        self.assertEqual(self.get("/api/activities/").status_code, 503)
+        self.assertEqual(self.get("/api/releases/").status_code, 200)
+        live = self.get(f"/api/sectors/{self.sector.id}/?{RELEASE_PARAM}={RELEASE_LIVE}")
+        self.assertEqual(live.json()["name"], "Energía editada")
+
+    @override_settings(IMPORT_STALE_AFTER_MINUTES=30)
+    def test_stale_checkpoint_does_not_block_reads(self):
+        checkpoint = ImportCheckpoint.objects.create(command="import_db_taxonomies", source_hash="x", sheet="main")
+        ImportCheckpoint.objects.filter(pk=checkpoint.pk).update(updated_at=timezone.now() - datetime.timedelta(minutes=31))
+        self.assertEqual(self.get("/api/activities/").status_code, 200)
+        # y un cambio fuera del import (abandonado) retira el release como siempre
+        with self.assertLogs("taxonomies_manager.releases", "WARNING"):
+            self.edit_sector()
+        response = self.get(f"/api/sectors/{self.sector.id}/")
+        self.assertNotIn(RELEASE_HEADER, response)
+        self.assertEqual(response.json()["name"], "Energía editada")
+
+    def assertRetired(self):
+        self.release.refresh_from_db()
+        self.assertEqual(self.release.status, Release.STATUS_RETIRED)
+        self.assertIsNone(get_published_release_id())
+        listed = {r["name"]: r["status"] for r in self.get("/api/releases/").json()}
+        self.assertEqual(listed[self.release.name], Release.STATUS_RETIRED)
+
+    @override_settings(STORAGES=PLAIN_STATIC_STORAGES)
+    def test_admin_edit_marks_release_retired(self):
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "a@example.com", "pw"))
+        url, form = admin_change_form(self.client, Activity.objects.get(taxonomy=self.taxonomy))
+        data = {**{k: v for k, v in form.initial.items() if v is not None}, "name": "Solar editada"}
+        with self.assertLogs("taxonomies_manager.releases", "WARNING") as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self.client.post(url, data).status_code, 302)
+        self.assertIn(self.release.name, logs.output[0])
+        self.assertRetired()
+
+    def test_datafix_marks_release_retired(self):
+        eu = Taxonomy.objects.create(name="EU", region="Europe")
+        objective = EnvironmentalObjective.objects.create(taxonomy=eu, generic_name="Climate mitigation")
+        sector = Sector.objects.create(taxonomy=eu, environmental_objective=objective, name="Energía")
+        Activity.objects.create(
+            taxonomy=eu, environmental_objective=objective, sector=sector, name="Solar", sc_criteria_type="traffic_light",
+        )
+        self.release = publish_release(stage_release())
+        with self.assertLogs("taxonomies_manager.releases", "WARNING"):
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("fix_activities", stdout=StringIO())
+        self.assertRetired()
+
+    def test_republishing_a_retired_release(self):
+        with self.assertLogs("taxonomies_manager.releases", "WARNING"):
+            self.edit_sector()
+        published_at = Release.objects.get(pk=self.release.pk).published_at
+        publish_release(self.release)
+        self.release.refresh_from_db()
+        self.assertEqual((self.release.status, self.release.published_at), (Release.STATUS_PUBLISHED, published_at))
+        self.assertEqual(get_published_release_id(), self.release.pk)
+
+
+@override_settings(DEBUG=False, SECURE_SSL_REDIRECT=True, ALLOWED_HOSTS=[".taxonomy.example.org"])
+class WarmingTests(TransactionTestCase):
+    """En producción (https forzado, hosts restringidos) el calentado en proceso tiene que llegar a las vistas."""
+
+    def setUp(self):
+        self.taxonomy = make_dataset()
+
+    def test_warms_with_ssl_redirect(self):
+        paths = ["taxonomies/", f"taxonomies/{self.taxonomy.id}/detail/"]
+        stats = warm_caches(paths=paths, concurrency=1)
+        self.assertEqual((stats["warmed"], stats["failed"]), (2, 0))
+
+    def test_client_error_is_a_configuration_error(self):
+        with self.assertRaises(WarmingError):
+            warm_caches(paths=["taxonomies/", "taxonomies/999999/"], concurrency=1)
+
+
+@override_settings(API_RESPONSE_CACHE_ENABLED=False)
+class ListFilterTests(TestCase):
+    """Gramática de filtros de los listados (filters.py): multi-valor, repetidos, negación, prefijos y 400."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.taxonomy = make_dataset()
+        add_adaptation_objectives(cls.taxonomy, n=3)
+        cls.codes = dict(Activity.objects.values_list("taxonomy_code", "sector_id"))
+
+    def codes_for(self, query):
+        response = self.client.get(f"/api/activities/?{query}", HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200, query)
+        data = response.json()
+        rows = data["results"] if isinstance(data, dict) else data
+        return sorted(row["taxonomy_code"] for row in rows)
+
+    def test_multi_value_repeated_and_negated_ids(self):
+        s0, s1 = self.codes["CCA 0.1"], self.codes["CCA 1.1"]
+        self.assertEqual(self.codes_for(f"sector={s0},{s1}"), ["CCA 0.1", "CCA 1.1"])
+        self.assertEqual(self.codes_for(f"sector={s0}&sector={s1}"), ["CCA 0.1", "CCA 1.1"])
+        self.assertEqual(self.codes_for(f"sector=!{s0},{s1}"), ["CCA 2.1", "CCM 4.1"])
+
+    def test_prefix_filter_is_case_insensitive(self):
+        self.assertEqual(self.codes_for("taxonomy_code_prefix=ccm 4.,CCA 2"), ["CCA 2.1", "CCM 4.1"])
+
+    def test_objective_by_name_or_id(self):
+        meo = EnvironmentalObjective.objects.get(generic_name=OBJECTIVE_MEO)
+        by_name = self.client.get(f"/api/practices/?objective={OBJECTIVE_MEO}", HTTP_ACCEPT="application/json")
+        by_id = self.client.get(f"/api/practices/?objective={meo.id}", HTTP_ACCEPT="application/json")
+        self.assertEqual(by_name.content, by_id.content)
+        self.assertIn("Rotación de cultivos", by_name.content.decode())
+
+    def test_non_ascii_digits_are_rejected(self):
+        for url in (
+            "/api/activities/?taxonomy=²", "/api/activities/?sector=1,٣", "/api/suggest/?q=riego&taxonomy=²",
+            "/api/changes/?since=²", f"/api/activities/{Activity.objects.first().id}/equivalents/?limit=²",
+            "/api/rwanda-adaptation/grouped/?taxonomy=²",
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, HTTP_ACCEPT="application/json").status_code, 400)
+        response = self.client.post("/api/classify/", {"descriptions": ["solar"], "k": True}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(API_RESPONSE_CACHE_ENABLED=True)
+class ResponseCacheTests(TestCase):
+    """La cache de respuestas no mezcla variantes del mismo documento."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.taxonomy = make_dataset()
+
+    def test_accept_params_do_not_poison_the_cache(self):
+        url = "/api/taxonomies/?x=1"
+        indented = self.client.get(url, HTTP_ACCEPT="application/json; indent=4")
+        self.assertIn(b"\n    ", indented.content)
+        plain = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertNotIn(b"\n", plain.content)
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT="application/json").content, plain.content)
+
+
+@override_settings(API_RESPONSE_CACHE_ENABLED=False)
+class TextRefsTests(TestCase):
+    """?texts=refs: los textos largos repetidos salen una vez en "texts" y la expansión da la respuesta de siempre."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.taxonomy = make_dataset()
+        a = Activity.objects.get()
+        cls.shared = "Sin impacto significativo en masas de agua; cumple el plan hidrológico de cuenca vigente."
+        for i in range(2):
+            Activity.objects.create(
+                taxonomy=cls.taxonomy, environmental_objective=a.environmental_objective, sector=a.sector,
+                taxonomy_code=f"CCM 4.{i + 2}", name=f"Eólica {i}", dnsh_water=cls.shared,
+            )
+
+    def get(self, url):
+        return self.client.get(url, HTTP_ACCEPT="application/json").json()
+
+    @staticmethod
+    def expand(payload):
+        texts = payload["texts"]
+
+        def _expand(data):
+            if isinstance(data, dict):
+                if set(data) == {TEXT_REF_KEY}:
+                    return texts[data[TEXT_REF_KEY]]
+                return {k: _expand(v) for k, v in data.items()}
+            if isinstance(data, list):
+                return [_expand(item) for item in data]
+            return data
+
+        return _expand(payload["data"])
+
+    def test_repeated_texts_become_references(self):
+        plain = self.get("/api/activities/")
+        payload = self.get("/api/activities/?texts=refs")
+        self.assertEqual(list(payload["texts"].values()), [self.shared])
+        self.assertNotIn(self.shared, str(payload["data"]))
+        self.assertEqual(self.expand(payload), plain)
+
+    def test_detail_accepts_text_refs(self):
+        url = f"/api/taxonomies/{self.taxonomy.id}/detail/"
+        self.assertEqual(self.expand(self.get(url + "?texts=refs")), self.get(url))
+
+
+@override_settings(API_RESPONSE_CACHE_ENABLED=False, STORAGES=PLAIN_STATIC_STORAGES)
+class SharedTextTests(TestCase):
+    """Los DNSH repetidos se guardan una vez en SharedText; la API, el admin y el change log siguen viendo texto."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.taxonomy = make_dataset()
+        cls.activity = Activity.objects.get()
+        cls.shared = "Cumple la Directiva Marco del Agua y el plan hidrológico de cuenca."
+        cls.others = [
+            Activity.objects.create(
+                taxonomy=cls.taxonomy, environmental_objective=cls.activity.environmental_objective,
+                sector=cls.activity.sector, taxonomy_code=f"CCM 4.{i + 2}", economic_code="D35.11", name=f"Eólica {i}",
+                dnsh_water=cls.shared, dnsh_biodiversity=cls.shared,
+            )
+            for i in range(2)
+        ]
+
+    def test_identical_texts_share_one_row(self):
+        a, b = self.others
+        self.assertEqual(a.dnsh_water_ref_id, b.dnsh_biodiversity_ref_id)
+        self.assertEqual(SharedText.objects.filter(content=self.shared).count(), 1)
+        self.assertEqual(SharedText.objects.count(), 2)  # + el dnsh_water de make_dataset
+        self.assertIsNone(a.dnsh_land_management_ref)
+        self.assertEqual(Activity.objects.get(pk=a.pk).dnsh_land_management, "")
+
+    def test_api_emits_texts(self):
+        activity = self.activity
+        rows = self.client.get(
+            f"/api/taxonomies/{self.taxonomy.id}/objectives/{activity.environmental_objective_id}"
+            f"/sectors/{activity.sector_id}/activities/",
+            HTTP_ACCEPT="application/json",
+        ).json()
+        by_id = {r["id"]: r for r in rows}
+        self.assertEqual(by_id[activity.id]["dnsh_water"], "Sin impacto\tsignificativo\n")
+        self.assertEqual(by_id[activity.id]["dnsh_land_management"], "")
+        self.assertEqual([by_id[a.id]["dnsh_water"] for a in self.others], [self.shared, self.shared])
+        # values() y prefetch dan lo mismo que el serializer campo a campo
+        qs = Activity.objects.order_by("id")
+        self.assertEqual(slim_rows(qs, ActivitySlimSerializer), ActivitySlimSerializer(qs, many=True).data)
+        with self.assertNumQueries(1):
+            self.assertEqual(slim_rows(list(with_shared_texts(qs)), ActivitySlimSerializer), slim_rows(qs, ActivitySlimSerializer))
+        detail = self.client.get(f"/api/activities/{self.others[0].id}/", HTTP_ACCEPT="application/json").json()
+        self.assertEqual(detail["dnsh_biodiversity"], self.shared)
+        self.assertNotIn("dnsh_biodiversity_ref", detail)
+
+    def test_admin_edits_text(self):
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "a@example.com", "pw"))
+        activity = self.others[0]
+        url, form = admin_change_form(self.client, activity)
+        self.assertEqual(form.initial["dnsh_water"], self.shared)
+        self.assertNotIn("dnsh_water_ref", form.fields)
+        data = {**{k: v for k, v in form.initial.items() if v is not None}, "dnsh_water": "Nuevo texto"}
+        self.assertEqual(self.client.post(url, data).status_code, 302)
+        activity.refresh_from_db()
+        self.assertEqual(activity.dnsh_water, "Nuevo texto")
+        self.assertEqual(activity.dnsh_biodiversity, self.shared)
+
+    def test_change_log_and_prune(self):
+        activity = self.others[0]
+        activity.dnsh_water = "Otro texto"
+        activity.save()
+        data = ChangeLogEntry.objects.filter(model="activity", object_id=activity.pk).latest("id").data
+        self.assertEqual(data["dnsh_water"], "Otro texto")
+        self.assertNotIn("dnsh_water_ref_id", data)
+
+        self.assertEqual(prune_shared_texts(), 0)  # el texto sigue en uso por la otra actividad
+        Activity.objects.filter(pk=self.others[1].pk).update(dnsh_water_ref=None, dnsh_biodiversity_ref=None)
+        activity.dnsh_biodiversity = ""
+        activity.save()
+        self.assertEqual(prune_shared_texts(), 1)
+        self.assertFalse(SharedText.objects.filter(content=self.shared).exists())
+
+
+@override_settings(API_RESPONSE_CACHE_ENABLED=False)
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES)
+class AdminSearchTests(TestCase):
+    """La búsqueda del admin encuentra por nombre de taxonomía, sector u objetivo también con el índice full-text."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.test = Activity.objects.get(taxonomy=make_dataset())
+        eu = Taxonomy.objects.create(name="EU", region="Europe")
+        objective = EnvironmentalObjective.objects.create(taxonomy=eu, generic_name="Climate mitigation")
+        transport = Sector.objects.create(taxonomy=eu, environmental_objective=objective, name="Transporte")
+        cls.eu = Activity.objects.create(
+            taxonomy=eu, environmental_objective=objective, sector=transport,
+            taxonomy_code="CCM 6.1", name="Tren solar",
+        )
+        cls.admin_user = get_user_model().objects.create_superuser("admin", "a@example.com", "pw")
+
+    def search(self, q):
+        self.client.force_login(self.admin_user)
+        response = self.client.get("/admin/taxonomies_manager/activity/", {"q": q})
+        return {obj.pk for obj in response.context["cl"].result_list}
+
+    def assertSearches(self):
+        both = {self.test.pk, self.eu.pk}
+        self.assertEqual(self.search("solar"), both)
+        self.assertEqual(self.search("EU"), {self.eu.pk})
+        self.assertEqual(self.search("energía"), {self.test.pk})
+        self.assertEqual(self.search("transporte solar"), {self.eu.pk})
+        self.assertEqual(self.search("mitigation"), both)
+        self.assertEqual(self.search("EU energía"), set())
+        self.assertEqual(self.search("ccm 6."), {self.eu.pk})
+
+    def test_icontains_search(self):
+        self.assertFalse(ActivityAdmin(Activity, admin.site).uses_fulltext(Activity.objects.all()))
+        self.assertSearches()
+
+    def test_fulltext_search_includes_related_fields(self):
+        # SQLite no tiene to_tsvector: el índice se sustituye por icontains sobre sus mismas columnas
+        def fulltext_match(admin, word):
+            condition = Q()
+            for field in admin.fulltext_fields:
+                condition |= Q(**{f"{field}__icontains": word})
+            return condition
+
+        with mock.patch.object(ActivityAdmin, "uses_fulltext", return_value=True), \
+                mock.patch.object(ActivityAdmin, "fulltext_match", fulltext_match):
+            self.assertSearches()
+
+
+class RwandaDetailTests(TestCase):
+    """Rwanda en el detalle: lista por defecto, agrupado con ?rwanda=grouped, sin consultas si no hay filas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.plain = make_dataset()
+        cls.rwanda = Taxonomy.objects.create(name="Rwanda", region="Africa")
+        common = {
+            "taxonomy": cls.rwanda, "environmental_objective": "Climate adaptation",
+            "type": "Adapted", "level": "Measure", "criteria_type": "Process-based", "generic_dnsh": "DNSH genérico",
+        }
+        rows = [
+            ("Energy", "Floods", "Hydro", "Raise intakes"),
+            ("Agriculture", "Drought", "Crops", "Drip irrigation"),
+            ("Agriculture", "Drought", "Crops", "Mulching"),
+            ("Agriculture", "Floods", "Livestock", "Raised shelters"),
+        ]
+        cls.rows = [
+            RwandaAdaptation.objects.create(**common, sector=s, hazard=h, division=d, investment=i)
+            for s, h, d, i in rows
+        ]
+        RwandaAdaptation.objects.filter(pk=cls.rows[0].pk).update(level="Activity")
+
+    def detail(self, taxonomy, query=""):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(f"/api/taxonomies/{taxonomy.id}/detail/{query}", HTTP_ACCEPT="application/json").json()
+        return data, [q["sql"] for q in ctx.captured_queries if "rwandaadaptation" in q["sql"]]
+
+    def test_default_keeps_row_list(self):
+        data, queries = self.detail(self.rwanda)
+        self.assertNotIn("rwanda_adaptation_grouped", data)
+        self.assertEqual([r["id"] for r in data["rwanda_adaptation"]], [r.id for r in self.rows])
+        self.assertEqual(data["rwanda_adaptation"][1]["generic_dnsh"], "DNSH genérico")
+        self.assertEqual(data["rwanda_adaptation"][1]["taxonomy"]["name"], "Rwanda")
+        self.assertEqual(len(queries), 2)  # Exists() en la consulta de la taxonomía + las filas
+
+    def test_grouped_on_request(self):
+        data, queries = self.detail(self.rwanda, "?rwanda=grouped")
+        self.assertNotIn("rwanda_adaptation", data)
+        grouped = data["rwanda_adaptation_grouped"]
+        self.assertEqual(grouped["count"], 4)
+        self.assertEqual(grouped["generic_dnsh"], "DNSH genérico")
+        self.assertEqual(grouped["facets"]["level"], {"Activity": 1, "Measure": 3})
+        self.assertEqual(
+            [
+                (s["name"], h["name"], d["name"], [m["investment"] for m in d["measures"]])
+                for s in grouped["sectors"] for h in s["hazards"] for d in h["divisions"]
+            ],
+            [
+                ("Agriculture", "Drought", "Crops", ["Drip irrigation", "Mulching"]),
+                ("Agriculture", "Floods", "Livestock", ["Raised shelters"]),
+                ("Energy", "Floods", "Hydro", ["Raise intakes"]),
+            ],
+        )
+        self.assertNotIn("generic_dnsh", grouped["sectors"][0]["hazards"][0]["divisions"][0]["measures"][0])
+        self.assertEqual(len(queries), 4)  # Exists() + texto común + filas + facetas
+
+    def test_distinct_dnsh_stays_per_measure(self):
+        self.rows[0].generic_dnsh = "Otro DNSH"
+        self.rows[0].save()
+        grouped = self.detail(self.rwanda, "?rwanda=grouped")[0]["rwanda_adaptation_grouped"]
+        self.assertIsNone(grouped["generic_dnsh"])
+        self.assertEqual(grouped["sectors"][1]["hazards"][0]["divisions"][0]["measures"][0]["generic_dnsh"], "Otro DNSH")
+
+    def test_no_rwanda_queries_without_rows(self):
+        data, queries = self.detail(self.plain)
+        self.assertEqual(data["rwanda_adaptation"], [])
+        self.assertEqual(len(queries), 1)  # solo el Exists() dentro de la consulta de la taxonomía
+        data, queries = self.detail(self.plain, "?rwanda=grouped")
+        self.assertEqual(data["rwanda_adaptation_grouped"]["count"], 0)
+        self.assertEqual(len(queries), 1)
+
+
+@override_settings(API_RESPONSE_CACHE_ENABLED=False)
+class ObjectivesMatrixTests(TestCase):
+    """matrix/objectives/: una celda por taxonomía × objetivo con sus conteos, null si falta."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.taxonomy = make_dataset()
+        cls.empty = Taxonomy.objects.create(name="Vacía", region="Other")
+        cls.custom = EnvironmentalObjective.objects.create(taxonomy=cls.taxonomy, generic_name="Soil")
+        mitigation = EnvironmentalObjective.objects.get(taxonomy=cls.taxonomy, generic_name="Climate mitigation")
+        Sector.objects.create(taxonomy=cls.taxonomy, environmental_objective=mitigation, name="Transporte")
+
+    def test_cells(self):
+        data = self.client.get("/api/matrix/objectives/", HTTP_ACCEPT="application/json").json()
+        self.assertEqual(data["version"], get_dataset_version())
+        self.assertEqual(data["objectives"], ENV_OBJECTIVES + ["Soil"])
+        test, empty = data["taxonomies"]
+        self.assertEqual((test["name"], empty["name"]), ("Test", "Vacía"))
+
+        self.assertEqual(list(test["objectives"]), ENV_OBJECTIVES + ["Soil"])
+        mitigation = test["objectives"]["Climate mitigation"]
+        self.assertEqual(mitigation["display_name"], "Mitigación")
+        self.assertEqual(mitigation["counts"], {
+            "sectors": 2, "activities": 1, "practices": 0,
+            "adaptation_whitelists": 0, "adaptation_general_criteria": 0,
+        })
+        self.assertEqual(test["objectives"][OBJECTIVE_MEO]["counts"]["practices"], 1)
+        self.assertEqual(test["objectives"]["Soil"], {
+            "id": self.custom.id, "display_name": "Soil",
+            "counts": dict.fromkeys(MATRIX_COUNTED_MODELS, 0),
+        })
+        self.assertIsNone(test["objectives"]["Water"])
+        self.assertEqual(empty["objectives"], dict.fromkeys(ENV_OBJECTIVES + ["Soil"]))
+
+
+@override_settings(API_RESPONSE_CACHE_ENABLED=False)
+class ChangeLogTests(TestCase):
+    """Change log: un batch compacta los cambios por fila y changes/ pagina por (since, after)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.taxonomy = make_dataset()
+        cls.activity = Activity.objects.get()
+
+    def new_activity(self, name):
+        a = self.activity
+        return Activity.objects.create(
+            taxonomy=a.taxonomy, environmental_objective=a.environmental_objective, sector=a.sector, name=name,
+        )
+
+    def test_merge(self):
+        changes = {}
+        _merge(changes, ("activity", 1), CREATE, {"v": 1})
+        _merge(changes, ("activity", 1), UPDATE, {"v": 2})
+        _merge(changes, ("activity", 2), UPDATE, {"v": 1})
+        _merge(changes, ("activity", 2), DELETE, None)
+        _merge(changes, ("activity", 3), CREATE, {"v": 1})
+        _merge(changes, ("activity", 3), DELETE, None)
+        _merge(changes, ("activity", 4), DELETE, None)
+        _merge(changes, ("activity", 4), CREATE, {"v": 2})
+        self.assertEqual(list(changes.items()), [
+            (("activity", 1), (CREATE, {"v": 2})),
+            (("activity", 2), (DELETE, None)),
+            (("activity", 4), (UPDATE, {"v": 2})),
+        ])
+
+    def test_batch_compacts_rows(self):
+        version = get_dataset_version()
+        with dataset_batch():
+            kept = self.new_activity("Nueva")
+            kept.name = "Nueva (renombrada)"
+            kept.save()
+            self.new_activity("Efímera").delete()
+            self.activity.description = "Otra descripción"
+            self.activity.save()
+        self.assertEqual(get_dataset_version(), version + 1)
+        logged = ChangeLogEntry.objects.filter(version=version + 1).order_by("id")
+        self.assertEqual(
+            [(e.object_id, e.action, e.data["name"]) for e in logged],
+            [(kept.id, CREATE, "Nueva (renombrada)"), (self.activity.id, UPDATE, "Generación solar")],
+        )
+
+    def test_unchanged_save_is_not_logged(self):
+        version = get_dataset_version()
+        self.activity.save()
+        self.assertEqual(get_dataset_version(), version)
+
+    def test_pagination(self):
+        since = get_dataset_version()
+        for i in range(5):
+            self.new_activity(f"Actividad {i}")
+        expected = list(ChangeLogEntry.objects.filter(version__gt=since).order_by("id").values_list("id", flat=True))
+        self.assertEqual(len(expected), 5)
+
+        seen, url = [], f"/api/changes/?since={since}&limit=2"
+        while url:
+            page = self.client.get(url, HTTP_ACCEPT="application/json").json()
+            self.assertLessEqual(len(page["changes"]), 2)
+            self.assertEqual(page["version"], get_dataset_version())
+            seen += [c["id"] for c in page["changes"]]
+            url = page["next"]
+        self.assertEqual(seen, expected)
+
+        last = self.client.get(f"/api/changes/?since={get_dataset_version()}", HTTP_ACCEPT="application/json").json()
+        self.assertEqual((last["changes"], last["next"]), ([], None))
+        self.assertEqual(self.client.get("/api/changes/?limit=0").status_code, 400)
+
+
+@override_settings(API_RESPONSE_CACHE_ENABLED=False)
+class SuggestTests(TestCase):
+    """suggest/: código por prefijo en orden natural, luego nombres que empiezan por la consulta, palabras y erratas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.taxonomy = make_dataset()  # "Generación solar" (CCM 4.1), sector "Energía", práctica "Rotación de cultivos"
+        a = Activity.objects.get()
+        common = {"taxonomy": cls.taxonomy, "environmental_objective": a.environmental_objective, "sector": a.sector}
+        for code, name in [
+            ("CCM 4.10", "Almacenamiento de energía"), ("CCM 4.2", "Energía solar térmica"),
+            ("CCM 4.9", "Solar fotovoltaica"),
+        ]:
+            Activity.objects.create(**common, taxonomy_code=code, name=name)
+        other = Taxonomy.objects.create(name="Otra")
+        objective = EnvironmentalObjective.objects.create(taxonomy=other, generic_name="Climate mitigation")
+        sector = Sector.objects.create(taxonomy=other, environmental_objective=objective, name="Solar")
+        Activity.objects.create(taxonomy=other, environmental_objective=objective, sector=sector, name="Solar", taxonomy_code="X 1")
+
+    def setUp(self):
+        self.index = SuggestIndex(TaxonomyGraph.load())
+
+    def labels(self, q, **kwargs):
+        return [(r["type"], r["label"]) for r in self.index.search(q, **kwargs)]
+
+    def test_code_prefix_in_natural_order(self):
+        self.assertEqual(
+            [r["code"] for r in self.index.search("ccm 4.")],
+            ["CCM 4.1", "CCM 4.2", "CCM 4.9", "CCM 4.10"],
+        )
+
+    def test_ranking_groups(self):
+        # empieza por la consulta (más corto primero; a igualdad, actividad antes que sector) -> palabra interior
+        self.assertEqual(self.labels("solar", taxonomy_id=self.taxonomy.id), [
+            ("activity", "Solar fotovoltaica"),
+            ("activity", "Generación solar"),
+            ("activity", "Energía solar térmica"),
+        ])
+        self.assertEqual(self.labels("solar")[:2], [("activity", "Solar"), ("sector", "Solar")])
+        # sin acentos y todas las palabras como prefijo
+        self.assertEqual(self.labels("energia"), [
+            ("sector", "Energía"), ("activity", "Energía solar térmica"), ("activity", "Almacenamiento de energía"),
+        ])
+        self.assertEqual(self.labels("sol ener"), [("activity", "Energía solar térmica")])
+
+    def test_typos_and_limit(self):
+        self.assertEqual(self.labels("fotovoltaca"), [("activity", "Solar fotovoltaica")])
+        self.assertEqual(self.labels("rotacion"), [("practice", "Rotación de cultivos")])
+        self.assertEqual(len(self.index.search("solar", limit=2)), 2)
+
+    def test_result_path_and_view(self):
+        result = self.index.search("CCM 4.9")[0]
+        self.assertEqual([p["type"] for p in result["path"]], ["taxonomy", "objective", "sector"])
+        self.assertEqual(result["taxonomy_id"], self.taxonomy.id)
+        with mock.patch("taxonomies_manager.views.get_suggest_index", return_value=self.index):
+            data = self.client.get(f"/api/suggest/?q=solar&taxonomy={self.taxonomy.id}&limit=1").json()
+            self.assertEqual([r["label"] for r in data], ["Solar fotovoltaica"])
+            self.assertEqual(self.client.get("/api/suggest/?q=s").json(), [])
+            self.assertEqual(self.client.get("/api/suggest/?q=solar&limit=0").status_code, 400)
+
+
+class OnePerPage(PageNumberPagination):
+    page_size = 1
+
+
+@override_settings(API_RESPONSE_CACHE_ENABLED=False)
+class FacetsTests(TestCase):
+    """?facets=1: conteos del queryset filtrado (no de toda la tabla ni de la página)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.taxonomy = make_dataset()
+        a = Activity.objects.get()
+        cls.energy = a.sector
+        cls.transport = Sector.objects.create(taxonomy=cls.taxonomy, environmental_objective=a.environmental_objective, name="Transporte")
+        common = {"taxonomy": cls.taxonomy, "environmental_objective": a.environmental_objective}
+        Activity.objects.create(**common, sector=cls.energy, name="Eólica", contribution_type="Enabling")
+        Activity.objects.create(**common, sector=cls.transport, name="Tren", contribution_type="Enabling")
+        Activity.objects.create(**common, sector=cls.transport, name="Bus", contribution_type="Transitional")
+
+    def setUp(self):
+        patcher = mock.patch("taxonomies_manager.views.get_graph", return_value=TaxonomyGraph.load())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, query):
+        return self.client.get(f"/api/activities/?facets=1&{query}", HTTP_ACCEPT="application/json").json()
+
+    def test_counts_follow_filters(self):
+        data = self.get(f"taxonomy={self.taxonomy.id}")
+        self.assertEqual(data["count"], 4)
+        self.assertEqual(data["facets"]["contribution_type"], {"None": 1, "Enabling": 2, "Transitional": 1})
+        self.assertEqual(data["facets"]["sector"], [
+            {"id": self.energy.id, "name": "Energía", "count": 2},
+            {"id": self.transport.id, "name": "Transporte", "count": 2},
+        ])
+        self.assertEqual(data["facets"]["subsector"], [{"id": None, "name": None, "count": 4}])
+
+        data = self.get(f"sector={self.transport.id}")
+        self.assertEqual(data["count"], 2)
+        self.assertEqual([r["name"] for r in data["results"]], ["Tren", "Bus"])
+        self.assertEqual(data["facets"]["contribution_type"], {"Enabling": 1, "Transitional": 1})
+        self.assertEqual(data["facets"]["sector"], [{"id": self.transport.id, "name": "Transporte", "count": 2}])
+
+    def test_paginated_count_is_the_filter_total(self):
+        with mock.patch.object(ActivityViewSet, "pagination_class", OnePerPage):
+            data = self.get(f"sector={self.transport.id}")
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(len(data["results"]), 1)
+        self.assertIsNotNone(data["next"])
+        self.assertEqual(sum(data["facets"]["contribution_type"].values()), 2)
+
+
+@override_settings(API_RESPONSE_CACHE_ENABLED=False)
+class PracticeLadderTests(TestCase):
+    """practices/ladder/: sector -> subsector (sin subsector primero) -> nivel en PRACTICE_LEVEL_ORDER, con conteos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.taxonomy = make_dataset()  # AFOLU: "Rotación de cultivos" (basic, sin subsector)
+        afolu = Sector.objects.get(name="AFOLU")
+        cls.afolu = afolu
+        forests = Sector.objects.create(taxonomy=cls.taxonomy, environmental_objective=afolu.environmental_objective, name="Bosques")
+        crops = Subsector.objects.create(sector=afolu, name="Cultivos")
+        common = {"taxonomy": cls.taxonomy, "environmental_objective": afolu.environmental_objective}
+        for sector, subsector, level, name in [
+            (afolu, crops, "custom", "Sin nivel conocido"),
+            (afolu, crops, "Custom", "Otro sin nivel"),
+            (afolu, crops, "advanced", "Siembra directa"),
+            (afolu, crops, "additional eligible green practices", "Agroforestería"),
+            (afolu, crops, "BASIC", "Cubierta vegetal"),
+            (afolu, crops, "basic", "Abonos verdes"),
+            (forests, None, "intermediate", "Raleo"),
+        ]:
+            Practice.objects.create(**common, sector=sector, subsector=subsector, practice_level=level, practice_name=name)
+
+    def ladder(self, query=""):
+        return self.client.get(f"/api/practices/ladder/{query}", HTTP_ACCEPT="application/json").json()
+
+    def test_order_and_counts(self):
+        data = self.ladder(f"?taxonomy={self.taxonomy.id}")
+        self.assertEqual(data["count"], 8)
+        self.assertEqual(data["levels"], PRACTICE_LEVEL_ORDER + ["Custom"])
+        self.assertEqual(data["counts"], {**dict.fromkeys(PRACTICE_LEVEL_ORDER, 0), "basic": 3, "intermediate": 1,
+                                          "advanced": 1, "Additional eligible green practices": 1, "Custom": 2})
+        afolu, forests = data["sectors"]
+        self.assertEqual((afolu["name"], afolu["count"], forests["name"], forests["count"]), ("AFOLU", 7, "Bosques", 1))
+        self.assertEqual(afolu["counts"], {"basic": 3, "advanced": 1, "Additional eligible green practices": 1, "Custom": 2})
+        self.assertEqual(
+            [(sub["name"], [(lv["level"], lv["count"], [p["practice_name"] for p in lv["practices"]]) for lv in sub["levels"]])
+             for sub in afolu["subsectors"]],
+            [
+                (None, [("basic", 1, ["Rotación de cultivos"])]),
+                ("Cultivos", [
+                    ("basic", 2, ["Abonos verdes", "Cubierta vegetal"]),
+                    ("advanced", 1, ["Siembra directa"]),
+                    ("Additional eligible green practices", 1, ["Agroforestería"]),
+                    ("Custom", 2, ["Otro sin nivel", "Sin nivel conocido"]),
+                ]),
+            ],
+        )
+        self.assertNotIn("practice_level", afolu["subsectors"][0]["levels"][0]["practices"][0])
+
+    def test_filters(self):
+        data = self.ladder(f"?sector={self.afolu.id}&practice_level=advanced")
+        self.assertEqual(data["count"], 1)
+        self.assertEqual([s["name"] for s in data["sectors"]], ["AFOLU"])
+        self.assertEqual(self.ladder("?taxonomy=0")["sectors"], [])
+
+
+class DataFixTests(TestCase):
+    """fix_activities: --dry-run no escribe; la corrección real deja datos, change log y versión juntos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        eu = Taxonomy.objects.create(name="EU", region="Europe")
+        objective = EnvironmentalObjective.objects.create(taxonomy=eu, generic_name="Climate mitigation")
+        sector = Sector.objects.create(taxonomy=eu, environmental_objective=objective, name="Energía")
+        common = {"taxonomy": eu, "environmental_objective": objective, "sector": sector}
+        cls.traffic = Activity.objects.create(**common, name="Solar", sc_criteria_type="traffic_light")
+        cls.blank_sc = Activity.objects.create(
+            **common, name="Eólica", substantial_contribution_criteria="  ", sc_criteria_green="≤ 100 g",
+        )
+
+    def fix(self, *args):
+        out = StringIO()
+        call_command("fix_activities", *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_does_not_write(self):
+        version = get_dataset_version()
+        output = self.fix("--dry-run")
+        self.assertIn("afectaría 1 filas", output)
+        self.traffic.refresh_from_db()
+        self.assertEqual(self.traffic.sc_criteria_type, "traffic_light")
+        self.assertEqual(get_dataset_version(), version)
+
+    def test_run_updates_rows_and_change_log_in_one_version(self):
+        version = get_dataset_version()
+        self.fix()
+        self.traffic.refresh_from_db()
+        self.blank_sc.refresh_from_db()
+        self.assertEqual(self.traffic.sc_criteria_type, "threshold")
+        self.assertEqual((self.blank_sc.substantial_contribution_criteria, self.blank_sc.sc_criteria_green), ("≤ 100 g", ""))
+        self.assertEqual(get_dataset_version(), version + 1)
+        logged = ChangeLogEntry.objects.filter(version=version + 1, model="activity")
+        self.assertEqual(set(logged.values_list("object_id", flat=True)), {self.traffic.pk, self.blank_sc.pk})
+
+    def test_fix_without_steps_is_rejected(self):
+        class NoSteps(DataFix):
+            model = Activity
+
+        with self.assertRaises(TypeError):
+            NoSteps()
+
+    def test_change_log_failure_rolls_back_the_fix(self):
+        version = get_dataset_version()
+        with mock.patch("taxonomies_manager.datafix.record_changes", side_effect=RuntimeError("log")):
+            with self.assertRaises(RuntimeError):
+                self.fix()
+        self.traffic.refresh_from_db()
+        self.assertEqual(self.traffic.sc_criteria_type, "traffic_light")
+        self.assertEqual(get_dataset_version(), version)
+
+
+@override_settings(API_RESPONSE_CACHE_ENABLED=False)
+class ClassifierTests(TestCase):
+    """El request nunca construye el modelo: artefacto actual, el anterior más reciente o 503."""
+
+    @classmethod
+    def setUpTestData(cls):
+        make_dataset()
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        settings_override = override_settings(CLASSIFIER_DIR=tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        patcher = mock.patch.object(classifier, "_loaded", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def classify(self):
+        return self.client.post(
+            "/api/classify/", {"descriptions": ["generación solar"]}, content_type="application/json",
+            HTTP_ACCEPT="application/json",
+        )
+
+    def test_missing_artifact_is_503_without_building(self):
+        response = self.classify()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], str(classifier.RETRY_AFTER))
+        self.assertEqual(list(self.dir.iterdir()), [])
+
+    def test_stale_artifact_is_served_until_rebuilt(self):
+        built = classifier.build_and_save()
+        bump_dataset_version()
+        response = self.classify()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["version"], built.version)
+        self.assertEqual(response.json()["results"][0][0]["taxonomy_code"], "CCM 4.1")
+
+        classifier.build_and_save()
+        self.assertEqual(self.classify().json()["version"], get_dataset_version())
+        # solo directorios publicados: ningún temporal a medias
+        self.assertEqual(sorted(d.name for d in self.dir.iterdir()), [f"v{built.version}", f"v{get_dataset_version()}"])
+
+    def test_save_keeps_an_already_published_version(self):
+        built = classifier.build_and_save()
+        target = classifier.artifact_dir(built.version)
+        before = (target / "matrix.npz").stat().st_mtime_ns
+        built.save(target)
+        self.assertEqual((target / "matrix.npz").stat().st_mtime_ns, before)
+        self.assertEqual([d.name for d in self.dir.iterdir()], [target.name])
+
+
+@override_settings(API_RESPONSE_CACHE_ENABLED=False)
+class EquivalenceTests(TestCase):
+    """Los códigos económicos solo se comparan dentro del mismo sistema (CIIU = ISIC)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.acts = {}
+        for name, system, code in (("EU", "NACE", "D35.11"), ("Pakistan", "ISIC", "3510"), ("Panamá", "CIIU", "3510")):
+            taxonomy = Taxonomy.objects.create(name=name)
+            objective = EnvironmentalObjective.objects.create(taxonomy=taxonomy, generic_name="Climate mitigation")
+            sector = Sector.objects.create(taxonomy=taxonomy, environmental_objective=objective, name="Energía")
+            cls.acts[name] = Activity.objects.create(
+                taxonomy=taxonomy, environmental_objective=objective, sector=sector,
+                economic_code_system=system, economic_code=code, name=f"Planta {name}",
+            )
+        equivalences.rebuild_activity_equivalences()
+
+    def test_codes_match_only_within_the_same_system(self):
+        pairs = {
+            (e.source.taxonomy.name, e.target.taxonomy.name): e.code_score
+            for e in ActivityEquivalence.objects.filter(code_score__gt=0).select_related("source__taxonomy", "target__taxonomy")
+        }
+        self.assertEqual(pairs, {("Pakistan", "Panamá"): 1.0, ("Panamá", "Pakistan"): 1.0})
+
+    def test_non_finite_min_score_is_rejected(self):
+        eu = self.acts["EU"]
+        for value in ("nan", "NaN", "inf", "-inf", "abc"):
+            with self.subTest(value=value):
+                response = self.client.get(f"/api/activities/{eu.id}/equivalents/", {"min_score": value})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(self.client.get("/api/matrix/equivalences/", {"min_score": value}).status_code, 400)
+        response = self.client.get("/api/matrix/equivalences/", {"min_score": "0.9"})
+        self.assertEqual(response.status_code, 200)
+
+
+class StaticBundleTests(TestCase):
+    """El bundle estático trae los mismos bytes que la API, desde tablas vivas o desde el release publicado."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.taxonomy = make_dataset()
+
+    def build(self, out, *args):
+        call_command("build_static_bundle", "--out", str(out), *args, stdout=StringIO())
+        return json.loads((out / "manifest.json").read_text(encoding="utf-8"))
+
+    def test_bundle_matches_api_and_release(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp)
+            live = self.build(out / "live")
+            self.assertEqual(live["release"], "live")
+            key = f"taxonomies/{self.taxonomy.id}/detail/"
+            api = self.client.get(f"/api/{key}", HTTP_ACCEPT="application/json")
+            self.assertEqual((out / "live" / live["documents"][key]).read_bytes(), api.content)
+
+            release = publish_release(stage_release())
+            published = self.build(out / "release")
+            self.assertEqual(published["release"], release.name)
+            self.assertEqual(published["documents"], live["documents"])
+
+
+class ReplicaRoutingTests(TestCase):
+    """Lecturas de la API a la réplica; tras escribir (en el request o con la cookie de pin), primario."""
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request, write=False):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Taxonomy))
+            if write:
+                self.router.db_for_write(Taxonomy)
+                seen.append(self.router.db_for_read(Taxonomy))
+            return HttpResponse()
+
+        return routers.ReadReplicaMiddleware(view)(request), seen
+
+    @mock.patch.object(routers, "choose_replica", return_value="replica1")
+    def test_reads_go_to_replica_until_a_write(self, choose):
+        response, seen = self.route(self.factory.get("/api/taxonomies/"))
+        self.assertEqual(seen, ["replica1"])
+        self.assertNotIn(routers.REPLICA_PIN_COOKIE, response.cookies)
+
+        response, seen = self.route(self.factory.get("/api/taxonomies/"), write=True)
+        self.assertEqual(seen, ["replica1", "default"])
+        self.assertIn(routers.REPLICA_PIN_COOKIE, response.cookies)
+
+        choose.reset_mock()
+        pinned = self.factory.get("/api/taxonomies/")
+        pinned.COOKIES[routers.REPLICA_PIN_COOKIE] = "1"
+        for request in (pinned, self.factory.get("/admin/"), self.factory.post("/api/classify/")):
+            self.assertEqual(self.route(request)[1], ["default"])
+        choose.assert_not_called()
+        self.assertEqual(self.router.db_for_read(Taxonomy), "default")  # fuera de un request
+
+    def test_lagging_or_failing_replicas_are_skipped(self):
+        versions = {"default": 5, "replica1": 5, "replica2": 4, "replica3": DatabaseError()}
+
+        def version(alias):
+            if isinstance(versions[alias], Exception):
+                raise versions[alias]
+            return versions[alias]
+
+        with mock.patch.object(routers, "_version", side_effect=version), \
+                mock.patch.object(routers, "replica_aliases", return_value=["replica1", "replica2", "replica3"]), \
+                mock.patch.dict(routers._health, {"checked": None, "replicas": []}):
+            self.assertEqual(routers.healthy_replicas(), ["replica1"])
+        self.assertFalse(self.router.allow_migrate("replica1", "taxonomies_manager"))
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES)
+class ProfilingTests(TestCase):
+    """?_profile solo perfila a staff con sesión; para el resto es un parámetro más."""
+
+    @classmethod
+    def setUpTestData(cls):
+        make_dataset()
+        users = get_user_model().objects
+        cls.staff = users.create_user("staff", password="x", is_staff=True)
+        cls.visitor = users.create_user("visitor", password="x")
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        override = override_settings(PROFILE_DIR=tmp.name, PROFILE_ENABLED=True)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_only_staff_requests_are_profiled(self):
+        for user in (None, self.visitor):
+            with self.subTest(user=user):
+                self.client.logout()
+                if user:
+                    self.client.force_login(user)
+                response = self.client.get("/api/taxonomies/", {"_profile": "1"}, HTTP_ACCEPT="application/json")
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn("X-Profile-Id", response)
+                self.assertEqual(list(self.dir.iterdir()), [])
+
+        self.client.force_login(self.staff)
+        response = self.client.get("/api/taxonomies/", HTTP_ACCEPT="application/json", HTTP_X_PROFILE="cprofile")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        profile_id = response["X-Profile-Id"]
+        self.assertTrue((self.dir / f"{profile_id}.json.gz").exists())
+        self.assertEqual(self.client.get(response["X-Profile-Url"]).status_code, 200)
+
+        self.client.force_login(self.visitor)
+        self.assertEqual(self.client.get(response["X-Profile-Url"]).status_code, 302)
+
+
+class ImportSourceTests(TestCase):
+    """Excel, Parquet y CSV dan las mismas filas, por bloques y retomando desde una fila."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.xlsx = self.dir / "db.xlsx"
+        main = pd.DataFrame({
+            " Taxonomy ": ["EU", "EU", "Rwanda", "Rwanda", "Panamá", "Panamá"],
+            "Code": ["001", "1.1", "A2", None, "3510", "ñ"],
+            "Rank": [1, 2, 3, 4, 5, 6],
+        })
+        with pd.ExcelWriter(self.xlsx) as writer:
+            main.to_excel(writer, sheet_name="Sheet1", index=False)
+            pd.DataFrame({"Title": ["Lista"]}).to_excel(writer, sheet_name="CASO2 (CR-PAN)", index=False)
+        for fmt in ("parquet", "csv"):
+            import_sources.convert_workbook(self.xlsx, self.dir / fmt, fmt=fmt)
+
+    def rows(self, source, start):
+        sheet = source.sheet(import_sources.SHEET_MAIN)
+        return sheet.columns, [
+            (i, {k: None if pd.isna(v) else str(v) for k, v in row.items()}) for i, row in sheet.rows(start)
+        ]
+
+    @mock.patch.object(import_sources, "IMPORT_CHUNK_ROWS", 2)
+    def test_formats_yield_the_same_rows(self):
+        excel = import_sources.ImportSource(self.xlsx)
+        expected = self.rows(excel, 3)
+        self.assertEqual(expected[0], ["taxonomy", "code", "rank"])
+        self.assertEqual([i for i, _ in expected[1]], [3, 4, 5])
+        self.assertEqual(expected[1][0][1], {"taxonomy": "Rwanda", "code": None, "rank": "4"})
+        for fmt in ("parquet", "csv"):
+            with self.subTest(fmt=fmt):
+                source = import_sources.ImportSource(self.dir / fmt)
+                self.assertEqual(source.format, fmt)
+                self.assertEqual(self.rows(source, 3), expected)
+                self.assertEqual(source.sheet(import_sources.SHEET_MAIN).row_count, 6)
+                self.assertEqual(source.sheet(import_sources.SHEET_CASO2).columns, ["title"])
+                self.assertIsNone(source.sheet(import_sources.SHEET_RWANDA))
+        with self.assertRaises(import_sources.ImportSourceError):
+            import_sources.ImportSource(self.dir / "missing.parquet")
+
+    def test_sheet_needs_columns_row_count_and_frames(self):
+        class NoFrames(import_sources.Sheet):
+            columns = ["taxonomy"]
+            row_count = 0
+
+        with self.assertRaises(TypeError):
+            NoFrames("main", self.xlsx)
@@ -0,0 +1,164 @@
+"""
+Opción de respuesta `?texts=refs`: textos repetidos deduplicados por contenido
+(hash -> texto) en el JSON de la API.
+
+Muchas filas repiten los mismos textos largos: los DNSH de actividades de una
+misma taxonomía, `RwandaAdaptation.generic_dnsh` (repetido por fila) o el
+`dnsh_general`/`mss` de la taxonomía anidada. Con `?texts=refs` la respuesta
+pasa a ser:
+
+    {
+      "texts": {"<digest>": "<texto>", ...},
+      "data": <la respuesta de siempre, con {"$text": "<digest>"} en lugar
+               de cada texto repetido>
+    }
+
+Solo se sustituyen los textos de DEDUP_TEXT_FIELDS que aparecen al menos dos
+veces y superan TEXT_REF_MIN_LENGTH; el resto queda igual. Sin `?texts=refs`
+la respuesta no cambia. Para expandir en el cliente basta con reemplazar cada
+{"$text": d} por texts[d].
+
+En la DB los DNSH de Activity y el `generic_dnsh` de Rwanda ya se guardan una
+sola vez: la fila apunta por FK (`<campo>_ref`) a models.SharedText, direccionado
+por sha1, y el modelo expone el texto en `<campo>` (ver models.shared_text).
+Las funciones del final leen esos campos sin una consulta por fila.
+`?texts=refs` hace lo mismo en la respuesta, para cualquier texto repetido.
+
+Aceptan ?texts=refs: los listados de activities/, practices/ y
+rwanda-adaptation/, practices/ladder/, rwanda-adaptation/grouped/, la cascada
+.../sectors/<id>/activities/ y taxonomies/<id>/detail/.
+"""
+import hashlib
+from collections import Counter
+
+from django.apps import apps
+from django.db.models import F, TextField, Value
+from django.db.models.functions import Coalesce
+
+from .models import SharedText
+
+TEXT_REFS_PARAM = "texts"
+TEXT_REFS_VALUE = "refs"
+TEXT_REF_KEY = "$text"
+TEXT_REF_MIN_LENGTH = 64
+
+DEDUP_TEXT_FIELDS = frozenset({
+    # Activity
+    "description",
+    "substantial_contribution_criteria", "non_eligibility_criteria",
+    "sc_criteria_green", "sc_criteria_amber", "sc_criteria_red",
+    "dnsh_climate_mitigation", "dnsh_climate_adaptation", "dnsh_water",
+    "dnsh_circular_economy", "dnsh_pollution_prevention",
+    "dnsh_biodiversity", "dnsh_land_management",
+    # Practice
+    "practice_description", "eligible_practices", "non_eligible_practices",
+    "green_practices", "amber_practices", "red_practices",
+    # Rwanda / Taxonomy anidada
+    "generic_dnsh", "expected_effect", "expected_result",
+    "dnsh_general", "mss",
+    # Caso 2 / Caso 3
+    "eligible_activities", "criteria",
+})
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def wants_text_refs(request) -> bool:
+    return request.query_params.get(TEXT_REFS_PARAM) == TEXT_REFS_VALUE
+
+
+def _iter_texts(data):
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key in DEDUP_TEXT_FIELDS and isinstance(value, str):
+                if len(value) >= TEXT_REF_MIN_LENGTH:
+                    yield value
+            else:
+                yield from _iter_texts(value)
+    elif isinstance(data, list):
+        for item in data:
+            yield from _iter_texts(item)
+
+
+def _replace(data, refs):
+    if isinstance(data, dict):
+        out = {}
+        for key, value in data.items():
+            if key in DEDUP_TEXT_FIELDS and isinstance(value, str) and value in refs:
+                out[key] = {TEXT_REF_KEY: refs[value]}
+            else:
+                out[key] = _replace(value, refs)
+        return out
+    if isinstance(data, list):
+        return [_replace(item, refs) for item in data]
+    return data
+
+
+def dedupe_texts(data) -> dict:
+    """Devuelve {"texts": {...}, "data": ...} con los textos repetidos referenciados."""
+    counts = Counter(_iter_texts(data))
+    refs = {text: text_digest(text) for text, n in counts.items() if n > 1}
+    return {
+        "texts": {digest: text for text, digest in refs.items()},
+        "data": _replace(data, refs),
+    }
+
+
+def with_text_refs(request, data):
+    """Aplica dedupe_texts solo si el cliente lo pidió con ?texts=refs."""
+    return dedupe_texts(data) if wants_text_refs(request) else data
+
+
+# -----------------------
+# Textos compartidos en la DB (models.SharedText)
+# -----------------------
+SHARED_TEXT_REF_SUFFIX = "_ref"
+
+
+def shared_text_fields(model) -> tuple:
+    """Nombres de los textos compartidos de `model` (el FK sin el sufijo `_ref`)."""
+    return tuple(
+        f.name[:-len(SHARED_TEXT_REF_SUFFIX)]
+        for f in model._meta.concrete_fields
+        if f.related_model is SharedText
+    )
+
+
+def with_shared_texts(qs):
+    """select_related de los textos compartidos del modelo (leer obj.<campo> sin consultas extra)."""
+    names = shared_text_fields(qs.model)
+    return qs.select_related(*(name + SHARED_TEXT_REF_SUFFIX for name in names)) if names else qs
+
+
+def shared_text_value(name):
+    return Coalesce(F(f"{name}{SHARED_TEXT_REF_SUFFIX}__content"), Value(""), output_field=TextField())
+
+
+def values_with_texts(qs, *fields):
+    """
+    Como qs.values(*fields), pero `fields` puede incluir textos compartidos
+    (se leen con un JOIN, "" si no hay). Los dicts salen en el orden de `fields`.
+    """
+    shared = set(shared_text_fields(qs.model)).intersection(fields)
+    if not shared:
+        return qs.values(*fields)
+    rows = qs.values(
+        *(f for f in fields if f not in shared),
+        **{name: shared_text_value(name) for name in shared},
+    )
+    return ({f: row[f] for f in fields} for row in rows)
+
+
+def prune_shared_texts() -> int:
+    """Borra los SharedText que ya no referencia ninguna fila. Devuelve cuántos."""
+    orphans = SharedText.objects.all()
+    for model in apps.get_app_config("taxonomies_manager").get_models():
+        for name in shared_text_fields(model):
+            ref = name + SHARED_TEXT_REF_SUFFIX
+            # sin NULLs: NOT IN con un NULL en la subconsulta no devuelve nada
+            used = model.objects.filter(**{f"{ref}__isnull": False}).values(ref)
+            orphans = orphans.exclude(digest__in=used)
+    deleted, _ = orphans.delete()
+    return deleted
@@ -6,8 +6,11 @@ from .views import (
     ActivityViewSet, PracticeViewSet, RwandaAdaptationViewSet,
     AdaptationWhitelistViewSet, AdaptationGeneralCriterionViewSet,
     sectors_by_taxonomy, environmental_objectives_by_taxonomy, sectors_by_taxonomy_and_objective,
-    activities_by_filters, activity_criteria, taxonomy_detail_nested
+    activities_by_filters, activity_criteria, taxonomy_detail_nested,
+    objectives_matrix, activity_equivalents, equivalences_export, classify_descriptions,
+    dataset_changes, releases_list, taxonomy_hierarchy, suggest,
 )
+from . import async_views
 
 router = DefaultRouter()
 router.register(r"taxonomies", TaxonomyViewSet, basename="taxonomies")
@@ -27,11 +30,37 @@ urlpatterns = [
     path("taxonomies/<int:taxonomy_id>/environmental-objectives/", environmental_objectives_by_taxonomy),
     path("taxonomies/<int:taxonomy_id>/sectors/", sectors_by_taxonomy),
     path("taxonomies/<int:taxonomy_id>/objectives/<int:objective_id>/sectors/", sectors_by_taxonomy_and_objective),
+    path("taxonomies/<int:taxonomy_id>/hierarchy/", taxonomy_hierarchy, name="taxonomy-hierarchy"),
 
     # Actividades por T/O/S y criterios
     path("taxonomies/<int:taxonomy_id>/objectives/<int:objective_id>/sectors/<int:sector_id>/activities/", activities_by_filters),
     path("activities/<int:activity_id>/criteria/", activity_criteria),
+    path("activities/<int:activity_id>/equivalents/", activity_equivalents, name="activity-equivalents"),
 
     # Detalle anidado de una taxonomía (la “vista grande” para FE)
     path("taxonomies/<int:taxonomy_id>/detail/", taxonomy_detail_nested, name="taxonomy-detail-nested"),
+
+    # Matriz taxonomía × objetivo genérico (una sola respuesta para ObjectivesMatrix)
+    path("matrix/objectives/", objectives_matrix, name="objectives-matrix"),
+    path("matrix/equivalences/", equivalences_export, name="equivalences-export"),
+
+    # Delta-sync para espejos (change log desde una versión)
+    path("changes/", dataset_changes, name="dataset-changes"),
+    path("releases/", releases_list, name="releases"),
+
+    # Clasificador TF-IDF: descripciones de proyecto -> actividades / prácticas candidatas
+    path("classify/", classify_descriptions, name="classify"),
+
+    # Autocompletar (índice en memoria por worker)
+    path("suggest/", suggest, name="suggest"),
+
+    # Variantes async (ASGI) de las lecturas calientes; mismo JSON que las vistas sync
+    path("async/taxonomies/<int:taxonomy_id>/hierarchy/", async_views.taxonomy_hierarchy),
+    path("async/taxonomies/<int:taxonomy_id>/environmental-objectives/", async_views.environmental_objectives_by_taxonomy),
+    path("async/taxonomies/<int:taxonomy_id>/sectors/", async_views.sectors_by_taxonomy),
+    path("async/taxonomies/<int:taxonomy_id>/objectives/<int:objective_id>/sectors/", async_views.sectors_by_taxonomy_and_objective),
+    path("async/taxonomies/<int:taxonomy_id>/objectives/<int:objective_id>/sectors/<int:sector_id>/activities/", async_views.activities_by_filters),
+    path("async/taxonomies/<int:taxonomy_id>/objectives/<int:objective_id>/adaptation/", async_views.adaptation_by_objective),
+    path("async/activities/<int:activity_id>/criteria/", async_views.activity_criteria),
+    path("async/search/", async_views.search_activities),
 ]
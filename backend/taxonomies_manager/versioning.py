@@ -0,0 +1,237 @@
+"""
+Versión global del dataset.
+
+Cualquier escritura sobre los modelos de taxonomías (admin, imports, fixes)
+incrementa DatasetVersion.version vía señales. Las lecturas que cachean algo
+(respuestas, payloads comprimidos, ...) incluyen la versión en la clave.
+
+Los imports masivos deben envolver su trabajo en `dataset_batch()` para que
+miles de save() cuenten como un único cambio de versión.
+
+Cada alta / modificación / baja de fila queda además en ChangeLogEntry con la
+versión en la que se hizo visible (ver /api/changes/?since=N). Dentro de un
+batch los cambios se acumulan y se compactan por fila (create+update -> create,
+create+delete -> nada, ...); las modificaciones que dejan la fila igual que su
+último registro se descartan, así que re-importar el mismo Excel no sube la
+versión ni invalida caches.
+"""
+import contextvars
+import json
+from contextlib import contextmanager
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.dispatch import Signal
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import DatasetVersion, ChangeLogEntry, SharedText
+from .texts import SHARED_TEXT_REF_SUFFIX, with_shared_texts
+
+_batch = contextvars.ContextVar("dataset_batch", default=None)
+
+# Se emite tras el commit de cada incremento de versión (kwargs: version).
+# Lo escucha releases.py para retirar el release publicado si los datos cambian fuera de un import.
+dataset_committed = Signal()
+
+CREATE, UPDATE, DELETE = ChangeLogEntry.ACTION_CREATE, ChangeLogEntry.ACTION_UPDATE, ChangeLogEntry.ACTION_DELETE
+_LOOKUP_CHUNK = 500
+
+
+def get_dataset_version() -> int:
+    version = DatasetVersion.objects.filter(pk=1).values_list("version", flat=True).first()
+    return version or 0
+
+
+def get_dataset_cache_token() -> str:
+    """
+    Versión + instante del último cambio, para claves de cache compartidas.
+    Si la tabla se reinicia (flush, tests con rollback) la versión puede
+    repetirse, pero no con el mismo updated_at.
+    """
+    row = DatasetVersion.objects.filter(pk=1).values_list("version", "updated_at").first()
+    if row is None:
+        return "0"
+    version, updated_at = row
+    return f"{version}.{int(updated_at.timestamp() * 1_000_000)}"
+
+
+def bump_dataset_version() -> int:
+    with transaction.atomic():
+        updated = DatasetVersion.objects.filter(pk=1).update(version=F("version") + 1, updated_at=timezone.now())
+        if not updated:
+            DatasetVersion.objects.get_or_create(pk=1, defaults={"version": 1})
+        version = get_dataset_version()
+        transaction.on_commit(lambda: dataset_committed.send(sender=DatasetVersion, version=version))
+    return version
+
+
+def mark_dataset_changed():
+    """
+    Registra un cambio que no es de una fila concreta (p.ej. tablas derivadas):
+    dentro de un batch solo se anota; fuera, sube la versión al momento.
+    """
+    state = _batch.get()
+    if state is not None:
+        state["dirty"] = True
+    else:
+        bump_dataset_version()
+
+
+# -----------------------
+# Change log
+# -----------------------
+def row_data(instance) -> dict:
+    """
+    Fila plana (columnas concretas, FKs como *_id) lista para JSON. Los textos
+    compartidos van como texto con su nombre de campo (`dnsh_water`, no el digest).
+    """
+    data = {}
+    for f in instance._meta.concrete_fields:
+        if f.related_model is SharedText:
+            name = f.name[:-len(SHARED_TEXT_REF_SUFFIX)]
+            data[name] = getattr(instance, name)
+        else:
+            data[f.attname] = f.value_from_object(instance)
+    return data
+
+
+def _merge(changes, key, action, data):
+    """Compacta el cambio de una fila con lo ya acumulado (orden: primera aparición; bajas al final)."""
+    prev = changes.get(key)
+    if prev is None:
+        changes[key] = (action, data)
+    elif action == DELETE:
+        del changes[key]
+        if prev[0] != CREATE:
+            changes[key] = (DELETE, None)
+    elif prev[0] == DELETE:
+        del changes[key]
+        changes[key] = (UPDATE, data)
+    else:
+        changes[key] = (prev[0], data)
+
+
+def _jsonable(data):
+    return json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+
+
+def _drop_unchanged(changes):
+    """Quita las modificaciones cuya fila coincide con su último registro en el log."""
+    updates = {}
+    for (model, object_id), (action, data) in changes.items():
+        if action == UPDATE:
+            updates.setdefault(model, []).append(object_id)
+    for model, ids in updates.items():
+        for i in range(0, len(ids), _LOOKUP_CHUNK):
+            latest = (
+                ChangeLogEntry.objects
+                .filter(model=model, object_id__in=ids[i:i + _LOOKUP_CHUNK])
+                .values("object_id")
+                .annotate(last_id=Max("id"))
+                .values("last_id")
+            )
+            for object_id, data in ChangeLogEntry.objects.filter(id__in=latest).values_list("object_id", "data"):
+                key = (model, object_id)
+                if data is not None and _jsonable(changes[key][1]) == data:
+                    del changes[key]
+
+
+def _commit_changes(changes, dirty=False):
+    """Sube la versión y escribe el log en la misma transacción (mismo orden de commit que de versión)."""
+    _drop_unchanged(changes)
+    if not changes and not dirty:
+        return None
+    with transaction.atomic():
+        version = bump_dataset_version()
+        ChangeLogEntry.objects.bulk_create(
+            [
+                ChangeLogEntry(version=version, model=model, object_id=object_id, action=action, data=data)
+                for (model, object_id), (action, data) in changes.items()
+            ],
+            batch_size=500,
+        )
+    return version
+
+
+def record_change(instance, action):
+    """Anota el alta/modificación/baja de una fila (lo llaman las señales de signals.py)."""
+    key = (instance._meta.model_name, instance.pk)
+    data = None if action == DELETE else row_data(instance)
+    state = _batch.get()
+    if state is not None:
+        _merge(state["changes"], key, action, data)
+    else:
+        _commit_changes({key: (action, data)})
+
+
+def record_changes(model, object_ids, action=UPDATE):
+    """
+    Igual que record_change para escrituras en bloque que no disparan señales
+    (QuerySet.update(), bulk_create, ...). Llamar después de escribir.
+    """
+    name = model._meta.model_name
+    object_ids = list(object_ids)
+    changes = {}
+    if action == DELETE:
+        for object_id in object_ids:
+            changes[(name, object_id)] = (DELETE, None)
+    else:
+        for i in range(0, len(object_ids), _LOOKUP_CHUNK):
+            for obj in with_shared_texts(model.objects.filter(pk__in=object_ids[i:i + _LOOKUP_CHUNK])):
+                changes[(name, obj.pk)] = (action, row_data(obj))
+    state = _batch.get()
+    if state is not None:
+        for key, (act, data) in changes.items():
+            _merge(state["changes"], key, act, data)
+    elif changes:
+        _commit_changes(changes)
+
+
+def _new_state():
+    return {"dirty": False, "changes": {}}
+
+
+def flush_dataset_batch() -> int:
+    """
+    Dentro de un batch: aplica ya el incremento pendiente (si hubo cambios) y
+    devuelve la versión resultante. Útil para construir artefactos derivados
+    (p.ej. el clasificador) asociados a la versión final de un import.
+    """
+    state = _batch.get()
+    if state is not None:
+        version = _commit_changes(state["changes"], state["dirty"])
+        state.update(_new_state())
+        if version is not None:
+            return version
+    return get_dataset_version()
+
+
+def discard_dataset_batch():
+    """
+    Dentro de un batch: olvida los cambios pendientes. Para cuando la
+    transacción que los escribió hizo rollback (p.ej. un bloque de import que
+    falló), así el log no anota filas que no llegaron a existir.
+    """
+    state = _batch.get()
+    if state is not None:
+        state.update(_new_state())
+
+
+@contextmanager
+def dataset_batch():
+    """
+    Agrupa todas las escrituras del bloque en un solo incremento de versión
+    (al salir, aunque haya error, si algo llegó a escribirse). Reentrante.
+    También sirve como decorador: @dataset_batch()
+    """
+    if _batch.get() is not None:
+        yield
+        return
+    state = _new_state()
+    token = _batch.set(state)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+        _commit_changes(state["changes"], state["dirty"])
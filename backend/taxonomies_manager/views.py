@@ -1,11 +1,13 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view, renderer_classes
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 
 from .models import (
     Taxonomy, EnvironmentalObjective, Sector, Subsector,
     Activity, Practice, RwandaAdaptation,
-    AdaptationWhitelist, AdaptationGeneralCriterion
+    AdaptationWhitelist, AdaptationGeneralCriterion,
+    ActivityEquivalence, ChangeLogEntry, Release, ReleasePointer,
 )
 from .serializers import (
     TaxonomySerializer, EnvironmentalObjectiveSerializer, SectorSerializer, SubsectorSerializer,
@@ -13,170 +15,276 @@ from .serializers import (
     ActivitySlimSerializer, PracticeSlimSerializer,
     TaxonomyDetailSerializer,
     AdaptationWhitelistSerializer, AdaptationGeneralCriterionSerializer,
+    TaxonomyBriefSerializer, ActivityBriefSerializer, ActivityEquivalenceSerializer,
+    slim_rows, rwanda_grouped, count_facets, practice_ladder,
+    adaptation_whitelists_queryset, adaptation_general_criteria_queryset,
 )
-from .constants import OBJECTIVE_MEO
-from django.db.models import Exists, OuterRef
+from .renderers import FastJSONRenderer
+from .caching import cache_api_response
+from .querybudget import query_budget
+from .texts import with_text_refs, with_shared_texts
+from .filters import (
+    InvalidFilter, apply_filters, id_filter, value_filter, prefix_filter, objective_filter, is_int,
+)
+from .constants import OBJECTIVE_MEO, ENV_OBJECTIVES
+from .versioning import get_dataset_version
+from .graph import get_graph
+from .suggest import get_suggest_index, SUGGEST_MIN_LENGTH, SUGGEST_DEFAULT_LIMIT, SUGGEST_MAX_LIMIT
+from django.db.models import Count, Exists, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.decorators import method_decorator
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from django.conf import settings
+import csv
+import math
+
+# Renderers para endpoints con respuestas grandes (mismo JSON, menos CPU)
+FAST_RENDERERS = [FastJSONRenderer, BrowsableAPIRenderer]
 
 # =========================
 #  ViewSets base (CRUD/lectura)
 # =========================
 
+class TextRefsListMixin:
+    """Listados que aceptan ?texts=refs (textos repetidos como referencias, ver texts.py)."""
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        response.data = with_text_refs(request, response.data)
+        return response
+
+
+class QueryFiltersMixin:
+    """
+    `query_filters`: {parámetro: filtro de filters.py}. Multi-valor (?sector=1,2),
+    negación (?sector=!3) y 400 {"error": ...} si un valor no es válido.
+    """
+    query_filters = {}
+
+    def filter_params(self, qs):
+        return apply_filters(qs, self.request.query_params, self.query_filters)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, InvalidFilter):
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return super().handle_exception(exc)
+
+
+class FacetsListMixin:
+    """
+    ?facets=1 -> {"count", "facets", "results"}: las filas de siempre más los
+    conteos por `facet_fields` sobre el mismo filtro (un solo GROUP BY).
+    Con paginación se añade "facets" a la página ({"count", "next", ...}):
+    `count` y los conteos son del filtro completo, no de la página.
+    Sector / subsector salen como [{"id", "name", "count"}] (nombres del grafo).
+    """
+    facet_fields = ()
+    _NAMED_FACETS = {"sector_id": ("sector", "sectors"), "subsector_id": ("subsector", "subsectors")}
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get("facets") in ("1", "true", "True"):
+            facets = self._named(count_facets(self.filter_queryset(self.get_queryset()), self.facet_fields))
+            if isinstance(response.data, dict):  # página de self.paginator
+                response.data = {**response.data, "facets": facets}
+            else:
+                response.data = {"count": len(response.data), "facets": facets, "results": response.data}
+        return response
+
+    def _named(self, counts):
+        graph = get_graph()
+        facets = {}
+        for field, values in counts.items():
+            if field not in self._NAMED_FACETS:
+                facets[field] = values
+                continue
+            key, nodes = self._NAMED_FACETS[field]
+            nodes = getattr(graph, nodes)
+            facets[key] = [
+                {"id": pk, "name": nodes[pk].name if pk in nodes else None, "count": n}
+                for pk, n in sorted(values.items(), key=lambda item: (-item[1], item[0] or 0))
+            ]
+        return facets
+
+
+@method_decorator(cache_api_response, name="dispatch")
 class TaxonomyViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Taxonomy.objects.all().prefetch_related("objectives", "sectors")
     serializer_class = TaxonomySerializer
+    query_budget = 5
 
 
 class EnvironmentalObjectiveViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = EnvironmentalObjective.objects.select_related("taxonomy").all()
     serializer_class = EnvironmentalObjectiveSerializer
+    query_budget = 2
 
 
-class SectorViewSet(viewsets.ReadOnlyModelViewSet):
+class SectorViewSet(QueryFiltersMixin, viewsets.ReadOnlyModelViewSet):
+    """Filtros: ?taxonomy=<ids>&objective=<ids> (p.ej. todos los sectores de varios objetivos de una vez)."""
     queryset = Sector.objects.select_related("taxonomy", "environmental_objective").all()
     serializer_class = SectorSerializer
+    query_budget = 2
+    query_filters = {
+        "taxonomy": id_filter("taxonomy_id"),
+        "objective": id_filter("environmental_objective_id"),
+    }
+
+    def get_queryset(self):
+        return self.filter_params(super().get_queryset())
 
 
 class SubsectorViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Subsector.objects.select_related("sector", "sector__taxonomy", "sector__environmental_objective").all()
     serializer_class = SubsectorSerializer
+    query_budget = 2
 
 
-class ActivityViewSet(viewsets.ReadOnlyModelViewSet):
+class ActivityViewSet(QueryFiltersMixin, TextRefsListMixin, FacetsListMixin, viewsets.ReadOnlyModelViewSet):
     """
     Endpoints de actividades clásicas.
-    Filtros por querystring: ?taxonomy=<id>&objective=<id>&sector=<id>&subsector=<id>
+    Filtros por querystring: ?taxonomy=<ids>&objective=<ids>&sector=<ids>&subsector=<ids>
+      &taxonomy_code_prefix=<prefijos>   (listas separadas por comas; "!" delante excluye, ver filters.py)
+    ?texts=refs -> textos repetidos como referencias (ver texts.py)
+    ?facets=1   -> conteos por contribution_type / sc_criteria_type / sector / subsector
     """
     serializer_class = ActivitySerializer
+    query_budget = 4  # list con ?facets=1: filas + conteos
+    renderer_classes = FAST_RENDERERS
+    facet_fields = ("contribution_type", "sc_criteria_type", "sector_id", "subsector_id")
+    query_filters = {
+        "taxonomy": id_filter("taxonomy_id"),
+        "objective": id_filter("environmental_objective_id"),
+        "sector": id_filter("sector_id"),
+        "subsector": id_filter("subsector_id"),
+        "taxonomy_code_prefix": prefix_filter("taxonomy_code"),
+    }
 
     def get_queryset(self):
-        qs = Activity.objects.select_related(
+        qs = with_shared_texts(Activity.objects.select_related(
             "taxonomy", "environmental_objective", "sector", "subsector"
-        ).all()
-
-        t = self.request.query_params.get("taxonomy")
-        o = self.request.query_params.get("objective")
-        s = self.request.query_params.get("sector")
-        ss = self.request.query_params.get("subsector")
-
-        if t:
-            qs = qs.filter(taxonomy_id=t)
-        if o:
-            qs = qs.filter(environmental_objective_id=o)
-        if s:
-            qs = qs.filter(sector_id=s)
-        if ss:
-            qs = qs.filter(subsector_id=ss)
-
-        return qs.order_by("taxonomy__name", "environmental_objective__name", "sector__name", "taxonomy_code")
+        ).all())
+        qs = self.filter_params(qs)
+        return qs.order_by("taxonomy__name", "environmental_objective__generic_name", "sector__name", "taxonomy_code")
 
 
-class PracticeViewSet(viewsets.ReadOnlyModelViewSet):
+class PracticeViewSet(QueryFiltersMixin, TextRefsListMixin, FacetsListMixin, viewsets.ReadOnlyModelViewSet):
     """
     Endpoints de prácticas MEO.
-    Filtros por querystring:
-      ?taxonomy=<id>&objective=<id|MEO>&sector=<id>&subsector=<id>&practice_level=<str>
+    Filtros por querystring (multi-valor / "!" como en ActivityViewSet):
+      ?taxonomy=<ids>&objective=<ids|nombre>&sector=<ids>&subsector=<ids>&practice_level=<str,...>
+    ?facets=1 -> conteos por practice_level / sector / subsector
+
+    GET /api/practices/ladder/?[filtros] -> escalera por sector / subsector / nivel (PRACTICE_LEVEL_ORDER)
     """
     serializer_class = PracticeSerializer
+    query_budget = {"list": 4, "retrieve": 2, "ladder": 2}
+    renderer_classes = FAST_RENDERERS
+    facet_fields = ("practice_level", "sector_id", "subsector_id")
+    query_filters = {
+        "taxonomy": id_filter("taxonomy_id"),
+        # id o nombre (ej. "Multiple environmental objectives"; generic_name o display_name)
+        "objective": objective_filter(),
+        "sector": id_filter("sector_id"),
+        "subsector": id_filter("subsector_id"),
+        "practice_level": value_filter("practice_level"),
+    }
 
     def get_queryset(self):
         qs = Practice.objects.select_related(
             "taxonomy", "environmental_objective", "sector", "subsector"
         ).all()
-
-        t = self.request.query_params.get("taxonomy")
-        o = self.request.query_params.get("objective")  # puede venir id o nombre
-        s = self.request.query_params.get("sector")
-        ss = self.request.query_params.get("subsector")
-        lvl = self.request.query_params.get("practice_level")
-
-        if t:
-            qs = qs.filter(taxonomy_id=t)
-
-        if o:
-            if o.isdigit():
-                qs = qs.filter(environmental_objective_id=int(o))
-            else:
-                # permite pasar nombre (ej. "Multiple environmental objectives")
-                qs = qs.filter(environmental_objective__name=o)
-
-        if s:
-            qs = qs.filter(sector_id=s)
-        if ss:
-            qs = qs.filter(subsector_id=ss)
-        if lvl:
-            qs = qs.filter(practice_level=lvl)
-
+        qs = self.filter_params(qs)
         return qs.order_by("taxonomy__name", "sector__name", "practice_level", "practice_name")
 
+    @action(detail=False, methods=["get"])
+    def ladder(self, request):
+        """
+        GET /api/practices/ladder/?taxonomy=<ids>&objective=<ids|nombre>&sector=<ids>[&filtros]
+          -> prácticas agrupadas sector -> subsector -> nivel en orden canónico, con conteos
+        """
+        qs = self.filter_params(Practice.objects.all())
+        return Response(with_text_refs(request, practice_ladder(qs)))
+
 
-class RwandaAdaptationViewSet(viewsets.ReadOnlyModelViewSet):
+class RwandaAdaptationViewSet(QueryFiltersMixin, TextRefsListMixin, viewsets.ReadOnlyModelViewSet):
     """
     Medidas de adaptación de Rwanda.
-    Filtros: ?taxonomy=<id>&sector=<str>&hazard=<str>&division=<str>&type=<str>&level=<str>&criteria_type=<str>
+    Filtros: ?taxonomy=<ids>&sector=<str>&hazard=<str>&division=<str>&type=<str>&level=<str>&criteria_type=<str>
+    (textos: varios valores repitiendo el parámetro; "!" delante excluye)
+
+    GET /api/rwanda-adaptation/grouped/?taxonomy=<id>[&filtros]
+      -> taxonomía una sola vez + medidas agrupadas sector -> hazard -> division + facetas
     """
     serializer_class = RwandaAdaptationSerializer
+    query_budget = {"list": 2, "retrieve": 2, "grouped": 5}
+    renderer_classes = FAST_RENDERERS
+    query_filters = {
+        "taxonomy": id_filter("taxonomy_id"),
+        **{field: value_filter(field, split=False) for field in ("sector", "hazard", "division")},
+        **{field: value_filter(field) for field in ("type", "level", "criteria_type")},
+    }
 
-    def get_queryset(self):
-        qs = RwandaAdaptation.objects.select_related("taxonomy").all()
-
-        qp = self.request.query_params
-        if qp.get("taxonomy"):
-            qs = qs.filter(taxonomy_id=qp.get("taxonomy"))
-        if qp.get("sector"):
-            qs = qs.filter(sector=qp.get("sector"))
-        if qp.get("hazard"):
-            qs = qs.filter(hazard=qp.get("hazard"))
-        if qp.get("division"):
-            qs = qs.filter(division=qp.get("division"))
-        if qp.get("type"):
-            qs = qs.filter(type=qp.get("type"))
-        if qp.get("level"):
-            qs = qs.filter(level=qp.get("level"))
-        if qp.get("criteria_type"):
-            qs = qs.filter(criteria_type=qp.get("criteria_type"))
+    def filter_rows(self, qs):
+        return self.filter_params(qs)
 
+    def get_queryset(self):
+        qs = self.filter_rows(with_shared_texts(RwandaAdaptation.objects.select_related("taxonomy").all()))
         return qs.order_by("sector", "hazard", "division")
 
-class AdaptationWhitelistViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=False, methods=["get"])
+    def grouped(self, request):
+        taxonomy_id = request.query_params.get("taxonomy")
+        if not taxonomy_id or not is_int(taxonomy_id):
+            return Response({"error": "taxonomy (id) is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            taxonomy = Taxonomy.objects.get(id=taxonomy_id)
+        except Taxonomy.DoesNotExist:
+            return Response({"error": "Taxonomy not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        data = {
+            "taxonomy": TaxonomyBriefSerializer(taxonomy).data,
+            **rwanda_grouped(self.filter_rows(RwandaAdaptation.objects.all())),
+        }
+        return Response(with_text_refs(request, data))
+
+class AdaptationWhitelistViewSet(QueryFiltersMixin, viewsets.ReadOnlyModelViewSet):
     """
-    GET /api/adaptation-whitelists/?taxonomy=<id>&objective=<id>&sector=<id>
+    GET /api/adaptation-whitelists/?taxonomy=<ids>&objective=<ids>&sector=<ids>
     """
     serializer_class = AdaptationWhitelistSerializer
+    query_budget = 2
     queryset = AdaptationWhitelist.objects.all().select_related(
         "taxonomy", "environmental_objective", "sector"
     )
+    query_filters = {
+        "taxonomy": id_filter("taxonomy_id"),
+        "objective": id_filter("environmental_objective_id"),
+        "sector": id_filter("sector_id"),
+    }
 
     def get_queryset(self):
-        qs = super().get_queryset()
-        taxonomy_id = self.request.query_params.get("taxonomy")
-        objective_id = self.request.query_params.get("objective")
-        sector_id = self.request.query_params.get("sector")
-        if taxonomy_id:
-            qs = qs.filter(taxonomy_id=taxonomy_id)
-        if objective_id:
-            qs = qs.filter(environmental_objective_id=objective_id)
-        if sector_id:
-            qs = qs.filter(sector_id=sector_id)
+        qs = self.filter_params(super().get_queryset())
         return qs.order_by("sector__name", "title")
 
 
-class AdaptationGeneralCriterionViewSet(viewsets.ReadOnlyModelViewSet):
+class AdaptationGeneralCriterionViewSet(QueryFiltersMixin, viewsets.ReadOnlyModelViewSet):
     """
-    GET /api/adaptation-general-criteria/?taxonomy=<id>&objective=<id>
+    GET /api/adaptation-general-criteria/?taxonomy=<ids>&objective=<ids>
     """
     serializer_class = AdaptationGeneralCriterionSerializer
+    query_budget = 2
     queryset = AdaptationGeneralCriterion.objects.all().select_related(
         "taxonomy", "environmental_objective"
     )
+    query_filters = {
+        "taxonomy": id_filter("taxonomy_id"),
+        "objective": id_filter("environmental_objective_id"),
+    }
 
     def get_queryset(self):
-        qs = super().get_queryset()
-        taxonomy_id = self.request.query_params.get("taxonomy")
-        objective_id = self.request.query_params.get("objective")
-        if taxonomy_id:
-            qs = qs.filter(taxonomy_id=taxonomy_id)
-        if objective_id:
-            qs = qs.filter(environmental_objective_id=objective_id)
+        qs = self.filter_params(super().get_queryset())
         return qs.order_by("title")
 
 
@@ -184,80 +292,403 @@ class AdaptationGeneralCriterionViewSet(viewsets.ReadOnlyModelViewSet):
 #  Vistas personalizadas
 # =========================
 
-# Objetivos por taxonomía
+# Objetivos por taxonomía (grafo en memoria, ver graph.py)
+@query_budget(3)
+@cache_api_response
 @api_view(["GET"])
 def environmental_objectives_by_taxonomy(request, taxonomy_id):
-    objectives = EnvironmentalObjective.objects.filter(taxonomy_id=taxonomy_id).order_by("display_name", "generic_name")
-    serializer = EnvironmentalObjectiveSerializer(objectives, many=True)
-    return Response(serializer.data)
+    return Response(get_graph().objectives_of(taxonomy_id))
 
 # Sectores por taxonomía
+@query_budget(3)
+@cache_api_response
 @api_view(["GET"])
 def sectors_by_taxonomy(request, taxonomy_id):
-    sectors = Sector.objects.filter(taxonomy_id=taxonomy_id).select_related("environmental_objective").order_by("name")
-    serializer = SectorSerializer(sectors, many=True)
-    return Response(serializer.data)
+    return Response(get_graph().sectors_of(taxonomy_id))
 
 # Sectores por taxonomía y objetivo
+@query_budget(3)
+@cache_api_response
 @api_view(["GET"])
 def sectors_by_taxonomy_and_objective(request, taxonomy_id, objective_id):
-    qs = Sector.objects.filter(
-        taxonomy_id=taxonomy_id,
-        environmental_objective_id=objective_id
-    ).order_by("name")
-
     # Si piden solo Case 1, filtra a sectores con al menos 1 Activity
-    only_case1 = request.GET.get("only_case1")
-    if only_case1 in ("1", "true", "True"):
-        act_qs = Activity.objects.filter(
-            taxonomy_id=taxonomy_id,
-            environmental_objective_id=objective_id,
-            sector_id=OuterRef("pk"),
-        )
-        qs = qs.annotate(has_acts=Exists(act_qs)).filter(has_acts=True)
+    only_case1 = request.GET.get("only_case1") in ("1", "true", "True")
+    return Response(get_graph().sectors_of(taxonomy_id, objective_id, only_case1=only_case1))
 
-    serializer = SectorSerializer(qs, many=True)
-    return Response(serializer.data)
+# Jerarquía ligera: objetivos -> sectores -> subsectores (sin criterios)
+@query_budget(3)
+@cache_api_response
+@api_view(["GET"])
+def taxonomy_hierarchy(request, taxonomy_id):
+    data = get_graph().hierarchy(taxonomy_id)
+    if data is None:
+        return Response({"error": "Taxonomy not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(data)
 
 # Actividades por T/O/S (como ya tenías)
+@query_budget(4)
+@cache_api_response
 @api_view(["GET"])
+@renderer_classes(FAST_RENDERERS)
 def activities_by_filters(request, taxonomy_id, objective_id, sector_id):
+    # El grafo resuelve la combinación T/O/S; solo se va a la base por los textos
+    if not get_graph().activity_ids(taxonomy_id, objective_id, sector_id):
+        return Response([])
     activities = Activity.objects.filter(
         taxonomy_id=taxonomy_id,
         environmental_objective_id=objective_id,
         sector_id=sector_id
-    ).select_related("taxonomy", "environmental_objective", "sector")
-    serializer = ActivitySlimSerializer(activities, many=True)
-    return Response(serializer.data)
+    )
+    return Response(with_text_refs(request, slim_rows(activities, ActivitySlimSerializer)))
 
 # Criterios de una actividad
+@query_budget(3)
+@cache_api_response
 @api_view(["GET"])
 def activity_criteria(request, activity_id):
     try:
-        activity = Activity.objects.get(id=activity_id)
+        activity = with_shared_texts(Activity.objects.select_related("taxonomy", "environmental_objective", "sector")).get(id=activity_id)
     except Activity.DoesNotExist:
         return Response({"error": "Activity not found"}, status=status.HTTP_404_NOT_FOUND)
     data = ActivitySerializer(activity).data
     return Response(data)
 
-# Detalle anidado de una Taxonomía (para navegar todo desde FE)
+# Detalle anidado de una Taxonomía (para navegar todo desde FE); ?rwanda=grouped -> Rwanda agrupado
+@query_budget(14)
+@cache_api_response
 @api_view(["GET"])
+@renderer_classes(FAST_RENDERERS)
 def taxonomy_detail_nested(request, taxonomy_id: int):
-    try:
-        t = Taxonomy.objects.get(id=taxonomy_id)
-    except Taxonomy.DoesNotExist:
-        return Response({"error": "Taxonomy not found"}, status=status.HTTP_404_NOT_FOUND)
     # Prefetch para que sea eficiente
     t = (
         Taxonomy.objects
         .prefetch_related(
             "objectives__sectors__subsectors",
-            "objectives__sectors__activities",
+            Prefetch("objectives__sectors__activities", queryset=with_shared_texts(Activity.objects.all())),
             "objectives__sectors__practices",
-            "objectives__adaptation_whitelists__sector",
-            "objectives__adaptation_general_criteria",
-            "rwanda_adaptation_rows",
+            Prefetch("objectives__adaptation_whitelists", queryset=adaptation_whitelists_queryset()),
+            Prefetch("objectives__adaptation_general_criteria", queryset=adaptation_general_criteria_queryset()),
+        )
+        .annotate(has_rwanda=Exists(RwandaAdaptation.objects.filter(taxonomy=OuterRef("pk"))))
+        .filter(id=taxonomy_id)
+        .first()
+    )
+    if t is None:
+        return Response({"error": "Taxonomy not found"}, status=status.HTTP_404_NOT_FOUND)
+    context = {"fast_rows": True, "rwanda_grouped": request.query_params.get("rwanda") == "grouped"}
+    data = TaxonomyDetailSerializer(t, context=context).data
+    return Response(with_text_refs(request, data))
+
+
+# Matriz taxonomía × objetivo genérico (una sola consulta, cacheada por versión)
+MATRIX_COUNTED_MODELS = {
+    "sectors": Sector,
+    "activities": Activity,
+    "practices": Practice,
+    "adaptation_whitelists": AdaptationWhitelist,
+    "adaptation_general_criteria": AdaptationGeneralCriterion,
+}
+
+
+def _objective_count(model):
+    # COUNT(*) correlacionado con el objetivo de la fila (LEFT JOIN taxonomy -> objectives)
+    counts = (
+        model.objects
+        .filter(environmental_objective_id=OuterRef("objectives__id"))
+        .order_by()
+        .values("environmental_objective_id")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+@query_budget(4)
+@cache_api_response
+@api_view(["GET"])
+@renderer_classes(FAST_RENDERERS)
+def objectives_matrix(request):
+    """
+    GET /api/matrix/objectives/
+    Una fila por taxonomía; por cada objetivo genérico (ENV_OBJECTIVES) el
+    objetivo presente (id, display_name y conteos de contenido) o null.
+    """
+    rows = (
+        Taxonomy.objects
+        .order_by("name", "objectives__generic_name")
+        .values(
+            "id", "name", "region", "country_code", "language",
+            "objectives__id", "objectives__generic_name", "objectives__display_name",
         )
-        .get(id=taxonomy_id)
+        .annotate(**{key: _objective_count(model) for key, model in MATRIX_COUNTED_MODELS.items()})
     )
-    return Response(TaxonomyDetailSerializer(t).data)
+
+    taxonomies = {}
+    extra_objectives = []
+    for row in rows:
+        tax = taxonomies.get(row["id"])
+        if tax is None:
+            tax = taxonomies[row["id"]] = {
+                "id": row["id"],
+                "name": row["name"],
+                "region": row["region"],
+                "country_code": row["country_code"],
+                "language": row["language"],
+                "objectives": {name: None for name in ENV_OBJECTIVES},
+            }
+        generic = row["objectives__generic_name"]
+        if row["objectives__id"] is None:
+            continue
+        if generic not in tax["objectives"] and generic not in extra_objectives:
+            extra_objectives.append(generic)
+        tax["objectives"][generic] = {
+            "id": row["objectives__id"],
+            "display_name": row["objectives__display_name"] or generic,
+            "counts": {key: row[key] for key in MATRIX_COUNTED_MODELS},
+        }
+
+    for tax in taxonomies.values():
+        for generic in extra_objectives:
+            tax["objectives"].setdefault(generic, None)
+
+    return Response({
+        "version": get_dataset_version(),
+        "objectives": ENV_OBJECTIVES + extra_objectives,
+        "taxonomies": list(taxonomies.values()),
+    })
+
+
+# Equivalentes de una actividad en otras taxonomías (tabla precalculada)
+EQUIVALENTS_DEFAULT_LIMIT = 50
+
+def _float_param(raw, default):
+    # float() acepta "nan" e "inf", que no son umbrales válidos
+    try:
+        value = float(raw) if raw not in (None, "") else default
+    except ValueError:
+        return None
+    return value if value is None or math.isfinite(value) else None
+
+
+@query_budget(4)
+@cache_api_response
+@api_view(["GET"])
+@renderer_classes(FAST_RENDERERS)
+def activity_equivalents(request, activity_id):
+    """
+    GET /api/activities/<id>/equivalents/?taxonomy=<id>&min_score=<0..1>&limit=<n>
+    """
+    try:
+        activity = Activity.objects.select_related("taxonomy", "environmental_objective").get(id=activity_id)
+    except Activity.DoesNotExist:
+        return Response({"error": "Activity not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    min_score = _float_param(request.query_params.get("min_score"), 0.0)
+    limit = request.query_params.get("limit") or str(EQUIVALENTS_DEFAULT_LIMIT)
+    taxonomy_id = request.query_params.get("taxonomy")
+    if min_score is None or not is_int(limit) or (taxonomy_id and not is_int(taxonomy_id)):
+        return Response({"error": "Invalid taxonomy, min_score or limit"}, status=status.HTTP_400_BAD_REQUEST)
+
+    qs = (
+        ActivityEquivalence.objects
+        .filter(source_id=activity_id, score__gte=min_score)
+        .select_related("target__taxonomy", "target__environmental_objective")
+        .order_by("-score", "target_id")
+    )
+    if taxonomy_id:
+        qs = qs.filter(target_taxonomy_id=int(taxonomy_id))
+
+    return Response({
+        "activity": ActivityBriefSerializer(activity).data,
+        "equivalents": ActivityEquivalenceSerializer(qs[:int(limit)], many=True).data,
+    })
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer en respuestas streaming."""
+    def write(self, value):
+        return value
+
+
+EQUIVALENCES_EXPORT_COLUMNS = (
+    ("source_id", "source_id"),
+    ("source_taxonomy", "source__taxonomy__name"),
+    ("source_code", "source__taxonomy_code"),
+    ("source_name", "source__name"),
+    ("target_id", "target_id"),
+    ("target_taxonomy", "target__taxonomy__name"),
+    ("target_code", "target__taxonomy_code"),
+    ("target_name", "target__name"),
+    ("score", "score"),
+    ("code_score", "code_score"),
+    ("name_score", "name_score"),
+    ("method", "method"),
+)
+
+
+# Export masivo (CSV) de la matriz de equivalencias
+@require_GET
+def equivalences_export(request):
+    """
+    GET /api/matrix/equivalences/?source_taxonomy=<id>&target_taxonomy=<id>&min_score=<0..1>
+    CSV en streaming (una fila por par source -> target).
+    """
+    qs = ActivityEquivalence.objects.all()
+    for param, field in (("source_taxonomy", "source__taxonomy_id"), ("target_taxonomy", "target_taxonomy_id")):
+        raw = request.GET.get(param)
+        if raw:
+            if not is_int(raw):
+                return JsonResponse({"error": f"{param} must be an integer id"}, status=400)
+            qs = qs.filter(**{field: int(raw)})
+    raw = request.GET.get("min_score")
+    if raw:
+        min_score = _float_param(raw, None)
+        if min_score is None:
+            return JsonResponse({"error": "min_score must be a number"}, status=400)
+        qs = qs.filter(score__gte=min_score)
+
+    rows = (
+        qs.order_by("source_id", "-score", "target_id")
+        .values_list(*[lookup for _, lookup in EQUIVALENCES_EXPORT_COLUMNS])
+        .iterator(chunk_size=2000)
+    )
+    writer = csv.writer(_Echo())
+
+    def stream():
+        yield writer.writerow([name for name, _ in EQUIVALENCES_EXPORT_COLUMNS])
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(stream(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = 'attachment; filename="activity_equivalences.csv"'
+    return response
+
+
+# Delta-sync para espejos: cambios de fila desde una versión
+CHANGES_DEFAULT_LIMIT = 1000
+CHANGES_MAX_LIMIT = 5000
+
+
+@query_budget(4)
+@cache_api_response
+@api_view(["GET"])
+@renderer_classes(FAST_RENDERERS)
+def dataset_changes(request):
+    """
+    GET /api/changes/?since=<version>&after=<id>&limit=<n>
+    Cambios con since < version <= actual, en orden de aplicación. Mientras
+    `next` no sea null hay más páginas; al terminar, el espejo guarda `version`.
+    ?since=0 devuelve el dataset completo como altas.
+    """
+    since = request.query_params.get("since") or "0"
+    after = request.query_params.get("after") or "0"
+    limit = request.query_params.get("limit") or str(CHANGES_DEFAULT_LIMIT)
+    if not (is_int(since) and is_int(after) and is_int(limit)) or not 1 <= int(limit) <= CHANGES_MAX_LIMIT:
+        return Response(
+            {"error": f"since, after and limit must be integers (limit <= {CHANGES_MAX_LIMIT})"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    since, after, limit = int(since), int(after), int(limit)
+
+    version = get_dataset_version()
+    rows = list(
+        ChangeLogEntry.objects
+        .filter(version__gt=since, version__lte=version, id__gt=after)
+        .order_by("id")
+        .values("id", "version", "model", "object_id", "action", "data")[:limit + 1]
+    )
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        params = request.query_params.copy()
+        params["since"], params["after"], params["limit"] = since, rows[-1]["id"], limit
+        next_url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+    return Response({"version": version, "since": since, "next": next_url, "changes": rows})
+
+
+# Releases inmutables disponibles (el publicado es el que se sirve por defecto)
+@query_budget(3)
+@api_view(["GET"])
+@renderer_classes(FAST_RENDERERS)
+def releases_list(request):
+    """GET /api/releases/ — usar ?release=<name> en cualquier documento para fijar uno."""
+    rows = Release.objects.values(
+        "name", "dataset_version", "status", "created_at", "published_at",
+        current=Exists(ReleasePointer.objects.filter(release=OuterRef("pk"))),
+    )
+    return Response(list(rows))
+
+
+# Clasificador de descripciones de proyecto -> actividades / prácticas candidatas
+CLASSIFY_DEFAULT_K = 5
+CLASSIFY_MAX_K = 50
+CLASSIFY_KINDS = {"activity": 0, "practice": 1}
+
+
+@query_budget(3)
+@api_view(["POST"])
+@renderer_classes(FAST_RENDERERS)
+def classify_descriptions(request):
+    """
+    POST /api/classify/
+    {"descriptions": ["...", ...], "taxonomy": <id>?, "kind": "activity"|"practice"?, "k": 5}
+    Sin artefacto de la versión actual responde el más reciente (lo dice "version"); sin ninguno, 503.
+    """
+    from .classifier import RETRY_AFTER, ClassifierUnavailable, get_classifier  # numpy/scipy solo al primer uso
+
+    body = request.data if isinstance(request.data, dict) else {}
+    descriptions = body.get("descriptions")
+    if isinstance(descriptions, str):
+        descriptions = [descriptions]
+    if not isinstance(descriptions, list) or not all(isinstance(d, str) for d in descriptions):
+        return Response({"error": "descriptions must be a list of strings"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(descriptions) > settings.CLASSIFY_MAX_BATCH:
+        return Response(
+            {"error": f"At most {settings.CLASSIFY_MAX_BATCH} descriptions per request"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    k, taxonomy_id, kind = body.get("k", CLASSIFY_DEFAULT_K), body.get("taxonomy"), body.get("kind")
+    # bool es subclase de int: {"k": true} no es un entero válido
+    if not isinstance(k, int) or isinstance(k, bool) or not 1 <= k <= CLASSIFY_MAX_K:
+        return Response({"error": f"k must be an integer between 1 and {CLASSIFY_MAX_K}"}, status=status.HTTP_400_BAD_REQUEST)
+    if taxonomy_id is not None and (not isinstance(taxonomy_id, int) or isinstance(taxonomy_id, bool)):
+        return Response({"error": "taxonomy must be an integer id"}, status=status.HTTP_400_BAD_REQUEST)
+    if kind is not None and kind not in CLASSIFY_KINDS:
+        return Response({"error": "kind must be 'activity' or 'practice'"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        clf = get_classifier()
+    except ClassifierUnavailable:
+        return Response(
+            {"error": "Classifier not built yet; run build_classifier"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": str(RETRY_AFTER)},
+        )
+    return Response({
+        "version": clf.version,
+        "results": clf.classify(
+            descriptions, k=k, taxonomy_id=taxonomy_id,
+            kind=CLASSIFY_KINDS[kind] if kind else None,
+        ),
+    })
+
+
+# Autocompletar: actividades (nombre / código), prácticas, sectores y subsectores
+@query_budget(2)
+@api_view(["GET"])
+@renderer_classes(FAST_RENDERERS)
+def suggest(request):
+    """GET /api/suggest/?q=<texto>&taxonomy=<id>&limit=<n> (índice en memoria, ver suggest.py)"""
+    q = (request.query_params.get("q") or "").strip()
+    taxonomy_id = request.query_params.get("taxonomy")
+    limit = request.query_params.get("limit") or str(SUGGEST_DEFAULT_LIMIT)
+    if taxonomy_id and not is_int(taxonomy_id):
+        return Response({"error": "taxonomy must be an integer id"}, status=status.HTTP_400_BAD_REQUEST)
+    if not is_int(limit) or not 1 <= int(limit) <= SUGGEST_MAX_LIMIT:
+        return Response({"error": f"limit must be an integer between 1 and {SUGGEST_MAX_LIMIT}"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(q) < SUGGEST_MIN_LENGTH:
+        return Response([])
+
+    index = get_suggest_index()
+    return Response(index.search(q, taxonomy_id=int(taxonomy_id) if taxonomy_id else None, limit=int(limit)))
@@ -0,0 +1,122 @@
+"""
+Pre-calentado de caches tras un deploy o un import.
+
+Recorre los mismos documentos que un release (releases.iter_release_paths:
+lista de taxonomías, detail/, objetivos -> sectores -> actividades, criterios,
+matriz) y los pide con el stack completo de middleware, así que se llenan la
+cache de respuestas (caching.py), la de blobs de releases y, de paso, los
+planes de consulta de la DB.
+
+- En proceso (por defecto): útil con una cache compartida (CACHE_URL=redis://...).
+  Con locmem solo calienta la memoria del propio proceso. Las peticiones van
+  por https a un host de ALLOWED_HOSTS, como las de un usuario real (si no,
+  SECURE_SSL_REDIRECT / ALLOWED_HOSTS las convierten en 301 / 400).
+- Contra un servidor (`base_url`): calienta las caches de sus workers vía HTTP.
+
+Un 3xx / 4xx no es un fallo de una ruta sino de configuración (host, https,
+URL base): se para y se lanza WarmingError. Los 5xx cuentan como fallos sueltos.
+"""
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from django.conf import settings
+from django.db import connections
+
+from .releases import API_PREFIX, iter_release_paths
+
+DEFAULT_CONCURRENCY = 4
+HTTP_TIMEOUT = 60
+REQUEST_HEADERS = {"Accept": "application/json", "Accept-Encoding": "br, gzip"}
+
+
+class WarmingError(Exception):
+    """Respuesta 3xx / 4xx: la configuración (host, https, URL) está mal, no la ruta."""
+
+
+def uses_local_memory_cache():
+    """Con locmem, calentar en proceso solo llena la memoria del propio proceso."""
+    return "LocMemCache" in settings.CACHES["default"]["BACKEND"]
+
+
+def local_host():
+    """Primer host concreto de ALLOWED_HOSTS ('*' -> localhost, '.example.org' -> example.org)."""
+    for host in settings.ALLOWED_HOSTS:
+        host = host.lstrip(".")
+        if host and host != "*":
+            return host
+    return "localhost"
+
+
+def _fetch_local(key):
+    from django.test import Client  # solo en el comando / post-import
+
+    try:
+        response = Client(HTTP_HOST=local_host(), raise_request_exception=False).get(
+            API_PREFIX + key, secure=True,
+            HTTP_ACCEPT=REQUEST_HEADERS["Accept"], HTTP_ACCEPT_ENCODING=REQUEST_HEADERS["Accept-Encoding"],
+        )
+        return response.status_code
+    finally:
+        connections.close_all()  # cada hilo abre su propia conexión
+
+
+def _fetch_http(base_url, key):
+    request = urllib.request.Request(base_url.rstrip("/") + API_PREFIX + key, headers=REQUEST_HEADERS)
+    try:
+        with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+
+
+def warm_caches(base_url=None, concurrency=DEFAULT_CONCURRENCY, budget=None, paths=None):
+    """
+    Pide todos los documentos con `concurrency` peticiones en vuelo como mucho.
+    Con `budget` (segundos) deja de lanzar peticiones al agotarse; el orden de
+    iter_release_paths pone primero lo más visitado (listas y detail/).
+    Devuelve {"warmed", "failed", "skipped", "elapsed"}; WarmingError ante el
+    primer 3xx / 4xx (no se lanzan más peticiones).
+    """
+    keys = list(paths if paths is not None else iter_release_paths())
+    fetch = (lambda key: _fetch_http(base_url, key)) if base_url else _fetch_local
+    stats = {"warmed": 0, "failed": 0, "skipped": 0}
+    errors = []  # (status, key) de las respuestas 3xx / 4xx
+    t0 = time.perf_counter()
+
+    pending = set()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for i, key in enumerate(keys):
+            if errors:
+                break
+            if budget is not None and time.perf_counter() - t0 > budget:
+                stats["skipped"] = len(keys) - i
+                break
+            if len(pending) >= concurrency:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _collect(done, stats, errors)
+            pending.add(pool.submit(lambda k: (k, fetch(k)), key))
+        _collect(wait(pending)[0], stats, errors)
+
+    if errors:
+        status, key = errors[0]
+        target = base_url or f"https://{local_host()} (en proceso)"
+        raise WarmingError(
+            f"HTTP {status} en {API_PREFIX}{key} contra {target}: revisa la URL, ALLOWED_HOSTS y SECURE_SSL_REDIRECT"
+        )
+    stats["elapsed"] = time.perf_counter() - t0
+    return stats
+
+
+def _collect(futures, stats, errors):
+    for future in futures:
+        try:
+            key, status = future.result()
+        except Exception:
+            stats["failed"] += 1
+            continue
+        if 300 <= status < 500:
+            errors.append((status, key))
+        stats["warmed" if status == 200 else "failed"] += 1
@@ -12,6 +12,13 @@ const baseURL =
     ? import.meta.env.VITE_API_BASE_URL 
     : fallback;
 
+// Bundle estático en CDN (manage.py build_static_bundle), p.ej. "/bundle/".
+// Si un GET está en su manifest se sirve de ahí y no llega a Django.
+const bundleURL =
+  (import.meta.env && import.meta.env.VITE_STATIC_BUNDLE_URL)
+    ? import.meta.env.VITE_STATIC_BUNDLE_URL.replace(/\/?$/, '/')
+    : null;
+
 // Optional: quick sanity log (remove later).
 // console.log('API base:', baseURL);
 
@@ -20,6 +27,45 @@ const api = axios.create({
   // withCredentials: true, // enable if you ever use cookie auth/CSRF
 });
 
+// Manifest del bundle: se pide una vez; si falla, todo va a la API
+let manifestPromise = null;
+const loadManifest = () => {
+  if (!manifestPromise) {
+    manifestPromise = axios
+      .get(`${bundleURL}manifest.json`)
+      .then(res => res.data?.documents || {})
+      .catch(() => ({}));
+  }
+  return manifestPromise;
+};
+
+// Misma clave que releases.document_key(): ruta relativa + query ordenada
+const IGNORED_PARAMS = new Set(['release', 'format']);
+const cmp = (a, b) => (a < b ? -1 : a > b ? 1 : 0);
+const documentKey = (url, params) => {
+  const [path, query = ''] = url.replace(/^\//, '').split('?');
+  const search = new URLSearchParams(query);
+  Object.entries(params || {}).forEach(([k, v]) => search.append(k, v));
+  const items = [...search.entries()]
+    .filter(([k]) => !IGNORED_PARAMS.has(k))
+    .sort(([ka, va], [kb, vb]) => (ka === kb ? cmp(va, vb) : cmp(ka, kb)));
+  return items.length ? `${path}?${items.map(([k, v]) => `${k}=${v}`).join('&')}` : path;
+};
+
+if (bundleURL) {
+  api.interceptors.request.use(async cfg => {
+    if ((cfg.method || 'get').toLowerCase() !== 'get' || /^https?:/.test(cfg.url || '')) return cfg;
+    const documents = await loadManifest();
+    const file = documents[documentKey(cfg.url || '', cfg.params)];
+    if (file) {
+      cfg.baseURL = bundleURL;
+      cfg.url = file;
+      cfg.params = undefined;
+    }
+    return cfg;
+  });
+}
+
 // Interceptor para loguear cada request
 api.interceptors.request.use(cfg => {
   console.log('REQ →', cfg.baseURL, cfg.url);
@@ -26,26 +26,20 @@ const GENERIC_OBJECTIVES = [
 const ObjectivesMatrix = () => {
   const [loading, setLoading] = useState(true);
   const [taxonomies, setTaxonomies] = useState([]);
-  const [objectivesByTaxonomy, setObjectivesByTaxonomy] = useState({}); // { [taxonomyId]: [{id,name}, ...] }
+  const [objectivesByTaxonomy, setObjectivesByTaxonomy] = useState({}); // { [taxonomyId]: { [generic_name]: {id, display_name, counts} | null } }
   const [error, setError] = useState(null);
 
   useEffect(() => {
     const load = async () => {
       try {
         setLoading(true);
-        const txRes = await api.get("taxonomies/");
-        const txs = txRes.data || [];
+        // una sola respuesta: taxonomías × objetivos genéricos
+        const res = await api.get("matrix/objectives/");
+        const txs = res.data?.taxonomies || [];
         setTaxonomies(txs);
 
-        // fetch objectives for each taxonomy in parallel
-        const pairs = await Promise.all(
-          txs.map(async (t) => {
-            const res = await api.get(`taxonomies/${t.id}/environmental-objectives/`);
-            return [t.id, res.data || []];
-          })
-        );
         const map = {};
-        for (const [id, list] of pairs) map[id] = list;
+        for (const t of txs) map[t.id] = t.objectives || {};
         setObjectivesByTaxonomy(map);
       } catch (e) {
         setError(e?.message || "Failed to load");
@@ -60,10 +54,10 @@ const ObjectivesMatrix = () => {
   const columnKeys = GENERIC_OBJECTIVES;
 
   const hasObjective = (taxonomyId, genericName) =>
-    (objectivesByTaxonomy[taxonomyId] || []).some((o) => o.generic_name === genericName);
+    Boolean((objectivesByTaxonomy[taxonomyId] || {})[genericName]);
 
   const getObjectiveByName = (taxonomyId, genericName) =>
-    (objectivesByTaxonomy[taxonomyId] || []).find((o) => o.generic_name === genericName);
+    (objectivesByTaxonomy[taxonomyId] || {})[genericName];
 
 
   return (
@@ -149,7 +143,7 @@ const ObjectivesMatrix = () => {
                       );
                     }
 
-                    const target = getObjectiveByName(t.id, obj); // { id, name }
+                    const target = getObjectiveByName(t.id, obj); // { id, display_name, counts }
                     return (
                       <TableCell key={`${t.id}-${obj}`} align="center">
                         <Tooltip title={`Go to ${t.name} → ${target?.display_name || obj} sectors`}>
@@ -177,19 +177,20 @@ const TaxonomyDetail = () => {
       if (!objectives?.length) return;
       try {
         setCountsLoading(true);
-        const pairs = await Promise.all(
-          objectives.map(async (o) => {
-            try {
-              const res = await api.get(`taxonomies/${id}/objectives/${o.id}/sectors/`);
-              const arr = Array.isArray(res?.data) ? res.data : [];
-              return [o.id, arr.length];
-            } catch {
-              return [o.id, 0];
-            }
-          })
-        );
+        // Una sola petición para todos los objetivos: el documento de sectores de la
+        // taxonomía (forma parte del release y del bundle, igual que el resto de la página)
         const map = {};
-        for (const [oid, cnt] of pairs) map[oid] = cnt;
+        for (const o of objectives) map[o.id] = 0;
+        try {
+          const res = await api.get(`taxonomies/${id}/sectors/`);
+          const arr = Array.isArray(res?.data) ? res.data : [];
+          for (const s of arr) {
+            const oid = s.environmental_objective?.id;
+            if (oid in map) map[oid] += 1;
+          }
+        } catch {
+          // sin conteos: los badges quedan a 0
+        }
         setObjectiveSectorCounts(map);
       } finally {
         setCountsLoading(false);